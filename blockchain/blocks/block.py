@@ -1,7 +1,7 @@
-import hashlib
 import time
 from typing import List, Dict
 import json
+from blockchain.cryptography.hashing import Hasher, Hashing
 
 
 class Block:
@@ -11,30 +11,41 @@ class Block:
         self.previous_hash = previous_hash
         self.transactions = transactions
         self.nonce = nonce
-        self.hash = self.calculate_hash()
         self.merkle_root = self.calculate_merkle_root()
+        self.hash = self.calculate_hash()
 
     def calculate_hash(self) -> str:
         """Calculates the hash of the block."""
         block_content = f"{self.index}{self.timestamp}{self.previous_hash}{self.merkle_root}{self.nonce}"
-        return hashlib.sha256(block_content.encode()).hexdigest()
+        return Hashing.sha256(block_content)
 
     def calculate_merkle_root(self) -> str:
         """Calculates the Merkle root of the block's transactions."""
-        hashes = [hashlib.sha256(json.dumps(tx).encode()).hexdigest() for tx in self.transactions]
-        while len(hashes) > 1:
-            if len(hashes) % 2 != 0:
-                hashes.append(hashes[-1])
-            hashes = [hashlib.sha256((hashes[i] + hashes[i + 1]).encode()).hexdigest()
-                      for i in range(0, len(hashes), 2)]
-        return hashes[0] if hashes else ""
+        return Block.compute_merkle_root(self.transactions)
+
+    @staticmethod
+    def transaction_digests(transactions: List[Dict]) -> List[bytes]:
+        """Returns the Merkle leaves of a list of transactions: the SHA-256 digests of their JSON encodings."""
+        return Hashing.hash_many([json.dumps(tx) for tx in transactions])
+
+    @staticmethod
+    def compute_merkle_root(transactions: List[Dict]) -> str:
+        """Calculates the Merkle root of a list of transactions (pairs hash their raw digests; hex only at the root)."""
+        leaves = Block.transaction_digests(transactions)
+        return Hashing.merkle_root_digest(leaves).hex() if leaves else ""
 
     def mine_block(self, difficulty: int):
         """Simple mining algorithm for Proof of Work."""
-        target = '0' * difficulty
-        while not self.hash.startswith(target):
+        if self.hash.startswith('0' * difficulty):
+            return
+        # The nonce ends the hashed content: hash the fixed prefix once and only the nonce per attempt
+        prefix = Hasher('sha256', f"{self.index}{self.timestamp}{self.previous_hash}{self.merkle_root}")
+        while True:
             self.nonce += 1
-            self.hash = self.calculate_hash()
+            digest = prefix.digest_with(str(self.nonce).encode())
+            if Hashing.meets_difficulty(digest, difficulty):
+                self.hash = digest.hex()
+                return
 
     def to_dict(self) -> dict:
         """Serializes the block to a dictionary."""
@@ -58,12 +69,46 @@ class Block:
             nonce=data["nonce"]
         )
 
+    def header(self) -> 'BlockHeader':
+        """Returns the header of the block, which is all a pruned node keeps of old blocks."""
+        return BlockHeader(self.index, self.timestamp, self.previous_hash, self.merkle_root, self.nonce, self.hash)
+
     def is_valid(self, difficulty: int) -> bool:
         """Validates the block's integrity."""
         return (self.hash == self.calculate_hash() and
                 self.hash.startswith('0' * difficulty))
 
 
+class BlockHeader:
+    """A block whose body (transactions) has been pruned; it still hashes and links like the full block."""
+
+    def __init__(self, index: int, timestamp: int, previous_hash: str, merkle_root: str, nonce: int, block_hash: str):
+        self.index = index
+        self.timestamp = timestamp
+        self.previous_hash = previous_hash
+        self.merkle_root = merkle_root
+        self.nonce = nonce
+        self.hash = block_hash
+        self.transactions = None
+
+    def calculate_hash(self) -> str:
+        """Calculates the hash of the block."""
+        block_content = f"{self.index}{self.timestamp}{self.previous_hash}{self.merkle_root}{self.nonce}"
+        return Hashing.sha256(block_content)
+
+    def to_dict(self) -> dict:
+        """Serializes the header to a dictionary."""
+        return {
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "previous_hash": self.previous_hash,
+            "transactions": None,
+            "nonce": self.nonce,
+            "hash": self.hash,
+            "merkle_root": self.merkle_root
+        }
+
+
 # Example usage:
 if __name__ == "__main__":
     transactions = [{"sender": "Alice", "receiver": "Bob", "amount": 10}]
@@ -1,6 +1,6 @@
-import hashlib
 import time
 from blockchain.blocks.block import Block
+from blockchain.cryptography.hashing import Hasher, Hashing
 
 class BlockBuilder:
     """Constructs new blocks by assembling transactions and metadata."""
@@ -34,10 +34,12 @@ class BlockBuilder:
         :param block: The block to mine.
         :return: The valid hash of the mined block.
         """
+        # The nonce ends the hashed data: hash the fixed prefix once and only the nonce per attempt
+        prefix = Hasher('sha256', f"{block.index}{block.previous_hash}{block.timestamp}{block.transactions}")
         while True:
-            hash_value = self._compute_hash(block)
-            if hash_value.startswith("0" * self.difficulty):
-                return hash_value
+            digest = prefix.digest_with(str(block.nonce))
+            if Hashing.meets_difficulty(digest, self.difficulty):
+                return digest.hex()
             block.nonce += 1
 
     def _compute_hash(self, block):
@@ -47,7 +49,7 @@ class BlockBuilder:
         :return: The SHA-256 hash of the block.
         """
         data = f"{block.index}{block.previous_hash}{block.timestamp}{block.transactions}{block.nonce}"
-        return hashlib.sha256(data.encode()).hexdigest()
+        return Hashing.sha256(data)
 
 
 # Example Block class (replace with actual Block class)
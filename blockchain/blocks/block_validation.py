@@ -1,5 +1,5 @@
-import hashlib
 from blockchain.blocks.block import Block
+from blockchain.cryptography.hashing import Hashing
 
 class BlockValidation:
     """Validates blocks to ensure they adhere to the blockchain protocol rules."""
@@ -119,7 +119,7 @@ if __name__ == "__main__":
 
         def compute_hash(self):
             data = f"{self.index}{self.previous_hash}{self.timestamp}{self.transactions}{self.nonce}"
-            return hashlib.sha256(data.encode()).hexdigest()
+            return Hashing.sha256(data)
 
     # Create a blockchain state
     blockchain_state = MockBlockchainState()
@@ -4,6 +4,7 @@ from typing import List
 class Blockchain:
     def __init__(self):
         self.chain: List[Block] = []
+        self.pruned_height = 0  # Blocks below this height only keep their header
         self.create_genesis_block()
 
     def create_genesis_block(self):
@@ -22,6 +23,31 @@ class Blockchain:
             return True
         return False
 
+    def append_validated_block(self, new_block: Block) -> bool:
+        """Appends a block whose stateless checks (hash, difficulty, Merkle root) already passed elsewhere."""
+        if new_block.previous_hash != self.get_latest_block().hash:
+            print("Invalid previous hash.")
+            return False
+        self.chain.append(new_block)
+        return True
+
+    def start_from(self, header) -> None:
+        """Restarts the chain at a trusted block (e.g. the block of a state-sync snapshot), dropping everything before it."""
+        self.chain = [header]
+        self.pruned_height = header.index
+
+    def prune_block_bodies(self, before_height: int) -> int:
+        """Replaces the blocks below a height with their headers, dropping their transactions."""
+        base_height = self.chain[0].index  # Non-zero once the chain was restarted with start_from
+        before_height = min(before_height, base_height + len(self.chain) - 1)  # Never prune the tip
+        pruned = 0
+        for height in range(self.pruned_height, before_height):
+            if self.chain[height - base_height].transactions is not None:
+                self.chain[height - base_height] = self.chain[height - base_height].header()
+                pruned += 1
+        self.pruned_height = max(self.pruned_height, before_height)
+        return pruned
+
     def is_valid_new_block(self, new_block: Block, previous_block: Block, difficulty: int) -> bool:
         """Validates the new block before adding it to the chain."""
         if new_block.previous_hash != previous_block.hash:
@@ -48,6 +74,7 @@ class Blockchain:
         """Replaces the current chain with a longer valid chain, if found."""
         if len(new_chain) > len(self.chain) and self.is_valid_chain(new_chain, difficulty):
             self.chain = new_chain
+            self.pruned_height = 0
             print("Chain replaced with a longer valid chain.")
             return True
         return False
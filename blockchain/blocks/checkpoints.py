@@ -0,0 +1,42 @@
+import json
+
+
+class Checkpoints:
+    """
+    Chain parameters that speed up and protect sync: hard checkpoints (block hashes that must appear at
+    given heights) and an assume-valid block, whose ancestors skip signature verification.
+    """
+
+    def __init__(self, config_file="blockchain/genesis.json", checkpoints=None, assume_valid=None):
+        """
+        Initializes the Checkpoints from the genesis file, optionally overridden by arguments.
+        :param config_file: Path to the JSON file holding "checkpoints" ({height: hash}) and "assume_valid" (hash).
+        :param checkpoints: Optional dictionary of {height: block hash} replacing the configured checkpoints.
+        :param assume_valid: Optional block hash replacing the configured assume-valid block.
+        """
+        with open(config_file) as file:
+            config = json.load(file)
+        if checkpoints is None:
+            checkpoints = config.get("checkpoints", {})
+        self.checkpoints = {int(height): block_hash for height, block_hash in checkpoints.items()}
+        self.assume_valid = assume_valid if assume_valid is not None else config.get("assume_valid")
+
+    def conflicts(self, height, block_hash):
+        """
+        :return: True if a hard checkpoint at this height names a different block.
+        """
+        expected = self.checkpoints.get(height)
+        return expected is not None and expected != block_hash
+
+    def last_checkpoint_height(self):
+        """
+        :return: The height of the highest hard checkpoint, or -1 without checkpoints.
+        """
+        return max(self.checkpoints, default=-1)
+
+
+# Example usage
+if __name__ == "__main__":
+    checkpoints = Checkpoints(checkpoints={"100": "ab" * 32}, assume_valid="cd" * 32)
+    print("Conflicts at 100:", checkpoints.conflicts(100, "ef" * 32))
+    print("Assume-valid block:", checkpoints.assume_valid)
@@ -1,5 +1,5 @@
-import hashlib
-import json
+from blockchain.blocks.block import Block
+from blockchain.cryptography.hashing import Hashing
 
 class MerkleTree:
     """Implements a Merkle tree for hashing and verifying transactions."""
@@ -14,38 +14,17 @@ class MerkleTree:
         self.tree = []
         self.build_tree()
 
-    @staticmethod
-    def _hash_data(data):
-        """
-        Computes the SHA-256 hash of the given data.
-        :param data: The data to hash (string or JSON serializable).
-        :return: A hexadecimal SHA-256 hash.
-        """
-        if not isinstance(data, str):
-            data = json.dumps(data, sort_keys=True)
-        return hashlib.sha256(data.encode('utf-8')).hexdigest()
-
     def build_tree(self):
         """
-        Builds the Merkle tree from the list of transactions.
+        Builds the Merkle tree from the list of transactions. Leaves and pairs are hashed as in
+        Block.compute_merkle_root, so the root matches the block's; digests are only hex-encoded for the
+        returned levels.
         """
         if not self.transactions:
             raise ValueError("No transactions provided to build the Merkle tree.")
 
-        # Hash each transaction
-        current_level = [self._hash_data(tx) for tx in self.transactions]
-        self.tree.append(current_level)
-
-        # Build the tree level by level
-        while len(current_level) > 1:
-            next_level = []
-            for i in range(0, len(current_level), 2):
-                # Pair up adjacent hashes; if odd, duplicate the last hash
-                left = current_level[i]
-                right = current_level[i + 1] if i + 1 < len(current_level) else left
-                next_level.append(self._hash_data(left + right))
-            self.tree.append(next_level)
-            current_level = next_level
+        levels = Hashing.merkle_levels(Block.transaction_digests(self.transactions))
+        self.tree = [[digest.hex() for digest in level] for level in levels]
 
         # The root of the tree is the last remaining hash
         self.merkle_root = self.tree[-1][0]
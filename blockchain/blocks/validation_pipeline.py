@@ -0,0 +1,244 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from blockchain.blocks.block import Block, BlockHeader
+from blockchain.transactions.transaction_validation import TransactionValidation
+
+REQUIRED_BLOCK_FIELDS = ["index", "timestamp", "previous_hash", "transactions", "nonce", "hash", "merkle_root"]
+REQUIRED_TRANSACTION_FIELDS = ["sender", "receiver", "amount"]
+
+
+def check_zk_proofs(transactions):
+    """
+    Batch-verifies the zero-knowledge proofs ("zk_proof", as ZeroKnowledgeProofs.serialize_proof) carried by
+    transactions, bisecting only when the batch fails.
+    :param transactions: The transactions of a block.
+    :return: None if every proof is valid, otherwise the reason the first invalid one failed.
+    """
+    from blockchain.cryptography.zk_proofs import ZeroKnowledgeProofs  # Only blocks with private transactions need py_ecc
+    zk = ZeroKnowledgeProofs()
+    positions, proofs = [], []
+    for position, transaction in enumerate(transactions):
+        if "zk_proof" in transaction:
+            try:
+                proofs.append(zk.deserialize_proof(transaction["zk_proof"]))
+            except (KeyError, TypeError, ValueError, IndexError):
+                return f"malformed zero-knowledge proof in transaction {position}"
+            positions.append(position)
+    if not proofs or zk.batch_verify(proofs):
+        return None
+    return f"invalid zero-knowledge proof in transaction {positions[zk.find_invalid_proofs(proofs)[0]]}"
+
+
+def check_block_stateless(block_data, difficulty, require_signatures=False, verify_signatures=True):
+    """
+    Runs the checks of a block that need no chain state: structure, header hash and difficulty, Merkle
+    root, transaction structure, signatures and zero-knowledge proofs. Module-level so it can run in
+    worker processes.
+    :param block_data: The block as a dictionary (Block.to_dict()).
+    :param difficulty: The proof-of-work difficulty.
+    :param require_signatures: Whether unsigned transactions are rejected.
+    :param verify_signatures: False for ancestors of the assume-valid block, whose signatures and
+                              zero-knowledge proofs are not checked.
+    :return: None if the block passed, otherwise the reason it failed.
+    """
+    missing = [field for field in REQUIRED_BLOCK_FIELDS if field not in block_data]
+    if missing:
+        return f"missing fields {missing}"
+
+    header = BlockHeader(block_data["index"], block_data["timestamp"], block_data["previous_hash"],
+                         block_data["merkle_root"], block_data["nonce"], block_data["hash"])
+    if header.calculate_hash() != header.hash:
+        return "invalid block hash"
+    if not header.hash.startswith("0" * difficulty):
+        return "block does not meet difficulty target"
+
+    transactions = block_data["transactions"]
+    if not isinstance(transactions, list):
+        return "transactions must be a list"
+    if Block.compute_merkle_root(transactions) != header.merkle_root:
+        return "invalid Merkle root"
+
+    signature_validation = TransactionValidation(blockchain_state=None)
+    for position, transaction in enumerate(transactions):
+        if not isinstance(transaction, dict) or any(field not in transaction for field in REQUIRED_TRANSACTION_FIELDS):
+            return f"malformed transaction {position}"
+        if not isinstance(transaction["amount"], (int, float)) or transaction["amount"] < 0:
+            return f"invalid amount in transaction {position}"
+        if "signature" in transaction and "sender_public_key" in transaction:
+            if verify_signatures and not signature_validation.validate_signature(transaction):
+                return f"invalid signature in transaction {position}"
+        elif require_signatures:
+            return f"unsigned transaction {position}"
+    if verify_signatures and any("zk_proof" in transaction for transaction in transactions):
+        return check_zk_proofs(transactions)
+    return None
+
+
+class ValidationPipeline:
+    """
+    Validates a run of blocks (e.g. during initial sync) in two phases: the stateless checks of upcoming
+    blocks run concurrently in a process pool, while state is applied sequentially in height order as
+    their results arrive.
+
+    With Checkpoints, headers are first accepted with process_headers(): headers conflicting with a hard
+    checkpoint are rejected, and blocks on the header chain up to the assume-valid block skip signature
+    verification (they are still fully checked otherwise and applied to the state).
+    """
+
+    def __init__(self, blockchain, apply_state=None, difficulty=2, workers=None, lookahead=64,
+                 require_signatures=False, checkpoints=None):
+        """
+        Initializes the ValidationPipeline.
+        :param blockchain: The Blockchain the validated blocks are appended to.
+        :param apply_state: Optional callable applying a block to the state (e.g. StateManager.update_state);
+                            a block whose state application raises or returns False is rejected.
+        :param difficulty: The proof-of-work difficulty.
+        :param workers: Number of worker processes (defaults to the CPU count); 0 runs the checks inline.
+        :param lookahead: Maximum number of blocks whose stateless checks are in flight.
+        :param require_signatures: Whether unsigned transactions are rejected.
+        :param checkpoints: Optional Checkpoints (hard checkpoints and assume-valid block).
+        """
+        self.blockchain = blockchain
+        self.apply_state = apply_state
+        self.difficulty = difficulty
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.lookahead = lookahead
+        self.require_signatures = require_signatures
+        self.checkpoints = checkpoints
+        self.header_hashes = {}  # height -> hash of the accepted header chain
+        self.header_tip = None  # Last accepted header
+        self.assume_valid_height = -1  # Height of the assume-valid block on the header chain, once seen
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        self.stats = {"applied": 0, "rejected": 0, "rejected_headers": 0, "signatures_skipped_blocks": 0,
+                      "stateless_seconds": 0.0, "stateful_seconds": 0.0}
+
+    def process_headers(self, headers):
+        """
+        Accepts a run of headers (headers-first sync) extending the chain tip or the previously accepted
+        headers, stopping at the first header that is malformed, unlinked or conflicts with a checkpoint.
+        :param headers: An iterable of BlockHeader (or Block) objects in height order.
+        :return: The number of headers accepted.
+        """
+        accepted = 0
+        previous = self.header_tip or self.blockchain.get_latest_block()
+        for header in headers:
+            error = None
+            if header.previous_hash != previous.hash or header.index != previous.index + 1:
+                error = "header does not extend the header chain"
+            elif header.calculate_hash() != header.hash or not header.hash.startswith("0" * self.difficulty):
+                error = "invalid header hash"
+            elif self.checkpoints is not None and self.checkpoints.conflicts(header.index, header.hash):
+                error = "header conflicts with a checkpoint"
+            if error is not None:
+                print(f"Header #{header.index} rejected: {error}")
+                self.stats["rejected_headers"] += 1
+                break
+            self.header_hashes[header.index] = header.hash
+            if self.checkpoints is not None and header.hash == self.checkpoints.assume_valid:
+                self.assume_valid_height = header.index
+            previous = header
+            accepted += 1
+        self.header_tip = previous if accepted else self.header_tip
+        return accepted
+
+    def _verify_signatures(self, block):
+        """
+        :return: False for the assume-valid block and its ancestors on the accepted header chain.
+        """
+        return not (block.index <= self.assume_valid_height and self.header_hashes.get(block.index) == block.hash)
+
+    def _submit(self, block):
+        verify_signatures = self._verify_signatures(block)
+        if not verify_signatures:
+            self.stats["signatures_skipped_blocks"] += 1
+        arguments = (block.to_dict(), self.difficulty, self.require_signatures, verify_signatures)
+        if self.executor is None:
+            return check_block_stateless(*arguments)
+        return self.executor.submit(check_block_stateless, *arguments)
+
+    def process(self, blocks):
+        """
+        Validates and applies blocks in height order, stopping at the first invalid block.
+        :param blocks: An iterable of Block objects, in height order, extending the current chain tip.
+        :return: The number of blocks applied.
+        """
+        blocks = iter(blocks)
+        in_flight = deque()
+        for block in blocks:
+            in_flight.append((block, self._submit(block)))
+            if len(in_flight) >= self.lookahead:
+                break
+
+        applied = 0
+        while in_flight:
+            block, pending = in_flight.popleft()
+            # Keep the pool busy with the next block while this one is applied
+            next_block = next(blocks, None)
+            if next_block is not None:
+                in_flight.append((next_block, self._submit(next_block)))
+
+            start_time = time.perf_counter()
+            error = pending if self.executor is None else pending.result()
+            self.stats["stateless_seconds"] += time.perf_counter() - start_time
+            if error is None:
+                error = self._apply(block)
+            if error is not None:
+                print(f"Block #{block.index} rejected: {error}")
+                self.stats["rejected"] += 1
+                if self.executor is not None:
+                    for _, remaining in in_flight:
+                        remaining.cancel()
+                break
+            applied += 1
+        self.stats["applied"] += applied
+        return applied
+
+    def _apply(self, block):
+        """
+        Runs the stateful phase of a block: linkage to the chain tip and state application.
+        :return: None if the block was applied, otherwise the reason it failed.
+        """
+        start_time = time.perf_counter()
+        try:
+            if block.previous_hash != self.blockchain.get_latest_block().hash:
+                return "invalid previous hash"
+            if self.checkpoints is not None and self.checkpoints.conflicts(block.index, block.hash):
+                return "block conflicts with a checkpoint"
+            if self.apply_state is not None:
+                try:
+                    if self.apply_state(block) is False:
+                        return "state application failed"
+                except Exception as e:
+                    return f"state application failed: {e}"
+            self.blockchain.append_validated_block(block)
+            return None
+        finally:
+            self.stats["stateful_seconds"] += time.perf_counter() - start_time
+
+    def shutdown(self):
+        """
+        Stops the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    sys.path.append("blockchain")
+    from blocks.blockchain_state import Blockchain
+
+    blockchain = Blockchain()
+    blocks, previous_hash = [], blockchain.get_latest_block().hash
+    for index in range(1, 21):
+        block = Block(index, previous_hash, [{"sender": "Alice", "receiver": "Bob", "amount": index}])
+        block.mine_block(2)
+        blocks.append(block)
+        previous_hash = block.hash
+
+    pipeline = ValidationPipeline(blockchain, workers=2)
+    print("Applied blocks:", pipeline.process(blocks), "Stats:", pipeline.stats)
+    pipeline.shutdown()
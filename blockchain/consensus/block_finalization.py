@@ -1,32 +1,62 @@
 import json
+from blockchain.consensus.vote_accumulator import VoteAccumulator
 
 class BlockFinalization:
     """Handles the process of block finalization and confirmation based on consensus rules."""
 
-    def __init__(self, config_file="blockchain/consensus/consensus_config.json"):
+    def __init__(self, config_file="blockchain/consensus/consensus_config.json", config=None, validators=None):
         """
         Initializes the BlockFinalization class by loading configuration.
         :param config_file: Path to the JSON configuration file.
+        :param config: Optional already loaded configuration, used instead of reading config_file.
+        :param validators: The active validator set as a dictionary of {validator_id: stake}.
         """
-        with open(config_file) as file:
-            self.config = json.load(file)
+        if config is None:
+            with open(config_file) as file:
+                config = json.load(file)
+        self.config = config
         self.finalization_threshold = self.config["finalization_threshold"]
+        self.accumulator = None
+        if validators:
+            self.set_validators(validators)
+
+    def set_validators(self, validators, public_keys=None, possession_proofs=None):
+        """
+        Starts tallying votes against a new active validator set (e.g. at an epoch boundary).
+        :param validators: A dictionary of {validator_id: stake}.
+        :param public_keys: Optional dictionary of {validator_id: BLS public key} requiring signed votes.
+        :param possession_proofs: Dictionary of {validator_id: proof of possession}, required with public_keys.
+        """
+        self.accumulator = VoteAccumulator(validators, self.finalization_threshold, public_keys=public_keys,
+                                           possession_proofs=possession_proofs)
+
+    def add_vote(self, block, validator_id, signature=None):
+        """
+        Tallies one validator's vote, finalizing the block as soon as the vote completes the stake quorum.
+        :param block: A dictionary representing the block voted for.
+        :param validator_id: The voting validator.
+        :param signature: The validator's BLS vote signature, when the validator set has public keys.
+        :return: True if the block is finalized, False otherwise.
+        """
+        if self.accumulator is None:
+            raise ValueError("No active validator set to tally votes against.")
+        certificate = self.accumulator.add_vote(block["index"], block["hash"], validator_id, signature)
+        if certificate is not None:
+            block["finalized"] = True
+            block["quorum_certificate"] = certificate.to_dict()
+        return block.get("finalized", False)
 
     def finalize_block(self, block, votes):
         """
-        Finalizes a block if the number of unique validator votes meets the finalization threshold.
+        Finalizes a block if the validators who voted for it hold the finalization threshold of the
+        active stake.
         :param block: A dictionary representing the block to be finalized.
         :param votes: A list of validator IDs who voted for the block.
         :return: True if the block is finalized, False otherwise.
         """
-        unique_votes = set(votes)
-        total_validators = len(unique_votes)
-        threshold = int(len(votes) * self.finalization_threshold)
-
-        if total_validators >= threshold:
-            block["finalized"] = True
-            return True
-        return False
+        for validator_id in votes:
+            self.add_vote(block, validator_id)
+        return block.get("finalized", False)
 
     def validate_block(self, block):
         """
@@ -63,7 +93,7 @@ if __name__ == "__main__":
     }
     votes = ["Validator1", "Validator2", "Validator3"]
 
-    finalizer = BlockFinalization()
+    finalizer = BlockFinalization(validators={"Validator1": 5000, "Validator2": 3000, "Validator3": 2000})
 
     # Validate block before finalization
     if finalizer.validate_block(block):
@@ -0,0 +1,179 @@
+import json
+import random
+from collections import OrderedDict
+from types import MappingProxyType
+from blockchain.consensus.stake_sampler import AliasSampler
+from blockchain.cryptography.hashing import Hashing
+
+
+class EpochSchedule:
+    """
+    The proposers and shard committees of one epoch, computed once from the validator set frozen at the
+    epoch boundary. Lookups are plain list/dict indexing.
+    """
+
+    def __init__(self, epoch, start_slot, seed, stakes, proposers, committees):
+        """
+        Initializes the EpochSchedule.
+        :param epoch: The epoch number.
+        :param start_slot: The first slot of the epoch.
+        :param seed: The epoch seed (hex string).
+        :param stakes: The frozen {validator_id: stake} of the epoch.
+        :param proposers: The proposer of each slot of the epoch, in slot order.
+        :param committees: A dictionary of {shard_id: [validator_id, ...]}.
+        """
+        self.epoch = epoch
+        self.start_slot = start_slot
+        self.seed = seed
+        self.stakes = MappingProxyType(stakes)
+        self.total_stake = sum(stakes.values())
+        self.proposers = proposers
+        self.committees = committees
+
+    def proposer(self, slot):
+        """
+        Returns the proposer of a slot of this epoch.
+        :param slot: The global slot number.
+        :return: The proposer's validator ID.
+        """
+        offset = slot - self.start_slot
+        if not 0 <= offset < len(self.proposers):
+            raise ValueError(f"Slot {slot} is not in epoch {self.epoch}.")
+        return self.proposers[offset]
+
+    def committee(self, shard_id):
+        """
+        Returns the validation committee of a shard for this epoch.
+        :param shard_id: The shard ID (e.g. "shard_0").
+        :return: A list of validator IDs.
+        """
+        if shard_id not in self.committees:
+            raise ValueError(f"Unknown shard {shard_id}.")
+        return self.committees[shard_id]
+
+    def to_dict(self):
+        return {
+            "epoch": self.epoch,
+            "start_slot": self.start_slot,
+            "seed": self.seed,
+            "stakes": dict(self.stakes),
+            "proposers": self.proposers,
+            "committees": self.committees
+        }
+
+
+class EpochScheduler:
+    """
+    Precomputes deterministic proposer schedules and shard committees per epoch. The schedule depends only
+    on the frozen stakes and the hash of the block closing the previous epoch, so every node derives the
+    same schedule without exchanging messages.
+    """
+
+    def __init__(self, config_file="blockchain/consensus/consensus_config.json", retained_epochs=3):
+        """
+        Initializes the EpochScheduler.
+        :param config_file: Path to the JSON configuration file.
+        :param retained_epochs: Number of computed epoch schedules kept in memory.
+        """
+        with open(config_file) as file:
+            self.config = json.load(file)
+        epoch_config = self.config["epoch"]
+        self.slots_per_epoch = epoch_config["slots_per_epoch"]
+        self.shard_count = epoch_config["shard_count"]
+        self.committee_size = epoch_config["committee_size"]
+        self.minimum_stake = self.config["minimum_stake"]
+        self.retained_epochs = retained_epochs
+        self.schedules = OrderedDict()  # epoch -> EpochSchedule, oldest first
+
+    def epoch_of(self, slot):
+        """
+        :return: The epoch containing a slot.
+        """
+        return slot // self.slots_per_epoch
+
+    def seed_block_height(self, epoch):
+        """
+        Returns the height of the block whose hash seeds an epoch: the last block of the previous epoch
+        (the genesis block for epoch 0).
+        """
+        return max(epoch * self.slots_per_epoch - 1, 0)
+
+    @staticmethod
+    def epoch_seed(epoch, previous_block_hash):
+        """
+        Derives the seed of an epoch.
+        :param epoch: The epoch number.
+        :param previous_block_hash: The hash of the block closing the previous epoch.
+        :return: The seed (hex string).
+        """
+        return Hashing.sha256(f"{previous_block_hash}:{epoch}")
+
+    def compute_epoch(self, epoch, validators, previous_block_hash):
+        """
+        Freezes the validator set and computes the full schedule of an epoch.
+        :param epoch: The epoch number.
+        :param validators: A dictionary of {validator_id: stake} at the epoch boundary.
+        :param previous_block_hash: The hash of the block closing the previous epoch.
+        :return: The EpochSchedule.
+        """
+        # Sort so the schedule does not depend on the order validators were added in on each node
+        stakes = {validator: stake for validator, stake in sorted(validators.items())
+                  if stake >= self.minimum_stake}
+        if not stakes:
+            raise ValueError(f"No eligible validators for epoch {epoch}.")
+
+        seed = self.epoch_seed(epoch, previous_block_hash)
+        rng = random.Random(int(seed, 16))
+        proposers = AliasSampler(stakes, rng).sample_many(self.slots_per_epoch)
+
+        shuffled = list(stakes)
+        rng.shuffle(shuffled)
+        committees = {}
+        for shard in range(self.shard_count):
+            # Validators are dealt out like cards; small sets wrap around so no committee is empty
+            size = min(self.committee_size, max(len(shuffled) // self.shard_count, 1))
+            start = shard * size
+            committees[f"shard_{shard}"] = [shuffled[(start + i) % len(shuffled)] for i in range(size)]
+
+        schedule = EpochSchedule(epoch, epoch * self.slots_per_epoch, seed, stakes, proposers, committees)
+        self.schedules[epoch] = schedule
+        self.schedules.move_to_end(epoch)
+        while len(self.schedules) > self.retained_epochs:
+            self.schedules.popitem(last=False)
+        return schedule
+
+    def get_schedule(self, epoch):
+        """
+        :return: The computed EpochSchedule of an epoch.
+        """
+        if epoch not in self.schedules:
+            raise ValueError(f"Schedule for epoch {epoch} has not been computed.")
+        return self.schedules[epoch]
+
+    def proposer(self, slot):
+        """
+        Returns the proposer of a slot in O(1).
+        :param slot: The global slot number.
+        :return: The proposer's validator ID.
+        """
+        return self.get_schedule(self.epoch_of(slot)).proposer(slot)
+
+    def committee(self, slot, shard_id):
+        """
+        Returns the committee validating a shard at a slot.
+        :param slot: The global slot number.
+        :param shard_id: The shard ID (e.g. "shard_0").
+        :return: A list of validator IDs.
+        """
+        return self.get_schedule(self.epoch_of(slot)).committee(shard_id)
+
+
+# Example usage
+if __name__ == "__main__":
+    scheduler = EpochScheduler()
+    validators = {f"Validator{i}": 1000 * (i + 1) for i in range(16)}
+
+    schedule = scheduler.compute_epoch(1, validators, previous_block_hash="ab" * 32)
+    print("Epoch seed:", schedule.seed)
+    print("Proposer of slot 40:", scheduler.proposer(40))
+    print("Committee of shard_0:", scheduler.committee(40, "shard_0"))
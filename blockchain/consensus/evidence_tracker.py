@@ -0,0 +1,213 @@
+import heapq
+import json
+from collections import OrderedDict
+from itertools import islice
+from blockchain.consensus.vote_accumulator import VoteAccumulator
+from blockchain.cryptography.bls_signatures import BLSSignatures
+from blockchain.cryptography.hashing import Hashing
+
+
+class DoubleSignEvidence:
+    """Two conflicting messages signed by the same validator for the same height and round."""
+
+    def __init__(self, kind, validator, height, round, first, second):
+        """
+        Initializes the DoubleSignEvidence.
+        :param kind: "vote" or "proposal".
+        :param validator: The validator that double-signed.
+        :param height: The block height.
+        :param round: The consensus round.
+        :param first: The first signed message as a tuple (block_hash, signature hex or None).
+        :param second: The conflicting message as a tuple (block_hash, signature hex or None).
+        """
+        self.kind = kind
+        self.validator = validator
+        self.height = height
+        self.round = round
+        # Canonical order, so both nodes seeing the messages in different orders produce the same evidence
+        self.first, self.second = sorted([tuple(first), tuple(second)], key=lambda message: message[0])
+
+    @property
+    def evidence_id(self):
+        return Hashing.sha256(json.dumps(self.to_dict(), sort_keys=True))
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "validator": self.validator,
+            "height": self.height,
+            "round": self.round,
+            "first": list(self.first),
+            "second": list(self.second)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["kind"], data["validator"], data["height"], data["round"], data["first"], data["second"])
+
+
+class EvidenceTracker:
+    """
+    Detects double-signing as messages arrive. Signed votes and proposals are indexed by
+    (kind, validator, height, round) over a sliding window of recent heights, so a conflict is found by a
+    single dictionary lookup and history is never scanned. Signatures are only verified when a message
+    conflicts with the indexed one or repeats it under another signature; a forged indexed message is then
+    replaced, and only evidence with two valid signatures is kept.
+    """
+
+    def __init__(self, config_file="blockchain/consensus/consensus_config.json", public_keys=None):
+        """
+        Initializes the EvidenceTracker.
+        :param config_file: Path to the JSON configuration file.
+        :param public_keys: Dictionary of {validator_id: BLS public key} used to verify evidence. Without it
+                            no evidence can be verified, so none is produced.
+        """
+        with open(config_file) as file:
+            detection = json.load(file)["malicious_behavior_detection"]
+        self.window = detection["evidence_window_heights"]  # Heights below the highest seen that stay indexed
+        self.max_evidence_per_block = detection["max_evidence_per_block"]
+        self.public_keys = public_keys
+        self.bls = BLSSignatures()
+        self.signed = {}  # (kind, validator, height, round) -> (block_hash, signature)
+        self.keys_by_height = {}  # height -> [index key, ...], for eviction
+        self.heights = []  # Min-heap of the indexed heights
+        self.highest_height = -1
+        self.reported = set()  # Index keys for which evidence was already emitted
+        self.pending = OrderedDict()  # evidence ID -> DoubleSignEvidence, not yet included in a block
+        self.stats = {"observed": 0, "expired": 0, "unsigned": 0, "invalid_signatures": 0, "evidence": 0}
+
+    @staticmethod
+    def signed_message(kind, height, round, block_hash):
+        """
+        :return: The message a validator signs for a vote or a proposal.
+        """
+        if kind == "vote":
+            return VoteAccumulator.vote_message(height, block_hash)
+        return f"proposal:{height}:{round}:{block_hash}"
+
+    def observe_vote(self, validator, height, block_hash, signature=None, round=0):
+        """
+        Indexes a signed vote.
+        :return: A DoubleSignEvidence if the vote conflicts with an earlier one, None otherwise.
+        """
+        return self._observe("vote", validator, height, round, block_hash, signature)
+
+    def observe_proposal(self, validator, height, block_hash, signature=None, round=0):
+        """
+        Indexes a signed block proposal.
+        :return: A DoubleSignEvidence if the proposal conflicts with an earlier one, None otherwise.
+        """
+        return self._observe("proposal", validator, height, round, block_hash, signature)
+
+    def _observe(self, kind, validator, height, round, block_hash, signature):
+        if signature is None:
+            self.stats["unsigned"] += 1
+            return None
+        if height <= self.highest_height - self.window:
+            self.stats["expired"] += 1
+            return None
+        self.stats["observed"] += 1
+        if height > self.highest_height:
+            self.highest_height = height
+            self._evict(height - self.window)
+
+        key = (kind, validator, height, round)
+        previous = self.signed.get(key)
+        if previous is None:
+            self.signed[key] = (block_hash, signature)
+            if height not in self.keys_by_height:
+                self.keys_by_height[height] = []
+                heapq.heappush(self.heights, height)
+            self.keys_by_height[height].append(key)
+            return None
+        if key in self.reported:
+            return None
+        if previous[0] == block_hash and self._encode(previous) == self._encode((block_hash, signature)):
+            return None  # Duplicate: BLS signatures are deterministic
+
+        # A conflicting message, or the same one under another signature: one of the two may be forged
+        if not self._verify_message(kind, validator, height, round, block_hash, signature):
+            self.stats["invalid_signatures"] += 1
+            return None
+        if not self._verify_message(kind, validator, height, round, *previous):
+            # A forged message held the index slot: the valid one takes its place
+            self.stats["invalid_signatures"] += 1
+            self.signed[key] = (block_hash, signature)
+            return None
+        if previous[0] == block_hash:
+            return None
+        evidence = DoubleSignEvidence(kind, validator, height, round, self._encode(previous),
+                                      self._encode((block_hash, signature)))
+        self.reported.add(key)
+        self.pending[evidence.evidence_id] = evidence
+        self.stats["evidence"] += 1
+        print(f"Double-signing detected: {validator} signed two {kind}s at height {height}, round {round}.")
+        return evidence
+
+    def _encode(self, message):
+        # Signatures are indexed as received (e.g. G1 points) and only encoded when they become evidence
+        block_hash, signature = message
+        if signature is not None and not isinstance(signature, str):
+            signature = self.bls.serialize_g1(signature)
+        return block_hash, signature
+
+    def _evict(self, lowest_kept):
+        while self.heights and self.heights[0] <= lowest_kept:
+            for key in self.keys_by_height.pop(heapq.heappop(self.heights)):
+                del self.signed[key]
+                self.reported.discard(key)
+
+    def _verify_message(self, kind, validator, height, round, block_hash, signature):
+        """
+        :param signature: The signature as received (G1 point) or as encoded in evidence (hex).
+        :return: True if the validator's public key is known and the signature matches the message.
+        """
+        public_key = (self.public_keys or {}).get(validator)
+        if public_key is None or signature is None:
+            return False
+        try:
+            point = self.bls.deserialize_g1(signature) if isinstance(signature, str) else signature
+            return self.bls.verify(public_key, self.signed_message(kind, height, round, block_hash), point)
+        except (AttributeError, TypeError, ValueError, AssertionError):
+            return False
+
+    def verify_evidence(self, evidence):
+        """
+        Checks that evidence (e.g. received in a block) shows two valid signatures on different messages.
+        Unsigned evidence, or evidence against a validator without a known public key, is rejected.
+        :param evidence: The DoubleSignEvidence.
+        :return: True if the evidence is valid, False otherwise.
+        """
+        if evidence.first[0] == evidence.second[0]:
+            return False
+        return all(self._verify_message(evidence.kind, evidence.validator, evidence.height, evidence.round,
+                                        block_hash, signature)
+                   for block_hash, signature in (evidence.first, evidence.second))
+
+    def take_evidence(self):
+        """
+        Returns the pending evidence to include in the next block, at most max_evidence_per_block.
+        :return: A list of evidence dictionaries.
+        """
+        return [evidence.to_dict() for evidence in islice(self.pending.values(), self.max_evidence_per_block)]
+
+    def mark_included(self, evidence_list):
+        """
+        Removes evidence included in a block from the pending pool.
+        :param evidence_list: The evidence dictionaries of the block.
+        """
+        for data in evidence_list:
+            self.pending.pop(DoubleSignEvidence.from_dict(data).evidence_id, None)
+
+
+# Example usage
+if __name__ == "__main__":
+    bls = BLSSignatures()
+    secret_key, public_key = bls.generate_keypair(1)
+    tracker = EvidenceTracker(public_keys={"Validator1": public_key})
+    sign = lambda block_hash: bls.sign(secret_key, VoteAccumulator.vote_message(10, block_hash))
+    tracker.observe_vote("Validator1", 10, "hashA", sign("hashA"))
+    tracker.observe_vote("Validator2", 10, "hashA")  # Unsigned, ignored
+    evidence = tracker.observe_vote("Validator1", 10, "hashB", sign("hashB"))
+    print("Evidence:", evidence.to_dict())
+    print("Evidence for the next block:", tracker.take_evidence())
@@ -13,6 +13,10 @@ class SlashingRules:
         self.slashing_penalty = self.config["slashing_penalty"]
         self.downtime_threshold = self.config["malicious_behavior_detection"]["downtime_threshold_seconds"]
         self.double_signing_penalty = self.slashing_penalty * 2  # Example: harsher penalty for double-signing
+        self.log_file = "monitoring/logs/slashing_events.log"
+        self.log_buffer_size = self.config["malicious_behavior_detection"].get("log_buffer_size", 64)
+        self.log_buffer = []
+        self.slashed_evidence = set()  # IDs of evidence already punished
 
     def slash_for_double_signing(self, validator, stakes):
         """
@@ -44,19 +48,44 @@ class SlashingRules:
             self.log_slashing_event(validator, "downtime", penalty)
         return stakes
 
+    def slash_for_evidence(self, evidence, stakes):
+        """
+        Penalizes the validator named in double-signing evidence, once per piece of evidence.
+        :param evidence: A DoubleSignEvidence (already verified).
+        :param stakes: A dictionary of {validator: stake} pairs.
+        :return: Updated stakes after slashing.
+        """
+        if evidence.evidence_id in self.slashed_evidence:
+            return stakes
+        self.slashed_evidence.add(evidence.evidence_id)
+        return self.slash_for_double_signing(evidence.validator, stakes)
+
     def log_slashing_event(self, validator, reason, penalty):
         """
-        Logs slashing events for auditing and monitoring.
+        Logs slashing events for auditing and monitoring. Entries are buffered and appended to the log file
+        in batches of log_buffer_size; call flush_log() at shutdown or after a block.
         :param validator: The ID of the slashed validator.
         :param reason: Reason for the slashing (e.g., 'double_signing', 'downtime').
         :param penalty: The amount of stake slashed.
         """
-        with open("monitoring/logs/slashing_events.log", "a") as log_file:
-            log_file.write(
-                f"Validator: {validator}, Reason: {reason}, Penalty: {penalty:.2f}\n"
-            )
+        self.log_buffer.append(f"Validator: {validator}, Reason: {reason}, Penalty: {penalty:.2f}\n")
+        if len(self.log_buffer) >= self.log_buffer_size:
+            self.flush_log()
         print(f"Validator {validator} slashed for {reason}. Penalty: {penalty:.2f}")
 
+    def flush_log(self):
+        """
+        Writes the buffered slashing events to the log file.
+        :return: The number of events written.
+        """
+        if not self.log_buffer:
+            return 0
+        with open(self.log_file, "a") as log_file:
+            log_file.writelines(self.log_buffer)
+        written = len(self.log_buffer)
+        self.log_buffer = []
+        return written
+
 # Example usage
 if __name__ == "__main__":
     stakes = {"Validator1": 5000, "Validator2": 3000, "Validator3": 2000}
@@ -71,3 +100,4 @@ if __name__ == "__main__":
     print("Before downtime slashing:", updated_stakes)
     updated_stakes = slashing.slash_for_downtime("Validator2", updated_stakes, downtime_seconds=600)
     print("After downtime slashing:", updated_stakes)
+    slashing.flush_log()
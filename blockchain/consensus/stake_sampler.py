@@ -0,0 +1,74 @@
+import random
+
+
+class AliasSampler:
+    """
+    Stake-weighted sampling with Vose's alias method. The table is built once in O(n) per stake
+    change; every draw afterwards is O(1), whatever the number of validators.
+    """
+
+    def __init__(self, stakes, rng=None):
+        """
+        Builds the alias table.
+        :param stakes: A dictionary of {validator_id: stake}. Validators with zero stake are never drawn.
+        :param rng: The random.Random instance used for draws; pass a seeded one for reproducible draws.
+        """
+        self.rng = rng or random.Random()
+        self.validators = list(stakes.keys())
+        weights = list(stakes.values())
+        if not self.validators:
+            raise ValueError("No validators available for sampling.")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("Stakes must not be negative.")
+        total_stake = sum(weights)
+        if total_stake <= 0:
+            raise ValueError("Total stake must be positive.")
+
+        count = len(weights)
+        self.probabilities = [0.0] * count
+        self.aliases = list(range(count))
+        scaled = [weight * count / total_stake for weight in weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding error
+        for i in small + large:
+            self.probabilities[i] = 1.0
+
+    def __len__(self):
+        return len(self.validators)
+
+    def sample(self, rng=None):
+        """
+        Draws one validator with probability proportional to its stake.
+        :param rng: Optional random.Random overriding the sampler's own, e.g. one seeded per slot.
+        :return: The selected validator's ID.
+        """
+        # A single uniform draw picks both the column and the coin flip within it
+        point = (rng or self.rng).random() * len(self.validators)
+        column = min(int(point), len(self.validators) - 1)
+        if point - column < self.probabilities[column]:
+            return self.validators[column]
+        return self.validators[self.aliases[column]]
+
+    def sample_many(self, count, rng=None):
+        """
+        Draws several validators independently (with replacement).
+        :param count: The number of draws.
+        :param rng: Optional random.Random overriding the sampler's own.
+        :return: A list of validator IDs.
+        """
+        rng = rng or self.rng
+        return [self.sample(rng) for _ in range(count)]
+
+
+# Example usage
+if __name__ == "__main__":
+    sampler = AliasSampler({"Validator1": 5000, "Validator2": 3000, "Validator3": 2000}, random.Random(42))
+    draws = sampler.sample_many(10_000)
+    print({validator: draws.count(validator) for validator in sampler.validators})
@@ -1,21 +1,35 @@
 import random
 import json
+from types import MappingProxyType
+from blockchain.consensus.stake_sampler import AliasSampler
 
 class ValidatorSelection:
     """Handles the process of selecting a validator based on stake-weighted random selection."""
 
-    def __init__(self, config_file="blockchain/consensus/consensus_config.json"):
+    def __init__(self, config_file="blockchain/consensus/consensus_config.json", seed=None):
         """
         Initializes the ValidatorSelection class by loading configuration and validator stakes.
         :param config_file: Path to the JSON configuration file.
+        :param seed: Optional seed making stake-weighted selections reproducible.
         """
         with open(config_file) as file:
             self.config = json.load(file)
         self.minimum_stake = self.config["minimum_stake"]
         self.max_validator_count = self.config["max_validator_count"]
         self.rotation_policy = self.config["validator_rotation_policy"]
-        self.validators = {}  # Format: {validator_id: stake}
+        self._validators = {}  # Format: {validator_id: stake}; changed only through the methods below
         self.current_index = 0  # Used for round-robin rotation
+        self.rng = random.Random(seed)
+        self._sampler = None  # Alias table over the current stakes, rebuilt lazily after a change
+        self._validator_ids = None  # Round-robin order, rebuilt lazily after a change
+
+    @property
+    def validators(self):
+        """
+        The current validators and their stakes, read-only: changes go through add_validator,
+        remove_validator or update_stake, which invalidate the cached sampler.
+        """
+        return MappingProxyType(self._validators)
 
     def add_validator(self, validator_id, stake):
         """
@@ -23,19 +37,38 @@ class ValidatorSelection:
         :param validator_id: The unique identifier of the validator.
         :param stake: The amount of stake the validator has.
         """
-        if len(self.validators) >= self.max_validator_count:
+        if len(self._validators) >= self.max_validator_count:
             raise Exception("Max validator count reached.")
         if stake < self.minimum_stake:
             raise Exception(f"Validator {validator_id} does not meet the minimum stake requirement.")
-        self.validators[validator_id] = stake
+        self._validators[validator_id] = stake
+        self._sampler = None
+        self._validator_ids = None
 
     def remove_validator(self, validator_id):
         """
         Removes a validator from the selection pool.
         :param validator_id: The unique identifier of the validator.
         """
-        if validator_id in self.validators:
-            del self.validators[validator_id]
+        if validator_id in self._validators:
+            del self._validators[validator_id]
+            self._sampler = None
+            self._validator_ids = None
+
+    def update_stake(self, validator_id, stake):
+        """
+        Applies a stake change event (e.g. from a StakingManager listener): the validator is added, has its
+        stake updated, or is removed once its stake falls below the minimum stake.
+        :param validator_id: The unique identifier of the validator.
+        :param stake: The validator's new stake.
+        """
+        if stake < self.minimum_stake:
+            self.remove_validator(validator_id)
+        elif validator_id not in self._validators:
+            self.add_validator(validator_id, stake)
+        elif self._validators[validator_id] != stake:
+            self._validators[validator_id] = stake
+            self._sampler = None
 
     def select_validator(self):
         """
@@ -49,27 +82,46 @@ class ValidatorSelection:
 
     def _round_robin_selection(self):
         """Implements round-robin validator selection."""
-        if not self.validators:
+        if not self._validators:
             raise Exception("No validators available for selection.")
-        validator_ids = list(self.validators.keys())
-        selected = validator_ids[self.current_index]
-        self.current_index = (self.current_index + 1) % len(validator_ids)
+        if self._validator_ids is None:
+            self._validator_ids = list(self._validators.keys())
+        self.current_index %= len(self._validator_ids)
+        selected = self._validator_ids[self.current_index]
+        self.current_index = (self.current_index + 1) % len(self._validator_ids)
         return selected
 
     def _stake_weighted_selection(self):
         """Implements stake-weighted random validator selection."""
-        if not self.validators:
+        if not self._validators:
             raise Exception("No validators available for selection.")
-        total_stake = sum(self.validators.values())
-        validators = list(self.validators.keys())
-        weights = [self.validators[v] / total_stake for v in validators]
-        selected = random.choices(validators, weights=weights, k=1)[0]
-        return selected
+        return self.get_sampler().sample()
+
+    def get_sampler(self):
+        """
+        Returns the stake-weighted sampler over the current validators, building its alias table
+        only when the stakes changed since the last selection.
+        :return: The AliasSampler.
+        """
+        if self._sampler is None:
+            self._sampler = AliasSampler(self._validators, self.rng)
+        return self._sampler
+
+    def select_committee(self, size, rng=None):
+        """
+        Draws a stake-weighted committee (with replacement, so large stakes may hold several seats).
+        :param size: The number of seats.
+        :param rng: Optional random.Random, e.g. seeded from the slot, for committees every node can recompute.
+        :return: A list of validator IDs.
+        """
+        if not self._validators:
+            raise Exception("No validators available for selection.")
+        return self.get_sampler().sample_many(size, rng)
 
     def get_validators(self):
         """
         Returns the current list of validators and their stakes.
-        :return: A dictionary of {validator_id: stake}.
+        :return: A read-only mapping of {validator_id: stake}.
         """
         return self.validators
 
@@ -89,4 +141,4 @@ if __name__ == "__main__":
 
     # Remove a validator and print the updated list
     selection.remove_validator("Validator2")
-    print("Updated Validators:", selection.get_validators())
+    print("Updated Validators:", dict(selection.get_validators()))
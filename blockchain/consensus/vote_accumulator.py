@@ -0,0 +1,238 @@
+import json
+from blockchain.cryptography.bls_signatures import BLSSignatures
+from blockchain.cryptography.hashing import Hashing
+
+
+class QuorumCertificate:
+    """
+    Proof that validators holding the quorum stake voted for a block. Signers are stored as a bitmap over
+    the sorted validator set, identified by its hash, and their BLS vote signatures are aggregated into a
+    single group element, so the certificate stays small for large sets.
+    """
+
+    def __init__(self, height, block_hash, validator_set_hash, signer_bitmap, stake, total_stake, signature=None):
+        """
+        Initializes the QuorumCertificate.
+        :param height: The block height.
+        :param block_hash: The hash of the certified block.
+        :param validator_set_hash: The hash of the validator set the bitmap refers to.
+        :param signer_bitmap: Bit i is set if the i-th validator (sorted by ID) voted.
+        :param stake: The stake that voted.
+        :param total_stake: The total stake of the validator set.
+        :param signature: The aggregate BLS signature of the signers (hex), if votes are signed.
+        """
+        self.height = height
+        self.block_hash = block_hash
+        self.validator_set_hash = validator_set_hash
+        self.signer_bitmap = signer_bitmap
+        self.stake = stake
+        self.total_stake = total_stake
+        self.signature = signature
+
+    def to_dict(self):
+        return {
+            "height": self.height,
+            "block_hash": self.block_hash,
+            "validator_set_hash": self.validator_set_hash,
+            "signers": format(self.signer_bitmap, "x"),
+            "stake": self.stake,
+            "total_stake": self.total_stake,
+            "signature": self.signature
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["height"], data["block_hash"], data["validator_set_hash"], int(data["signers"], 16),
+                   data["stake"], data["total_stake"], data.get("signature"))
+
+
+class VoteAccumulator:
+    """
+    Tallies finality votes as they arrive. Each vote is O(1): it sets the voter's bit and adds its stake to
+    the tally of (height, block hash), and a QuorumCertificate is emitted by the vote that crosses the
+    threshold. A validator's first signed vote at a height is verified before it is recorded, so a forged
+    vote cannot claim the validator's slot; the certificate then carries the aggregate of the signatures.
+    """
+
+    def __init__(self, validators, threshold=0.67, on_quorum=None, public_keys=None, evidence_tracker=None,
+                 possession_proofs=None):
+        """
+        Initializes the VoteAccumulator for an active validator set.
+        :param validators: A dictionary of {validator_id: stake}.
+        :param threshold: The fraction of the total stake required for a quorum.
+        :param on_quorum: Optional callback invoked with each QuorumCertificate when it is formed.
+        :param public_keys: Optional dictionary of {validator_id: BLS public key}. When set, every vote must
+                            carry a BLS signature of vote_message(height, block_hash).
+        :param evidence_tracker: Optional EvidenceTracker every accepted vote is reported to, so conflicting
+                                 votes become double-signing evidence.
+        :param possession_proofs: Dictionary of {validator_id: proof of possession}, required with public_keys
+                                  so that no key in an aggregate can be a rogue key.
+        """
+        if not validators:
+            raise ValueError("The active validator set is empty.")
+        self.validator_ids = sorted(validators)
+        self.positions = {validator: i for i, validator in enumerate(self.validator_ids)}
+        self.stakes = [validators[validator] for validator in self.validator_ids]
+        self.total_stake = sum(self.stakes)
+        self.quorum_stake = self.total_stake * threshold
+        self.validator_set_hash = self.hash_validator_set(validators)
+        self.on_quorum = on_quorum
+        self.evidence_tracker = evidence_tracker
+        self.bls = BLSSignatures() if public_keys is not None else None
+        self.public_keys = None
+        if public_keys is not None:
+            possession_proofs = possession_proofs or {}
+            for validator in self.validator_ids:
+                if not self._verify(self.bls.verify_possession, public_keys.get(validator),
+                                    possession_proofs.get(validator)):
+                    raise ValueError(f"Missing or invalid proof of possession for validator {validator}.")
+            self.public_keys = [public_keys[validator] for validator in self.validator_ids]
+        self.tallies = {}  # (height, block hash) -> [signer bitmap, stake, {position: signature}]
+        self.votes_by_height = {}  # height -> {validator_id: block hash}
+        self.certificates = {}  # (height, block hash) -> QuorumCertificate
+        self.stats = {"votes": 0, "duplicate_votes": 0, "conflicting_votes": 0, "unknown_validators": 0,
+                      "unsigned_votes": 0, "invalid_signatures": 0}
+
+    @staticmethod
+    def hash_validator_set(validators):
+        """
+        :param validators: A dictionary of {validator_id: stake}.
+        :return: The hash identifying a validator set.
+        """
+        return Hashing.sha256(json.dumps(sorted(validators.items())))
+
+    @staticmethod
+    def vote_message(height, block_hash):
+        """
+        :return: The message validators sign to vote for a block.
+        """
+        return f"vote:{height}:{block_hash}"
+
+    def add_vote(self, height, block_hash, validator_id, signature=None):
+        """
+        Adds one validator's vote for a block.
+        :param height: The block height.
+        :param block_hash: The hash of the block voted for.
+        :param validator_id: The voting validator.
+        :param signature: The validator's BLS signature (G1 point) of vote_message(height, block_hash).
+        :return: The QuorumCertificate if this vote completed the quorum, None otherwise.
+        """
+        position = self.positions.get(validator_id)
+        if position is None:
+            self.stats["unknown_validators"] += 1
+            return None
+        if self.public_keys is not None and signature is None:
+            self.stats["unsigned_votes"] += 1
+            return None
+        votes = self.votes_by_height.get(height, {})
+        previous = votes.get(validator_id)
+        if previous is None and self.public_keys is not None and not self._verify(
+                self.bls.verify, self.public_keys[position], self.vote_message(height, block_hash), signature):
+            self.stats["invalid_signatures"] += 1
+            return None
+        if self.evidence_tracker is not None:
+            self.evidence_tracker.observe_vote(validator_id, height, block_hash, signature)
+        if previous is not None:
+            self.stats["duplicate_votes" if previous == block_hash else "conflicting_votes"] += 1
+            return None
+        self.votes_by_height.setdefault(height, votes)[validator_id] = block_hash
+        self.stats["votes"] += 1
+
+        key = (height, block_hash)
+        tally = self.tallies.setdefault(key, [0, 0, {}])
+        tally[0] |= 1 << position
+        tally[1] += self.stakes[position]
+        if signature is not None:
+            tally[2][position] = signature
+        if key in self.certificates or tally[1] < self.quorum_stake:
+            return None
+
+        aggregate_signature = None
+        if self.public_keys is not None:
+            aggregate_signature = self.bls.serialize_g1(self.bls.aggregate(tally[2].values()))
+        certificate = QuorumCertificate(height, block_hash, self.validator_set_hash, tally[0], tally[1],
+                                        self.total_stake, aggregate_signature)
+        self.certificates[key] = certificate
+        if self.on_quorum:
+            self.on_quorum(certificate)
+        return certificate
+
+    @staticmethod
+    def _verify(check, *args):
+        """
+        Runs a BLS check on untrusted input, treating malformed points as a failed check.
+        :return: True if the check passed, False otherwise.
+        """
+        if any(arg is None for arg in args):
+            return False
+        try:
+            return check(*args)
+        except (AttributeError, TypeError, ValueError, AssertionError):
+            return False
+
+    def get_certificate(self, height, block_hash):
+        """
+        :return: The QuorumCertificate of a block, or None if it has no quorum yet.
+        """
+        return self.certificates.get((height, block_hash))
+
+    def voted_stake(self, height, block_hash):
+        """
+        :return: The stake that voted for a block so far.
+        """
+        return self.tallies.get((height, block_hash), [0, 0, {}])[1]
+
+    def verify_certificate(self, certificate):
+        """
+        Checks a (possibly received) certificate against this validator set.
+        :param certificate: The QuorumCertificate.
+        :return: True if its signers belong to this set, hold the quorum stake and, for signed votes, the
+                 aggregate signature matches their aggregate public key.
+        """
+        if certificate.validator_set_hash != self.validator_set_hash:
+            return False
+        if certificate.signer_bitmap >> len(self.stakes):
+            return False
+        stake = sum(stake for i, stake in enumerate(self.stakes) if certificate.signer_bitmap >> i & 1)
+        if stake != certificate.stake or stake < self.quorum_stake:
+            return False
+        if self.public_keys is None:
+            return True
+        if certificate.signature is None:
+            return False
+        try:
+            signature = self.bls.deserialize_g1(certificate.signature)
+        except ValueError:
+            return False
+        aggregate_public_key = self.bls.aggregate(key for i, key in enumerate(self.public_keys)
+                                                  if certificate.signer_bitmap >> i & 1)
+        return self.bls.verify(aggregate_public_key, self.vote_message(certificate.height, certificate.block_hash),
+                               signature)
+
+    def signers(self, certificate):
+        """
+        :return: The validator IDs encoded in a certificate's bitmap.
+        """
+        return [validator for i, validator in enumerate(self.validator_ids) if certificate.signer_bitmap >> i & 1]
+
+    def prune(self, below_height):
+        """
+        Drops the tallies and votes of heights below a (finalized) height.
+        :param below_height: The lowest height to keep.
+        """
+        for height in [height for height in self.votes_by_height if height < below_height]:
+            del self.votes_by_height[height]
+        for key in [key for key in self.tallies if key[0] < below_height]:
+            del self.tallies[key]
+            self.certificates.pop(key, None)
+
+
+# Example usage
+if __name__ == "__main__":
+    accumulator = VoteAccumulator({"Validator1": 5000, "Validator2": 3000, "Validator3": 2000})
+    for validator in ["Validator3", "Validator1", "Validator2"]:
+        certificate = accumulator.add_vote(5, "def456", validator)
+        print(f"Vote from {validator}: stake {accumulator.voted_stake(5, 'def456')}, quorum: {certificate is not None}")
+        if certificate:
+            print("Quorum certificate:", certificate.to_dict())
+            break
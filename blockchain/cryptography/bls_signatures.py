@@ -0,0 +1,139 @@
+from py_ecc import optimized_bn128 as bn128 # type: ignore
+import secrets
+from blockchain.cryptography.hashing import Hashing
+
+class BLSSignatures:
+    """
+    BLS signatures on the bn128 curve: signatures live in G1 and public keys in G2, so signatures on the
+    same message add up to a single G1 point checked against the sum of the signers' public keys.
+    """
+
+    def __init__(self):
+        self.order = bn128.curve_order
+        self.field_modulus = bn128.field_modulus
+
+    def generate_keypair(self, secret_key=None):
+        """
+        Generates a BLS key pair.
+        :param secret_key: Optional secret scalar; a random one is drawn otherwise.
+        :return: A tuple (secret_key, public_key), the public key being a G2 point.
+        """
+        if secret_key is None:
+            secret_key = secrets.randbelow(self.order - 1) + 1
+        return secret_key, bn128.multiply(bn128.G2, secret_key)
+
+    def hash_to_point(self, message):
+        """
+        Maps a message to a G1 point by try-and-increment (G1 has cofactor 1 on bn128, so every curve
+        point is in the group).
+        :param message: The message (string or bytes).
+        :return: The G1 point.
+        """
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        counter = 0
+        while True:
+            x = int.from_bytes(Hashing.sha256_digest(message + counter.to_bytes(4, "big")), "big") % self.field_modulus
+            rhs = (pow(x, 3, self.field_modulus) + 3) % self.field_modulus
+            y = pow(rhs, (self.field_modulus + 1) // 4, self.field_modulus)  # p = 3 mod 4
+            if y * y % self.field_modulus == rhs:
+                return (bn128.FQ(x), bn128.FQ(y), bn128.FQ.one())
+            counter += 1
+
+    def sign(self, secret_key, message):
+        """
+        Signs a message.
+        :param secret_key: The signer's secret scalar.
+        :param message: The message (string or bytes).
+        :return: The signature (G1 point).
+        """
+        return bn128.multiply(self.hash_to_point(message), secret_key)
+
+    def aggregate(self, points):
+        """
+        Adds up signatures (G1) or public keys (G2).
+        :param points: The points to aggregate.
+        :return: The aggregate point.
+        """
+        points = list(points)
+        if not points:
+            raise ValueError("Nothing to aggregate.")
+        aggregate = points[0]
+        for point in points[1:]:
+            aggregate = bn128.add(aggregate, point)
+        return aggregate
+
+    def verify(self, public_key, message, signature):
+        """
+        Verifies a signature, or an aggregate signature against the aggregate public key of signers who all
+        signed the same message, with one pairing-product check e(H(m), pk) * e(-sig, G2) == 1.
+        :param public_key: The (aggregate) public key (G2 point).
+        :param message: The message (string or bytes).
+        :param signature: The (aggregate) signature (G1 point).
+        :return: True if the signature is valid, False otherwise.
+        """
+        if bn128.is_inf(signature) or not bn128.is_on_curve(signature, bn128.b):
+            return False
+        product = (bn128.pairing(public_key, self.hash_to_point(message), final_exponentiate=False) *
+                   bn128.pairing(bn128.G2, bn128.neg(signature), final_exponentiate=False))
+        return bn128.final_exponentiate(product) == bn128.FQ12.one()
+
+    def prove_possession(self, secret_key, public_key):
+        """
+        Signs the signer's own public key. Registering validators must provide it, otherwise a rogue
+        public key could cancel out honest keys in an aggregate.
+        :return: The proof of possession (G1 point).
+        """
+        return self.sign(secret_key, b"POP" + self.serialize_g2(public_key))
+
+    def verify_possession(self, public_key, proof):
+        """
+        :return: True if the proof of possession matches the public key.
+        """
+        return self.verify(public_key, b"POP" + self.serialize_g2(public_key), proof)
+
+    def serialize_g1(self, point):
+        """
+        :return: The 64-byte encoding (affine x, y) of a G1 point as hex; zeros for the point at infinity.
+        """
+        if bn128.is_inf(point):
+            return "00" * 64
+        x, y = bn128.normalize(point)
+        return (int(x).to_bytes(32, "big") + int(y).to_bytes(32, "big")).hex()
+
+    def deserialize_g1(self, data):
+        """
+        Decodes a G1 point produced by serialize_g1.
+        :raises ValueError: If the encoding is not a point on the curve.
+        """
+        raw = bytes.fromhex(data)
+        if len(raw) != 64:
+            raise ValueError("A G1 point is encoded in 64 bytes.")
+        x, y = int.from_bytes(raw[:32], "big"), int.from_bytes(raw[32:], "big")
+        if x == 0 and y == 0:
+            return bn128.Z1
+        point = (bn128.FQ(x), bn128.FQ(y), bn128.FQ.one())
+        if x >= self.field_modulus or y >= self.field_modulus or not bn128.is_on_curve(point, bn128.b):
+            raise ValueError("Encoded point is not on the curve.")
+        return point
+
+    def serialize_g2(self, point):
+        """
+        :return: The 128-byte encoding of a G2 point.
+        """
+        x, y = bn128.normalize(point)
+        return b"".join(coefficient.to_bytes(32, "big") for value in (x, y) for coefficient in value.coeffs)
+
+
+# Example usage
+if __name__ == "__main__":
+    bls = BLSSignatures()
+    message = "5:def456"
+    keypairs = [bls.generate_keypair() for _ in range(3)]
+    signatures = [bls.sign(secret_key, message) for secret_key, _ in keypairs]
+
+    aggregate_signature = bls.aggregate(signatures)
+    aggregate_public_key = bls.aggregate(public_key for _, public_key in keypairs)
+    print("Aggregate signature:", bls.serialize_g1(aggregate_signature))
+    print("Aggregate valid:", bls.verify(aggregate_public_key, message, aggregate_signature))
+    print("Wrong message valid:", bls.verify(aggregate_public_key, "5:other", aggregate_signature))
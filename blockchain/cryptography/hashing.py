@@ -1,7 +1,210 @@
 import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+GIL_RELEASE_BYTES = 2048  # hashlib releases the GIL while hashing inputs larger than this
+PARALLEL_BATCH_BYTES = 1 << 20  # hash_many only uses threads for batches at least this large
+
+
+def to_bytes(data):
+    """
+    Returns data as a bytes-like object, encoding strings as UTF-8. bytes, bytearray and memoryview
+    are passed through without a copy.
+    :param data: The input data (string or bytes-like).
+    :return: The bytes-like data.
+    """
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return data
+
+
+def _hash_all(algorithm, items):
+    return [hashlib.new(algorithm, item).digest() for item in items]
+
+
+class Hasher:
+    """Incremental hasher over bytes-like data, for inputs built or received in pieces."""
+
+    def __init__(self, algorithm='sha256', data=None):
+        """
+        Initializes the Hasher.
+        :param algorithm: A hashlib algorithm name ('sha256', 'sha3_256', 'ripemd160', ...).
+        :param data: Optional first piece of data.
+        """
+        self.algorithm = algorithm
+        self._hash = hashlib.new(algorithm)
+        if data is not None:
+            self.update(data)
+
+    def update(self, data):
+        """
+        Feeds more data to the hasher.
+        :param data: The data (string or bytes-like).
+        :return: The Hasher, so updates can be chained.
+        """
+        self._hash.update(to_bytes(data))
+        return self
+
+    def copy(self):
+        """
+        Returns an independent copy of the hasher, e.g. to hash many suffixes of a common prefix once.
+        :return: The copied Hasher.
+        """
+        hasher = Hasher.__new__(Hasher)
+        hasher.algorithm = self.algorithm
+        hasher._hash = self._hash.copy()
+        return hasher
+
+    def digest_with(self, suffix):
+        """
+        Returns the digest of the data so far followed by suffix, leaving the hasher unchanged (e.g. to try
+        many nonces after a fixed block header prefix).
+        :param suffix: The final piece of data (string or bytes-like).
+        :return: The digest, as bytes.
+        """
+        hash_object = self._hash.copy()
+        hash_object.update(to_bytes(suffix))
+        return hash_object.digest()
+
+    def digest(self):
+        """
+        :return: The digest of the data so far, as bytes.
+        """
+        return self._hash.digest()
+
+    def hexdigest(self):
+        """
+        :return: The digest of the data so far, as a hexadecimal string.
+        """
+        return self._hash.hexdigest()
+
 
 class Hashing:
-    """Provides cryptographic hash functions for the blockchain."""
+    """
+    Provides cryptographic hash functions for the blockchain. The *_digest functions work on bytes and
+    return bytes; the hexadecimal variants are meant for API boundaries (storage, JSON, display).
+    """
+
+    @staticmethod
+    def sha256_digest(data):
+        """
+        Computes the SHA-256 digest of the given data.
+        :param data: The input data (string or bytes-like).
+        :return: The 32-byte digest.
+        """
+        return hashlib.sha256(to_bytes(data)).digest()
+
+    @staticmethod
+    def double_sha256_digest(data):
+        """
+        Computes SHA-256 applied twice, the second time to the raw first digest.
+        :param data: The input data (string or bytes-like).
+        :return: The 32-byte digest.
+        """
+        return hashlib.sha256(hashlib.sha256(to_bytes(data)).digest()).digest()
+
+    @staticmethod
+    def hash_many(items, algorithm='sha256', workers=None):
+        """
+        Hashes a batch of inputs. Large batches of large inputs are split across a thread pool, which
+        runs in parallel because hashlib releases the GIL on inputs over GIL_RELEASE_BYTES.
+        :param items: A list of inputs (strings or bytes-like).
+        :param algorithm: A hashlib algorithm name.
+        :param workers: Number of threads (defaults to the CPU count); 1 hashes inline.
+        :return: The list of digests (bytes), in input order.
+        """
+        items = [to_bytes(item) for item in items]
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        total_bytes = sum(len(item) for item in items)
+        if workers <= 1 or total_bytes < PARALLEL_BATCH_BYTES or total_bytes < GIL_RELEASE_BYTES * len(items):
+            return _hash_all(algorithm, items)
+        chunk_size = -(-len(items) // workers)
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return [digest for digests in executor.map(_hash_all, [algorithm] * len(chunks), chunks)
+                    for digest in digests]
+
+    @staticmethod
+    def meets_difficulty(digest, difficulty):
+        """
+        Checks that a digest starts with the given number of zero hexadecimal digits, without converting it to hex.
+        :param digest: The digest (bytes).
+        :param difficulty: The number of leading zero hexadecimal digits required.
+        :return: True if the digest meets the difficulty (never for more digits than the digest has).
+        """
+        full_bytes, half_byte = divmod(difficulty, 2)
+        if full_bytes + half_byte > len(digest) or digest[:full_bytes].count(0) != full_bytes:
+            return False
+        return not half_byte or digest[full_bytes] < 16
+
+    @staticmethod
+    def merkle_root_digest(digests, hash_function=None):
+        """
+        Computes a Merkle root over leaf digests, hashing the concatenated raw digests of each pair
+        (the last digest of an odd level is paired with itself).
+        :param digests: A list of leaf digests (bytes).
+        :param hash_function: Optional function hashing a pair to a digest (SHA-256 by default).
+        :return: The root digest, or None without leaves.
+        """
+        level = list(digests)
+        if not level:
+            return None
+        while len(level) > 1:
+            if len(level) % 2 != 0:
+                level.append(level[-1])
+            pairs = [level[i] + level[i + 1] for i in range(0, len(level), 2)]
+            if hash_function is None:
+                level = [hashlib.sha256(pair).digest() for pair in pairs]
+            else:
+                level = [hash_function(pair) for pair in pairs]
+        return level[0]
+
+    @staticmethod
+    def merkle_levels(digests, hash_function=None):
+        """
+        Builds every level of a Merkle tree with the pairing of merkle_root_digest, for callers that need
+        proofs and not only the root.
+        :param digests: A list of leaf digests (bytes).
+        :param hash_function: Optional function hashing a pair to a digest (SHA-256 by default).
+        :return: The levels as lists of digests, leaves first and the root level last (empty without leaves).
+        """
+        hash_function = hash_function or Hashing.sha256_digest
+        levels = [list(digests)] if digests else []
+        while levels and len(levels[-1]) > 1:
+            level = levels[-1]
+            level = level + [level[-1]] if len(level) % 2 != 0 else level
+            levels.append([hash_function(level[i] + level[i + 1]) for i in range(0, len(level), 2)])
+        return levels
+
+    @staticmethod
+    def merkle_path(levels, index):
+        """
+        :param levels: The levels of a Merkle tree (merkle_levels()).
+        :param index: The position of the leaf.
+        :return: The sibling digests from the leaf up to the root.
+        """
+        path = []
+        for level in levels[:-1]:
+            sibling = index ^ 1
+            path.append(level[sibling] if sibling < len(level) else level[index])
+            index //= 2
+        return path
+
+    @staticmethod
+    def merkle_root_from_path(digest, path, index, hash_function=None):
+        """
+        Recomputes a Merkle root from a leaf digest and its path (merkle_path()).
+        :param digest: The leaf digest (bytes).
+        :param path: The sibling digests from the leaf up to the root.
+        :param index: The position of the leaf, which orders each pair.
+        :param hash_function: Optional function hashing a pair to a digest (SHA-256 by default).
+        :return: The root digest.
+        """
+        hash_function = hash_function or Hashing.sha256_digest
+        for sibling in path:
+            digest = hash_function(sibling + digest if index % 2 else digest + sibling)
+            index //= 2
+        return digest
 
     @staticmethod
     def sha256(data):
@@ -10,9 +213,7 @@ class Hashing:
         :param data: The input data (string or bytes).
         :return: The SHA-256 hash as a hexadecimal string.
         """
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        return hashlib.sha256(data).hexdigest()
+        return Hashing.sha256_digest(data).hex()
 
     @staticmethod
     def keccak256(data):
@@ -21,9 +222,7 @@ class Hashing:
         :param data: The input data (string or bytes).
         :return: The Keccak-256 hash as a hexadecimal string.
         """
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        return hashlib.new('sha3_256', data).hexdigest()
+        return hashlib.new('sha3_256', to_bytes(data)).hexdigest()
 
     @staticmethod
     def double_sha256(data):
@@ -32,7 +231,7 @@ class Hashing:
         :param data: The input data (string or bytes).
         :return: The double SHA-256 hash as a hexadecimal string.
         """
-        return Hashing.sha256(Hashing.sha256(data))
+        return Hashing.double_sha256_digest(data).hex()
 
     @staticmethod
     def ripemd160(data):
@@ -41,11 +240,7 @@ class Hashing:
         :param data: The input data (string or bytes).
         :return: The RIPEMD-160 hash as a hexadecimal string.
         """
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        ripemd160 = hashlib.new('ripemd160')
-        ripemd160.update(data)
-        return ripemd160.hexdigest()
+        return Hasher('ripemd160', data).hexdigest()
 
     @staticmethod
     def hash160(data):
@@ -54,26 +249,20 @@ class Hashing:
         :param data: The input data (string or bytes).
         :return: The HASH160 as a hexadecimal string.
         """
-        return Hashing.ripemd160(Hashing.sha256(data))
+        return Hashing.ripemd160(Hashing.sha256_digest(data))
 
     @staticmethod
     def merkle_root(hashes):
         """
-        Computes the Merkle root from a list of transaction hashes.
+        Computes the Merkle root from a list of transaction hashes, double-hashing the concatenated raw
+        digests of each pair.
         :param hashes: A list of transaction hashes (hexadecimal strings).
         :return: The Merkle root as a hexadecimal string.
         """
         if not hashes:
             return None
-        while len(hashes) > 1:
-            if len(hashes) % 2 != 0:  # Duplicate the last hash if odd number of hashes
-                hashes.append(hashes[-1])
-            new_level = []
-            for i in range(0, len(hashes), 2):
-                concatenated_hash = Hashing.double_sha256(hashes[i] + hashes[i + 1])
-                new_level.append(concatenated_hash)
-            hashes = new_level
-        return hashes[0]
+        leaves = [bytes.fromhex(transaction_hash) for transaction_hash in hashes]
+        return Hashing.merkle_root_digest(leaves, Hashing.double_sha256_digest).hex()
 
 
 # Example usage
@@ -1,7 +1,6 @@
 import os
 import json
 import base64
-import hashlib
 from mnemonic import Mnemonic # type: ignore
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC # type: ignore
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes # type: ignore
@@ -1,96 +1,49 @@
-import hashlib
+from blockchain.cryptography.hashing import Hashing
 
 class MerkleTree:
-    """Represents a Merkle Tree and provides tools for generating and verifying Merkle proofs."""
+    """
+    Represents a Merkle Tree and provides tools for generating and verifying Merkle proofs. Leaves are the
+    SHA-256 digests of the transactions and pairs hash their concatenated raw digests, as in
+    Block.compute_merkle_root: the root of the JSON-encoded transactions of a block is its Merkle root.
+    """
 
     def __init__(self, transactions):
         """
         Initializes the Merkle Tree with a list of transactions.
         :param transactions: A list of transactions (strings or bytes).
         """
-        self.leaves = [self._hash(tx) for tx in transactions]
-        self.root = self._build_merkle_tree(self.leaves)
-
-    def _hash(self, data):
-        """
-        Computes the SHA-256 hash of the given data.
-        :param data: The input data (string or bytes).
-        :return: The SHA-256 hash as a hexadecimal string.
-        """
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        return hashlib.sha256(data).hexdigest()
-
-    def _build_merkle_tree(self, leaves):
-        """
-        Builds the Merkle Tree and computes the Merkle Root.
-        :param leaves: A list of hashed leaf nodes.
-        :return: The Merkle Root as a hexadecimal string.
-        """
-        while len(leaves) > 1:
-            if len(leaves) % 2 != 0:  # Duplicate the last hash if odd number of leaves
-                leaves.append(leaves[-1])
-            new_level = []
-            for i in range(0, len(leaves), 2):
-                combined_hash = self._hash(leaves[i] + leaves[i + 1])
-                new_level.append(combined_hash)
-            leaves = new_level
-        return leaves[0]
+        self.levels = Hashing.merkle_levels(Hashing.hash_many(transactions))
+        self.leaves = [digest.hex() for digest in self.levels[0]] if self.levels else []
+        self.root = self.levels[-1][0].hex() if self.levels else None
 
     def get_proof(self, transaction):
         """
         Generates a Merkle proof for a given transaction.
         :param transaction: The transaction to prove.
-        :return: A list of proof nodes and the transaction's index.
+        :return: A tuple (proof, index) of the sibling hashes and the transaction's index.
         """
-        if isinstance(transaction, str):
-            transaction = transaction.encode('utf-8')
-        transaction_hash = self._hash(transaction)
-
+        transaction_hash = Hashing.sha256(transaction)
         if transaction_hash not in self.leaves:
             raise ValueError("Transaction not found in the Merkle Tree.")
 
         index = self.leaves.index(transaction_hash)
-        proof = []
-        current_level = self.leaves
-
-        while len(current_level) > 1:
-            if len(current_level) % 2 != 0:  # Duplicate the last hash if odd number of leaves
-                current_level.append(current_level[-1])
-
-            pair_index = index ^ 1  # Sibling index
-            proof.append(current_level[pair_index])
-
-            # Move to the next level
-            index //= 2
-            new_level = []
-            for i in range(0, len(current_level), 2):
-                combined_hash = self._hash(current_level[i] + current_level[i + 1])
-                new_level.append(combined_hash)
-            current_level = new_level
-
-        return proof
+        return [digest.hex() for digest in Hashing.merkle_path(self.levels, index)], index
 
     @staticmethod
-    def verify_proof(transaction, proof, root):
+    def verify_proof(transaction, proof, root, index):
         """
         Verifies a Merkle proof.
         :param transaction: The original transaction.
         :param proof: The Merkle proof as a list of sibling hashes.
         :param root: The Merkle root to verify against.
+        :param index: The position of the transaction, which orders each pair.
         :return: True if the proof is valid, False otherwise.
         """
-        if isinstance(transaction, str):
-            transaction = transaction.encode('utf-8')
-        current_hash = hashlib.sha256(transaction).hexdigest()
-
-        for sibling_hash in proof:
-            if current_hash < sibling_hash:
-                current_hash = hashlib.sha256((current_hash + sibling_hash).encode('utf-8')).hexdigest()
-            else:
-                current_hash = hashlib.sha256((sibling_hash + current_hash).encode('utf-8')).hexdigest()
-
-        return current_hash == root
+        try:
+            path = [bytes.fromhex(sibling_hash) for sibling_hash in proof]
+        except (TypeError, ValueError):
+            return False
+        return Hashing.merkle_root_from_path(Hashing.sha256_digest(transaction), path, index).hex() == root
 
 
 # Example usage
@@ -104,14 +57,14 @@ if __name__ == "__main__":
 
     # Generate a proof for a specific transaction
     transaction = "tx2"
-    proof = merkle_tree.get_proof(transaction)
+    proof, index = merkle_tree.get_proof(transaction)
     print(f"Merkle Proof for {transaction}:", proof)
 
     # Verify the proof
-    is_valid = MerkleTree.verify_proof(transaction, proof, merkle_tree.root)
+    is_valid = MerkleTree.verify_proof(transaction, proof, merkle_tree.root, index)
     print(f"Proof Valid for {transaction}: {is_valid}")
 
     # Verify with a tampered transaction (should fail)
     tampered_transaction = "tx2_tampered"
-    is_valid = MerkleTree.verify_proof(tampered_transaction, proof, merkle_tree.root)
+    is_valid = MerkleTree.verify_proof(tampered_transaction, proof, merkle_tree.root, index)
     print(f"Proof Valid for Tampered Transaction: {is_valid}")
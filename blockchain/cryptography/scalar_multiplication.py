@@ -0,0 +1,146 @@
+from py_ecc import bn128, optimized_bn128 # type: ignore
+
+# Affine points (as used by py_ecc.bn128) pay a field inversion on every addition; projective points
+# (py_ecc.optimized_bn128) defer it to a single inversion when the result is converted back.
+_PROJECTIVE = (optimized_bn128.add, optimized_bn128.double, optimized_bn128.Z1, optimized_bn128.is_inf)
+_AFFINE = (bn128.add, bn128.double, bn128.Z1, bn128.is_inf)
+
+
+def to_projective(point):
+    """
+    Converts an affine bn128 G1 point to projective coordinates.
+    :param point: A point (x, y) of py_ecc.bn128, or None for the point at infinity.
+    :return: The point (X, Y, Z) of py_ecc.optimized_bn128.
+    """
+    if point is None:
+        return optimized_bn128.Z1
+    return (optimized_bn128.FQ(point[0].n), optimized_bn128.FQ(point[1].n), optimized_bn128.FQ.one())
+
+
+def to_affine(point):
+    """
+    Converts a projective G1 point back to affine bn128 coordinates (one field inversion).
+    :param point: A point (X, Y, Z) of py_ecc.optimized_bn128.
+    :return: The point (x, y) of py_ecc.bn128, or None for the point at infinity.
+    """
+    if optimized_bn128.is_inf(point):
+        return None
+    x, y = optimized_bn128.normalize(point)
+    return (bn128.FQ(x.n), bn128.FQ(y.n))
+
+
+def multiply(point, scalar, projective=True):
+    """
+    Generic double-and-add scalar multiplication, for bases that are not worth a table.
+    :param point: An affine bn128 G1 point.
+    :param scalar: The scalar (reduced modulo the curve order, so negative scalars are allowed).
+    :param projective: Whether to compute in projective coordinates.
+    :return: The affine product.
+    """
+    scalar %= bn128.curve_order
+    if not projective:
+        return bn128.multiply(point, scalar)
+    return to_affine(optimized_bn128.multiply(to_projective(point), scalar))
+
+
+class FixedBaseTable:
+    """
+    Precomputed windowed table for multiplying a fixed base (e.g. the generator G1) by many scalars.
+    Row i holds d * 2^(window * i) * P for every window digit d, so a product is the sum of one entry
+    per window: about 254 / window additions and no doublings, against ~254 doublings and ~127
+    additions for double-and-add.
+    """
+
+    def __init__(self, point, window=4, projective=True):
+        """
+        Builds the table ((2^window - 1) additions per window, paid once per base).
+        :param point: The fixed affine bn128 G1 point.
+        :param window: Number of scalar bits per window; larger windows trade memory for fewer additions.
+        :param projective: Whether to store and add points in projective coordinates.
+        """
+        self.point = point
+        self.window = window
+        self.projective = projective
+        self.add, _, self.zero, _ = _PROJECTIVE if projective else _AFFINE
+        self.windows = -(-bn128.curve_order.bit_length() // window)
+
+        base = to_projective(point) if projective else point
+        self.rows = []
+        for _ in range(self.windows):
+            row = [self.zero, base]
+            for _ in range(2, 1 << window):
+                row.append(self.add(row[-1], base))
+            self.rows.append(row)
+            base = self.add(row[-1], base)  # 2^window * base
+        self.mask = (1 << window) - 1
+
+    def multiply(self, scalar):
+        """
+        Multiplies the fixed base by a scalar using the table.
+        :param scalar: The scalar (reduced modulo the curve order).
+        :return: The affine product.
+        """
+        scalar %= bn128.curve_order
+        result = self.zero
+        for row in self.rows:
+            digit = scalar & self.mask
+            if digit:
+                result = self.add(result, row[digit])
+            scalar >>= self.window
+            if not scalar:
+                break
+        return to_affine(result) if self.projective else result
+
+
+def multi_scalar_multiply(points, scalars, projective=True, window=None):
+    """
+    Computes sum(scalar_i * point_i) with Pippenger's bucket method: per window, each point is added
+    once to the bucket of its digit and the buckets are combined with a running sum, so n products cost
+    about (254 / window) * (n + 2^(window + 1)) additions instead of n full multiplications.
+    :param points: The affine bn128 G1 points.
+    :param scalars: The scalars, one per point.
+    :param projective: Whether to compute in projective coordinates.
+    :param window: Number of scalar bits per window (chosen from the number of points by default).
+    :return: The affine sum.
+    """
+    points, scalars = list(points), [scalar % bn128.curve_order for scalar in scalars]
+    if len(points) != len(scalars):
+        raise ValueError("Expected one scalar per point.")
+    add, double, zero, is_inf = _PROJECTIVE if projective else _AFFINE
+    if projective:
+        points = [to_projective(point) for point in points]
+    if window is None:
+        window = max(1, len(points).bit_length() - 2)
+
+    mask = (1 << window) - 1
+    result = zero
+    for shift in reversed(range(0, max(scalars, default=0).bit_length(), window)):
+        for _ in range(window):
+            result = double(result) if not is_inf(result) else result
+        buckets = [zero] * mask
+        for point, scalar in zip(points, scalars):
+            digit = (scalar >> shift) & mask
+            if digit:
+                buckets[digit - 1] = add(buckets[digit - 1], point)
+        # Sum of d * bucket[d] as a running sum from the highest digit down
+        running, window_sum = zero, zero
+        for bucket in reversed(buckets):
+            running = add(running, bucket)
+            window_sum = add(window_sum, running)
+        result = add(result, window_sum)
+    return to_affine(result) if projective else result
+
+
+# Example usage
+if __name__ == "__main__":
+    import random
+    table = FixedBaseTable(bn128.G1)
+    scalar = random.randint(1, bn128.curve_order - 1)
+    print("Table matches double-and-add:", table.multiply(scalar) == bn128.multiply(bn128.G1, scalar))
+
+    points = [bn128.multiply(bn128.G1, i + 2) for i in range(8)]
+    scalars = [random.randint(1, bn128.curve_order - 1) for _ in points]
+    expected = None
+    for point, scalar in zip(points, scalars):
+        expected = bn128.add(expected, bn128.multiply(point, scalar))
+    print("Pippenger matches the naive sum:", multi_scalar_multiply(points, scalars) == expected)
@@ -1,15 +1,71 @@
 from py_ecc import bn128 # type: ignore
-from hashlib import sha256
 import random
 import json
+import secrets
+from blockchain.cryptography.scalar_multiplication import FixedBaseTable, multi_scalar_multiply, multiply
+from blockchain.cryptography.hashing import Hashing
 
 class ZeroKnowledgeProofs:
     """Implements basic Zero-Knowledge Proofs using zk-SNARK concepts and bn128 curve."""
 
-    def __init__(self):
+    _generator_tables = {}  # {(window, projective): FixedBaseTable of G1}, shared by all instances
+
+    def __init__(self, window=6, projective=True):
+        """
+        :param window: Window size of the precomputed generator table.
+        :param projective: Whether scalar multiplications run in projective coordinates.
+        """
         # Generator point on the bn128 curve
         self.G = bn128.G1
         self.order = bn128.curve_order
+        self.projective = projective
+        key = (window, projective)
+        if key not in self._generator_tables:
+            self._generator_tables[key] = FixedBaseTable(self.G, window, projective)
+        self.G_table = self._generator_tables[key]
+
+    @staticmethod
+    def point_to_ints(point):
+        """
+        :return: The affine coordinates of a bn128 point as integers (None for the point at infinity).
+        """
+        return None if point is None else [int(coordinate.n) for coordinate in point]
+
+    @staticmethod
+    def point_from_ints(coordinates):
+        """
+        :return: The bn128 point with the given integer coordinates.
+        :raises ValueError: If the coordinates are not a point of the curve.
+        """
+        if coordinates is None:
+            return None
+        point = (bn128.FQ(coordinates[0]), bn128.FQ(coordinates[1]))
+        if not bn128.is_on_curve(point, bn128.b):
+            raise ValueError("Point is not on the bn128 curve.")
+        return point
+
+    def serialize_proof(self, proof):
+        """
+        Converts a proof to a JSON-serializable dictionary (e.g. to embed it in a transaction).
+        :param proof: The proof object generated by generate_proof.
+        :return: The proof with its points as integer coordinates.
+        """
+        return dict(proof, commitment=self.point_to_ints(proof["commitment"]),
+                    statement=self.point_to_ints(proof["statement"]))
+
+    def deserialize_proof(self, data):
+        """
+        Inverse of serialize_proof.
+        :raises ValueError: If a point is not on the curve.
+        """
+        return dict(data, commitment=self.point_from_ints(data["commitment"]),
+                    statement=self.point_from_ints(data["statement"]))
+
+    def compute_challenge(self, commitment, statement):
+        """
+        Derives the Fiat-Shamir challenge of a proof from its commitment and statement.
+        """
+        return self.hash_to_scalar(json.dumps((self.point_to_ints(commitment), self.point_to_ints(statement))))
 
     def hash_to_scalar(self, data):
         """
@@ -19,8 +75,7 @@ class ZeroKnowledgeProofs:
         """
         if isinstance(data, str):
             data = data.encode('utf-8')
-        hashed = sha256(data).hexdigest()
-        return int(hashed, 16) % self.order
+        return int.from_bytes(Hashing.sha256_digest(data), "big") % self.order
 
     def generate_proof(self, secret, statement):
         """
@@ -33,8 +88,8 @@ class ZeroKnowledgeProofs:
         random_scalar = random.randint(1, self.order - 1)
 
         # Compute commitment and challenge
-        commitment = bn128.multiply(self.G, random_scalar)
-        challenge = self.hash_to_scalar(json.dumps((commitment, statement)))
+        commitment = self.G_table.multiply(random_scalar)
+        challenge = self.compute_challenge(commitment, statement)
 
         # Compute response
         response = (random_scalar + challenge * secret_scalar) % self.order
@@ -57,10 +112,14 @@ class ZeroKnowledgeProofs:
         response = proof["response"]
         statement = proof["statement"]
 
+        if challenge != self.compute_challenge(commitment, statement):
+            print("Proof verification failed: challenge mismatch.")
+            return False
+
         # Recalculate the expected commitment
         expected_commitment = bn128.add(
-            bn128.multiply(self.G, response),
-            bn128.multiply(statement, -challenge)
+            self.G_table.multiply(response),
+            multiply(statement, -challenge, self.projective)
         )
 
         # Verify if recalculated commitment matches the provided commitment
@@ -71,6 +130,47 @@ class ZeroKnowledgeProofs:
             print("Proof verification failed.")
             return False
 
+    def batch_verify(self, proofs):
+        """
+        Verifies many proofs at once. Each proof states response * G - challenge * statement - commitment = 0;
+        the equations are summed with random 128-bit weights, so the batch costs one table multiplication
+        and one multi-scalar multiplication, and an invalid proof passes with probability about 2^-128.
+        :param proofs: List of proof objects generated by generate_proof.
+        :return: True if every proof is valid, False otherwise (see find_invalid_proofs).
+        """
+        points, scalars, generator_scalar = [], [], 0
+        for proof in proofs:
+            if proof["challenge"] != self.compute_challenge(proof["commitment"], proof["statement"]):
+                return False
+            weight = secrets.randbits(128)
+            generator_scalar += weight * proof["response"]
+            points += [proof["statement"], proof["commitment"]]
+            scalars += [-weight * proof["challenge"], -weight]
+        if not points:
+            return True
+        combination = bn128.add(self.G_table.multiply(generator_scalar),
+                                multi_scalar_multiply(points, scalars, self.projective))
+        return combination is None
+
+    def find_invalid_proofs(self, proofs):
+        """
+        Locates the invalid proofs of a batch by bisection: halves that pass batch_verify are cleared
+        whole, so k bad proofs among n cost about 2k log(n) batch checks.
+        :param proofs: List of proof objects.
+        :return: The sorted indices of the invalid proofs.
+        """
+        invalid, pending = [], [(0, len(proofs))]
+        while pending:
+            start, end = pending.pop()
+            if end <= start or self.batch_verify(proofs[start:end]):
+                continue
+            if end - start == 1:
+                invalid.append(start)
+            else:
+                middle = (start + end) // 2
+                pending += [(middle, end), (start, middle)]
+        return sorted(invalid)
+
     def generate_commitment(self, secret):
         """
         Generates a public commitment from a secret.
@@ -78,7 +178,7 @@ class ZeroKnowledgeProofs:
         :return: The commitment as a point on the bn128 curve.
         """
         secret_scalar = self.hash_to_scalar(secret)
-        return bn128.multiply(self.G, secret_scalar)
+        return self.G_table.multiply(secret_scalar)
 
 
 # Example usage
@@ -103,3 +203,9 @@ if __name__ == "__main__":
     tampered_proof["statement"] = bn128.multiply(zk.G, random.randint(1, zk.order - 1))
     is_valid = zk.verify_proof(tampered_proof)
     print("Tampered Proof Valid:", is_valid)
+
+    # Verify a batch at once and locate the bad proof
+    proofs = [zk.generate_proof(f"secret{i}", zk.generate_commitment(f"secret{i}")) for i in range(8)]
+    print("Batch Valid:", zk.batch_verify(proofs))
+    proofs[5] = dict(proofs[5], response=(proofs[5]["response"] + 1) % zk.order)
+    print("Batch Valid After Tampering:", zk.batch_verify(proofs), "Invalid:", zk.find_invalid_proofs(proofs))
@@ -1,8 +1,8 @@
-import hashlib
 import random
 import json
 from collections import defaultdict
 import logging
+from blockchain.cryptography.hashing import Hasher
 
 # Configure logging
 logging.basicConfig(
@@ -113,18 +113,18 @@ class KademliaDHT:
         :param data: The data to hash.
         :return: The hexadecimal hash of the data.
         """
-        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+        return Hasher('sha1', data).hexdigest()
 
 
 # Example usage
 if __name__ == "__main__":
     # Initialize the DHT with a node ID
-    my_node_id = hashlib.sha1(b"my_node").hexdigest()
+    my_node_id = Hasher('sha1', b"my_node").hexdigest()
     dht = KademliaDHT(node_id=my_node_id)
 
     # Add peers to the routing table
     for i in range(5):
-        peer_id = hashlib.sha1(f"peer{i}".encode("utf-8")).hexdigest()
+        peer_id = Hasher('sha1', f"peer{i}").hexdigest()
         dht.add_peer(peer_id, f"peer{i}.example.com:500{i}")
 
     # Store and retrieve data
@@ -0,0 +1,387 @@
+import base64
+import json
+import os
+import socket
+import struct
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from blockchain.blocks.block import Block
+from blockchain.blocks.validation_pipeline import ValidationPipeline
+from blockchain.state.chunked_snapshot import MANIFEST_FILE, ChunkedSnapshotReader
+from blockchain.cryptography.hashing import Hashing
+
+_FRAME = struct.Struct(">I")
+
+DEFAULT_CONFIG = {
+    "max_parallel_downloads": 8,
+    "chunk_retries": 3,
+    "block_batch_size": 100,
+    "min_manifest_agreement": 0.5,
+    "connection_timeout": 5
+}
+
+
+def send_frame(sock, message):
+    """
+    Sends a length-prefixed JSON message (snapshot chunks do not fit in a single recv).
+    :param sock: The connected socket.
+    :param message: The message (dict).
+    """
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(data)) + data)
+
+
+def recv_frame(sock):
+    """
+    Receives a length-prefixed JSON message.
+    :param sock: The connected socket.
+    :return: The message (dict).
+    """
+    def recv_exact(size):
+        data = bytearray()
+        while len(data) < size:
+            part = sock.recv(size - len(data))
+            if not part:
+                raise ConnectionError("Connection closed while receiving a message.")
+            data += part
+        return bytes(data)
+
+    (length,) = _FRAME.unpack(recv_exact(_FRAME.size))
+    return json.loads(recv_exact(length).decode("utf-8"))
+
+
+class SnapshotServer:
+    """Serves the latest chunked snapshot and the blocks after it to nodes in state-sync mode."""
+
+    def __init__(self, snapshot_manager, get_blocks, host="0.0.0.0", port=5100):
+        """
+        Initializes the SnapshotServer.
+        :param snapshot_manager: The StateSnapshot instance holding chunked snapshots.
+        :param get_blocks: Callable (from_height, count) -> list of block dictionaries.
+        :param host: Host to listen on when started as a TCP service.
+        :param port: Port to listen on when started as a TCP service.
+        """
+        self.snapshot_manager = snapshot_manager
+        self.get_blocks = get_blocks
+        self.host = host
+        self.port = port
+        self.readers = {}  # block_height -> ChunkedSnapshotReader
+
+    def _reader(self, block_height):
+        if block_height not in self.readers:
+            self.readers[block_height] = ChunkedSnapshotReader(self.snapshot_manager._chunked_dir(block_height))
+        return self.readers[block_height]
+
+    def handle_request(self, message):
+        """
+        Handles a state-sync request.
+        :param message: The request message.
+        :return: The response message.
+        """
+        msg_type = message.get("type")
+        data = message.get("data") or {}
+        try:
+            if msg_type == "snapshot_manifest_request":
+                _, block_height = self.snapshot_manager.get_latest_chunked_snapshot()
+                return {"type": "snapshot_manifest", "data": self._reader(block_height).manifest}
+            if msg_type == "snapshot_chunk_request":
+                chunk = self._reader(data["block_height"]).read_chunk(data["index"])
+                return {"type": "snapshot_chunk", "data": base64.b64encode(chunk).decode("ascii")}
+            if msg_type == "blocks_request":
+                return {"type": "blocks", "data": self.get_blocks(data["from_height"], data["count"])}
+        except (FileNotFoundError, IndexError, KeyError, ValueError) as e:
+            return {"type": "error", "data": str(e)}
+        return {"type": "error", "data": f"Unknown message type: {msg_type}"}
+
+    def start(self):
+        """Starts serving state-sync requests over TCP."""
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.bind((self.host, self.port))
+        server_socket.listen()
+        print(f"Snapshot server started on {self.host}:{self.port}")
+        threading.Thread(target=self._accept_connections, args=(server_socket,), daemon=True).start()
+
+    def _accept_connections(self, server_socket):
+        while True:
+            client_socket, _ = server_socket.accept()
+            threading.Thread(target=self._handle_connection, args=(client_socket,), daemon=True).start()
+
+    def _handle_connection(self, client_socket):
+        with client_socket:
+            try:
+                send_frame(client_socket, self.handle_request(recv_frame(client_socket)))
+            except (ConnectionError, json.JSONDecodeError):
+                print("State-sync peer disconnected.")
+
+
+class SocketPeer:
+    """A remote SnapshotServer reached over TCP."""
+
+    def __init__(self, address, timeout=5):
+        """
+        Initializes the SocketPeer.
+        :param address: Address of the peer (e.g., "node1.example.com:5100").
+        :param timeout: Connection timeout in seconds.
+        """
+        self.address = address
+        host, port = address.split(":")
+        self.host, self.port = host, int(port)
+        self.timeout = timeout
+
+    def request(self, message):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conn:
+            send_frame(conn, message)
+            return recv_frame(conn)
+
+
+class LocalPeer:
+    """An in-process SnapshotServer, used by the local multi-node test harness."""
+
+    def __init__(self, address, server):
+        self.address = address
+        self.server = server
+
+    def request(self, message):
+        # Round-trip through JSON like the network transport would
+        return json.loads(json.dumps(self.server.handle_request(json.loads(json.dumps(message)))))
+
+
+# Tables the state root commits to (see StateManager.commit_state_root); anything else in a snapshot is unverified
+SYNCED_TABLES = ("balances", "nonces", "utxo_set", "smart_contracts", "contract_storage")
+
+
+def block_from_dict(data):
+    """
+    Rebuilds a block received from a peer, keeping its timestamp and claimed hash so that validation
+    checks them instead of recomputing them.
+    :param data: The block dictionary (Block.to_dict()).
+    :return: The Block.
+    """
+    block = Block.from_dict(data)
+    block.timestamp = data["timestamp"]
+    block.hash = data["hash"]
+    return block
+
+
+class StateSyncClient:
+    """
+    Brings a fresh node up to date from a recent snapshot instead of replaying the whole chain:
+    agree on a manifest, download its chunks from several peers in parallel, verify them,
+    check the restored state against the manifest's state root and replay only the newer blocks.
+
+    Chunks are only checked against the hashes listed in the manifest, which is trusted through peer
+    agreement (or trusted_state_root); the state root covers the snapshot as a whole, so it can only be
+    checked once every chunk is downloaded and the state is decoded in memory. That check runs before
+    the state is swapped in, so a snapshot with a forged state never replaces the current one.
+    """
+
+    def __init__(self, peers, state_manager, snapshot_dir="blockchain/state/snapshots", config=None,
+                 trusted_state_root=None, blockchain=None, difficulty=2, require_signatures=False):
+        """
+        Initializes the StateSyncClient.
+        :param peers: Peers exposing request(message) -> response (SocketPeer or LocalPeer).
+        :param state_manager: The StateManager to restore into.
+        :param snapshot_dir: Directory where downloaded chunks are stored.
+        :param config: The "state_sync" section of network_config.json (defaults are used for missing keys).
+        :param trusted_state_root: Optional state root from a trusted source (e.g. a checkpoint);
+                                   only manifests committing to it are accepted.
+        :param blockchain: The Blockchain replayed blocks are validated against and appended to; it is
+                           restarted at the snapshot block.
+        :param difficulty: The proof-of-work difficulty of replayed blocks.
+        :param require_signatures: Whether replayed blocks with unsigned transactions are rejected.
+        """
+        self.peers = list(peers)
+        self.state_manager = state_manager
+        self.snapshot_dir = snapshot_dir
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.trusted_state_root = trusted_state_root
+        self.blockchain = blockchain
+        self.difficulty = difficulty
+        self.require_signatures = require_signatures
+        self.stats = {"chunks_per_peer": Counter(), "failed_chunk_requests": 0, "blocks_replayed": 0}
+
+    @staticmethod
+    def _manifest_id(manifest):
+        content = {
+            "block_height": manifest["block_height"],
+            "state_root": manifest["state_root"],
+            "block_hash": manifest.get("block_hash"),
+            "chunks": [chunk["hash"] for chunk in manifest["chunks"]]
+        }
+        return Hashing.sha256(json.dumps(content, sort_keys=True))
+
+    def _ask(self, peer, message):
+        try:
+            response = peer.request(message)
+        except (OSError, ConnectionError, ValueError) as e:
+            print(f"State-sync request to {peer.address} failed: {e}")
+            return None
+        return response if response.get("type") != "error" else None
+
+    def select_manifest(self):
+        """
+        Fetches manifests from all peers and selects the one most of them agree on.
+        :return: A tuple (manifest, peers serving it).
+        """
+        with ThreadPoolExecutor(max_workers=max(1, len(self.peers))) as pool:
+            responses = list(pool.map(lambda peer: self._ask(peer, {"type": "snapshot_manifest_request"}), self.peers))
+
+        candidates = {}
+        for peer, response in zip(self.peers, responses):
+            if response is None:
+                continue
+            manifest = response["data"]
+            if manifest.get("state_root") is None:
+                continue
+            if self.trusted_state_root and manifest["state_root"] != self.trusted_state_root:
+                continue
+            manifest_id = self._manifest_id(manifest)
+            candidates.setdefault(manifest_id, (manifest, []))[1].append(peer)
+
+        if not candidates:
+            raise ValueError("No peer offered a usable snapshot manifest.")
+        manifest, peers = max(candidates.values(), key=lambda entry: (len(entry[1]), entry[0]["block_height"]))
+        if self.trusted_state_root is None and len(peers) < self.config["min_manifest_agreement"] * len(self.peers):
+            raise ValueError("Peers do not agree on a snapshot manifest.")
+        print(f"Selected snapshot at block height {manifest['block_height']} served by {len(peers)} peers.")
+        return manifest, peers
+
+    def _download_chunk(self, manifest, peers, index, target_dir):
+        """
+        Downloads one chunk, rotating through peers (chunk_retries passes) until one returns
+        data matching the manifest hash.
+        """
+        expected_hash = manifest["chunks"][index]["hash"]
+        for attempt in range(self.config["chunk_retries"] * len(peers)):
+            peer = peers[(index + attempt) % len(peers)]
+            response = self._ask(peer, {"type": "snapshot_chunk_request",
+                                        "data": {"block_height": manifest["block_height"], "index": index}})
+            if response is not None:
+                try:
+                    data = base64.b64decode(response["data"], validate=True)
+                except ValueError:
+                    data = b""
+                if Hashing.sha256(data) == expected_hash:
+                    with open(os.path.join(target_dir, f"chunk_{index:06d}.bin"), "wb") as file:
+                        file.write(data)
+                    self.stats["chunks_per_peer"][peer.address] += 1
+                    return
+            self.stats["failed_chunk_requests"] += 1
+        raise ValueError(f"Could not download a valid copy of chunk {index}.")
+
+    def download_chunks(self, manifest, peers):
+        """
+        Downloads all chunks of a manifest in parallel, spreading them across peers.
+        :return: The directory holding the verified chunked snapshot.
+        """
+        target_dir = os.path.join(self.snapshot_dir, f"chunked_{manifest['block_height']}")
+        os.makedirs(target_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.config["max_parallel_downloads"]) as pool:
+            list(pool.map(lambda index: self._download_chunk(manifest, peers, index, target_dir),
+                          range(len(manifest["chunks"]))))
+
+        # Only write the manifest once every chunk is present and verified
+        local_manifest = dict(manifest)
+        local_manifest["chunks"] = [dict(chunk, file=f"chunk_{chunk['index']:06d}.bin") for chunk in manifest["chunks"]]
+        with open(os.path.join(target_dir, MANIFEST_FILE), "w") as file:
+            json.dump(local_manifest, file, indent=4)
+        return target_dir
+
+    def restore_state(self, manifest, snapshot_dir):
+        """
+        Checks the downloaded snapshot against the manifest's state root, then loads it into the
+        StateManager. Every restored table is committed in the state root, so a tampered entry in any
+        of them fails the check, and the current state is left untouched.
+        """
+        state = ChunkedSnapshotReader(snapshot_dir).load_state()
+        unknown = set(state) - set(SYNCED_TABLES)
+        if unknown:
+            raise ValueError(f"Snapshot holds tables not covered by the state root: {sorted(unknown)}.")
+        state_root = self.state_manager.compute_state_root(state)
+        if state_root != manifest["state_root"]:
+            raise ValueError(f"Restored state root {state_root} does not match the manifest ({manifest['state_root']}).")
+        self.state_manager.load_state(state)
+
+    def _fetch_blocks(self, peers, from_height, batch):
+        """
+        Fetches a batch of block dictionaries, rotating through peers. Only an explicit empty answer
+        marks the end of the chain; if every peer fails, the batch is unknown rather than empty.
+        :return: The blocks (an empty list once the peers have no more).
+        :raises ConnectionError: If no peer answered the request.
+        """
+        for attempt in range(len(peers)):
+            peer = peers[(batch + attempt) % len(peers)]
+            response = self._ask(peer, {"type": "blocks_request",
+                                        "data": {"from_height": from_height, "count": self.config["block_batch_size"]}})
+            if response is not None:
+                return response["data"]
+        raise ConnectionError(f"No peer served the blocks from height {from_height}.")
+
+    def replay_blocks(self, from_height, peers, on_block=None, anchor_hash=None):
+        """
+        Fetches the blocks after the snapshot height and applies them through a ValidationPipeline:
+        each block must extend the previous one and pass the header, difficulty, Merkle root and
+        signature checks before it touches the state.
+        :param from_height: The first block height to replay.
+        :param peers: Peers to fetch blocks from (rotated per batch).
+        :param on_block: Optional callback receiving each applied block dictionary.
+        :param anchor_hash: Optional hash the block at from_height - 1 (the snapshot block) must have.
+        :return: The height of the last applied block.
+        :raises ConnectionError: If every peer fails to serve a batch before the end of the chain.
+        """
+        if self.blockchain is None:
+            raise ValueError("A Blockchain is required to validate replayed blocks.")
+        # The snapshot block anchors the replayed chain; it must be a valid block itself
+        anchors = self._fetch_blocks(peers, from_height - 1, 0)
+        if not anchors or anchors[0]["index"] != from_height - 1:
+            raise ValueError(f"No peer served the snapshot block {from_height - 1}.")
+        anchor = block_from_dict(anchors[0])
+        if anchor.hash != anchor.calculate_hash() or not anchor.hash.startswith("0" * self.difficulty):
+            raise ValueError(f"Snapshot block {anchor.index} has an invalid hash.")
+        if anchor_hash is not None and anchor.hash != anchor_hash:
+            raise ValueError(f"Snapshot block {anchor.index} does not match the manifest.")
+        self.blockchain.start_from(anchor.header())
+
+        pipeline = ValidationPipeline(self.blockchain, apply_state=self.state_manager.update_state, difficulty=self.difficulty,
+                                      workers=0, require_signatures=self.require_signatures)
+        height = from_height - 1
+        batch = 0
+        while True:
+            blocks = self._fetch_blocks(peers, height + 1, batch)
+            if not blocks:
+                return height
+            for block_data in blocks:
+                if block_data["index"] != height + 1:
+                    raise ValueError(f"Expected block {height + 1}, received {block_data['index']}.")
+                if pipeline.process([block_from_dict(block_data)]) != 1:
+                    raise ValueError(f"Block {block_data['index']} failed validation.")
+                if on_block:
+                    on_block(block_data)
+                height += 1
+                self.stats["blocks_replayed"] += 1
+            batch += 1
+
+    def sync(self, on_block=None):
+        """
+        Runs the full state-sync procedure.
+        :param on_block: Optional callback receiving each replayed block dictionary.
+        :return: The block height the node is synced to.
+        """
+        manifest, peers = self.select_manifest()
+        snapshot_dir = self.download_chunks(manifest, peers)
+        self.restore_state(manifest, snapshot_dir)
+        height = self.replay_blocks(manifest["block_height"] + 1, peers, on_block, manifest.get("block_hash"))
+        print(f"State sync complete at block height {height} "
+              f"(snapshot {manifest['block_height']}, {self.stats['blocks_replayed']} blocks replayed).")
+        return height
+
+
+# Example usage
+if __name__ == "__main__":
+    with open("blockchain/network/network_config.json") as file:
+        network_config = json.load(file)
+
+    peers = [SocketPeer(address, timeout=network_config["connection_timeout"])
+             for address in network_config["state_sync"]["snapshot_peers"]]
+    print("State-sync peers:", [peer.address for peer in peers])
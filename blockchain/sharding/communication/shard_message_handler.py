@@ -1,7 +1,7 @@
-import hashlib
 import json
 import time
 from collections import defaultdict
+from blockchain.cryptography.hashing import Hashing
 
 class ShardMessageHandler:
     """Manages shard-level messaging, including message validation, routing, and queue management."""
@@ -106,7 +106,7 @@ class ShardMessageHandler:
         :return: A unique message ID as a hexadecimal string.
         """
         data_str = f"{message_type}{source_shard}{destination_shard}{json.dumps(payload, sort_keys=True)}"
-        return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
+        return Hashing.sha256(data_str)
 
 
 # Example usage
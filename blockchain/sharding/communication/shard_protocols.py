@@ -7,6 +7,7 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC # type: ignore
 from cryptography.hazmat.primitives import hashes # type: ignore
 from cryptography.hazmat.backends import default_backend # type: ignore
 import os
+from blockchain.cryptography.hashing import Hashing
 
 class ShardProtocols:
     """Defines secure communication protocols for shard-level data exchange."""
@@ -89,7 +90,7 @@ class ShardProtocols:
         :return: A unique message ID.
         """
         data_str = f"{message_type}{source_shard}{destination_shard}{json.dumps(payload, sort_keys=True)}{timestamp}"
-        return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
+        return Hashing.sha256(data_str)
 
     def _generate_hmac(self, message_id):
         """
@@ -1,7 +1,7 @@
 import json
-import hashlib
 import time
 from blockchain.blocks.block import Block
+from blockchain.cryptography.hashing import Hashing
 
 class CrossShardCommunication:
     """Handles communication and data synchronization between shards in a sharded blockchain."""
@@ -81,7 +81,7 @@ class CrossShardCommunication:
         :return: A unique message ID as a hexadecimal string.
         """
         data_str = json.dumps(data, sort_keys=True)
-        return hashlib.sha256(data_str.encode("utf-8")).hexdigest()
+        return Hashing.sha256(data_str)
 
     def get_pending_messages(self):
         """
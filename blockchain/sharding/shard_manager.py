@@ -1,7 +1,7 @@
-import hashlib
 import json
 import time
 from collections import defaultdict
+from blockchain.cryptography.hashing import Hashing
 
 class ShardManager:
     """Manages shard assignment, creation, and maintenance in a sharded blockchain."""
@@ -39,8 +39,8 @@ class ShardManager:
         :param transaction: The transaction to assign.
         :return: The ID of the assigned shard.
         """
-        sender_hash = hashlib.sha256(transaction["sender"].encode()).hexdigest()
-        shard_id = f"shard_{int(sender_hash, 16) % self.shard_count}"
+        sender_hash = int.from_bytes(Hashing.sha256_digest(transaction["sender"]), "big")
+        shard_id = f"shard_{sender_hash % self.shard_count}"
 
         # Ensure shard capacity
         if len(self.shard_transactions[shard_id]) < self.max_transactions_per_shard:
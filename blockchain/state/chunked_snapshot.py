@@ -0,0 +1,204 @@
+import json
+import os
+import struct
+import zlib
+from blockchain.cryptography.hashing import Hashing
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+_LENGTHS = struct.Struct(">II")  # key length, value length
+
+
+def encode_state_key(table, key):
+    """
+    Encodes a (table, key) pair as a StateDB key; tuple keys (e.g. UTXO outpoints) survive as JSON lists.
+    :param table: The state table (e.g. "balances", "utxo_set").
+    :param key: The key within the table.
+    :return: The encoded key (bytes).
+    """
+    encoded_key = list(key) if isinstance(key, tuple) else key
+    return f"{table}/{json.dumps(encoded_key, separators=(',', ':'))}".encode("utf-8")
+
+
+def decode_state_key(key_bytes):
+    """
+    Decodes a StateDB key produced by encode_state_key.
+    :param key_bytes: The encoded key.
+    :return: A tuple (table, key).
+    """
+    table, encoded_key = key_bytes.decode("utf-8").split("/", 1)
+    return table, _decode_key(json.loads(encoded_key))
+
+
+def _decode_key(key):
+    # Nested tuples (e.g. (address, tuple slot) in contract_storage) must come back hashable too
+    return tuple(_decode_key(part) for part in key) if isinstance(key, list) else key
+
+
+def iter_state_entries(state):
+    """
+    Lazily yields the entries of an in-memory state as (key_bytes, value_bytes) pairs.
+    :param state: The state dictionary ({table: {key: value}}).
+    """
+    for table, content in state.items():
+        for key, value in content.items():
+            yield encode_state_key(table, key), json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class ChunkedSnapshotWriter:
+    """Streams state entries into a directory of fixed-size, independently hashed binary chunks."""
+
+    def __init__(self, snapshot_dir, chunk_size=4 * 1024 * 1024, compression_level=6):
+        """
+        Initializes the ChunkedSnapshotWriter.
+        :param snapshot_dir: Directory that will hold the manifest and the chunk files.
+        :param chunk_size: Target size of a chunk in bytes before compression.
+        :param compression_level: zlib compression level for chunk files.
+        """
+        self.snapshot_dir = snapshot_dir
+        self.chunk_size = chunk_size
+        self.compression_level = compression_level
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def _flush(self, chunks, buffer, entries):
+        data = zlib.compress(bytes(buffer), self.compression_level)
+        file_name = f"chunk_{len(chunks):06d}.bin"
+        with open(os.path.join(self.snapshot_dir, file_name), "wb") as file:
+            file.write(data)
+        chunks.append({
+            "index": len(chunks),
+            "file": file_name,
+            "hash": Hashing.sha256(data),
+            "entries": entries,
+            "size": len(data)
+        })
+
+    def write(self, entries, block_height, state_root=None, metadata=None):
+        """
+        Consumes an iterable of entries, holding at most one chunk in memory.
+        :param entries: Iterable of (key_bytes, value_bytes) pairs (e.g. a generator over StateDB).
+        :param block_height: The block height the state belongs to (None for database backups).
+        :param state_root: Optional state root the snapshot commits to.
+        :param metadata: Optional extra fields stored in the manifest.
+        :return: The manifest (dict).
+        """
+        chunks = []
+        buffer = bytearray()
+        buffered_entries = 0
+        total_entries = 0
+        for key_bytes, value_bytes in entries:
+            buffer += _LENGTHS.pack(len(key_bytes), len(value_bytes))
+            buffer += key_bytes
+            buffer += value_bytes
+            buffered_entries += 1
+            total_entries += 1
+            if len(buffer) >= self.chunk_size:
+                self._flush(chunks, buffer, buffered_entries)
+                buffer = bytearray()
+                buffered_entries = 0
+        if buffered_entries:
+            self._flush(chunks, buffer, buffered_entries)
+
+        manifest = {
+            "version": FORMAT_VERSION,
+            "block_height": block_height,
+            "state_root": state_root,
+            "chunk_size": self.chunk_size,
+            "total_entries": total_entries,
+            "chunks": chunks,
+            **(metadata or {})
+        }
+        with open(os.path.join(self.snapshot_dir, MANIFEST_FILE), "w") as file:
+            json.dump(manifest, file, indent=4)
+        print(f"Chunked snapshot at block height {block_height}: {len(chunks)} chunks, {total_entries} entries.")
+        return manifest
+
+
+class ChunkedSnapshotReader:
+    """Reads a chunked snapshot one verified chunk at a time."""
+
+    def __init__(self, snapshot_dir):
+        """
+        Initializes the ChunkedSnapshotReader.
+        :param snapshot_dir: Directory holding the manifest and the chunk files.
+        """
+        self.snapshot_dir = snapshot_dir
+        with open(os.path.join(self.snapshot_dir, MANIFEST_FILE), "r") as file:
+            self.manifest = json.load(file)
+        if self.manifest["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {self.manifest['version']}")
+
+    def read_chunk(self, index):
+        """
+        Reads the raw (compressed) bytes of a chunk and verifies them against the manifest.
+        :param index: The chunk index.
+        :return: The compressed chunk data.
+        """
+        chunk = self.manifest["chunks"][index]
+        with open(os.path.join(self.snapshot_dir, chunk["file"]), "rb") as file:
+            data = file.read()
+        if Hashing.sha256(data) != chunk["hash"]:
+            raise ValueError(f"Chunk {index} is corrupted (hash mismatch).")
+        return data
+
+    @staticmethod
+    def iter_chunk_entries(data):
+        """
+        Decodes the entries of a chunk.
+        :param data: The compressed chunk data.
+        :return: A generator yielding (key_bytes, value_bytes) pairs.
+        """
+        payload = memoryview(zlib.decompress(data))
+        offset = 0
+        while offset < len(payload):
+            key_length, value_length = _LENGTHS.unpack_from(payload, offset)
+            offset += _LENGTHS.size
+            yield bytes(payload[offset:offset + key_length]), bytes(payload[offset + key_length:offset + key_length + value_length])
+            offset += key_length + value_length
+
+    def iter_entries(self):
+        """
+        Streams all entries of the snapshot, chunk by chunk.
+        :return: A generator yielding (key_bytes, value_bytes) pairs.
+        """
+        for index in range(len(self.manifest["chunks"])):
+            yield from self.iter_chunk_entries(self.read_chunk(index))
+
+    def restore_into_state_db(self, state_db):
+        """
+        Streams the snapshot into a StateDB, writing one batch per chunk.
+        :param state_db: The StateDB instance to restore into.
+        :return: The number of entries restored.
+        """
+        restored = 0
+        for index in range(len(self.manifest["chunks"])):
+            restored += state_db.put_raw_batch(self.iter_chunk_entries(self.read_chunk(index)))
+        print(f"Restored {restored} entries from block height {self.manifest['block_height']}.")
+        return restored
+
+    def load_state(self):
+        """
+        Rebuilds an in-memory state dictionary ({table: {key: value}}) from the snapshot.
+        :return: The state dictionary.
+        """
+        state = {}
+        for key_bytes, value_bytes in self.iter_entries():
+            table, key = decode_state_key(key_bytes)
+            state.setdefault(table, {})[key] = json.loads(value_bytes)
+        return state
+
+
+# Example usage
+if __name__ == "__main__":
+    state = {
+        "balances": {f"User{i}": i for i in range(1000)},
+        "utxo_set": {("tx1", 0): {"receiver": "Alice", "amount": 50}}
+    }
+
+    writer = ChunkedSnapshotWriter("blockchain/state/snapshots/chunked_100", chunk_size=8 * 1024)
+    manifest = writer.write(iter_state_entries(state), block_height=100)
+    print("Chunks:", [(chunk["index"], chunk["entries"]) for chunk in manifest["chunks"]])
+
+    reader = ChunkedSnapshotReader("blockchain/state/snapshots/chunked_100")
+    restored = reader.load_state()
+    print("UTXO keys survive:", list(restored["utxo_set"].keys()))
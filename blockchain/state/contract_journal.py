@@ -0,0 +1,258 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping, MutableSequence
+from blockchain.state.contract_storage import ContractStorage
+
+_MISSING = object()
+
+
+class _ListEdit:
+    """
+    Journal key of a list write: the kind of undo to apply at an index, given the recorded value.
+    """
+
+    __slots__ = ("kind", "index")
+
+    def __init__(self, kind, index):
+        self.kind = kind
+        self.index = index
+
+    def undo(self, container, previous):
+        if self.kind == "set":  # Item or same-length slice overwritten: restore the old value(s)
+            container[self.index] = previous
+        elif self.kind == "truncate":  # Items appended: drop everything past the old length
+            del container[self.index:]
+        elif self.kind == "remove":  # Item inserted
+            del container[self.index]
+        else:  # "reinsert": items deleted, restored in ascending index order
+            for index, value in previous:
+                container.insert(index, value)
+
+
+class StateJournal:
+    """
+    Undo log for contract storage. Every write records the previous value of the slot it overwrites,
+    so a call or a block is reverted in O(writes) instead of copying contract state up front.
+    """
+
+    def __init__(self, max_blocks=64):
+        """
+        Initializes the StateJournal.
+        :param max_blocks: Number of committed block journals kept for rollbacks (reorg depth).
+        """
+        self.max_blocks = max_blocks
+        self.entries = []  # (container, key, previous value) for the block being applied
+        self.block_journals = OrderedDict()  # block key -> entries, oldest first
+        self._undoing = False
+
+    def record(self, container, key):
+        """
+        Records the current value of a slot before it is overwritten.
+        :param container: The dict being written to.
+        :param key: The key about to change.
+        """
+        if not self._undoing:
+            self.entries.append((container, key, container.get(key, _MISSING)))
+
+    def record_list(self, container, kind, index, previous=None):
+        """
+        Records how to undo a single list write.
+        :param container: The list being written to.
+        :param kind: "set", "truncate", "remove" or "reinsert" (see _ListEdit).
+        :param index: The index, slice or previous length the undo applies to.
+        :param previous: The value(s) the undo restores.
+        """
+        if not self._undoing:
+            self.entries.append((container, _ListEdit(kind, index), previous))
+
+    def savepoint(self):
+        """
+        Marks the current position in the journal; savepoints nest naturally.
+        :return: The savepoint.
+        """
+        return len(self.entries)
+
+    def _undo(self, entries, savepoint=0):
+        # Containers that journal their own writes (e.g. the StateManager tables) must not record the undo
+        self._undoing = True
+        try:
+            while len(entries) > savepoint:
+                container, key, previous = entries.pop()
+                if isinstance(key, _ListEdit):
+                    key.undo(container, previous)
+                elif previous is _MISSING:
+                    container.pop(key, None)
+                else:
+                    container[key] = previous
+        finally:
+            self._undoing = False
+
+    def revert_to(self, savepoint):
+        """
+        Undoes every write made after a savepoint.
+        :param savepoint: A savepoint returned by savepoint().
+        """
+        self._undo(self.entries, savepoint)
+
+    def commit_block(self, block_key):
+        """
+        Closes the journal of the block being applied, keeping it for a later rollback.
+        :param block_key: Identifier of the block (e.g. its hash).
+        """
+        self.block_journals[block_key] = self.entries
+        self.entries = []
+        while len(self.block_journals) > self.max_blocks:
+            self.block_journals.popitem(last=False)
+
+    def revert_block(self, block_key):
+        """
+        Undoes the contract writes of the most recently committed block.
+        :param block_key: Identifier of the block.
+        :return: True if the block was reverted, False if its journal is no longer available.
+        """
+        if block_key not in self.block_journals:
+            return False
+        if next(reversed(self.block_journals)) != block_key:
+            raise ValueError("Blocks must be reverted in reverse order of application.")
+        self._undo(self.entries)
+        self._undo(self.block_journals.pop(block_key))
+        return True
+
+    def clear(self):
+        """
+        Drops all journals, e.g. after contract storage was replaced wholesale.
+        """
+        self.entries = []
+        self.block_journals.clear()
+
+
+def _wrap(value, journal):
+    if isinstance(value, dict):
+        return JournaledDict(value, journal)
+    if isinstance(value, list):
+        return JournaledList(value, journal)
+    return value
+
+
+def _unwrap(value):
+    return value.data if isinstance(value, (JournaledDict, JournaledList)) else value
+
+
+class JournaledDict(MutableMapping):
+    """Contract storage view that journals writes; nested dicts and lists are wrapped on access."""
+
+    def __init__(self, data, journal):
+        self.data = data
+        self.journal = journal
+
+    def __getitem__(self, key):
+        value = self.data[key]
+        if isinstance(value, (dict, list)) and isinstance(self.data, ContractStorage):
+            # Nested writes are undone in place; re-setting the slot afterwards (the entry is undone
+            # last) marks it dirty so the reverted value is written back to StateDB
+            self.journal.record(self.data, key)
+        return _wrap(value, self.journal)
+
+    def __setitem__(self, key, value):
+        self.journal.record(self.data, key)
+        self.data[key] = _unwrap(value)
+
+    def __delitem__(self, key):
+        if key not in self.data:
+            raise KeyError(key)
+        self.journal.record(self.data, key)
+        del self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __repr__(self):
+        return repr(self.data)
+
+
+class JournaledList(MutableSequence):
+    """List view that journals each write with just enough to undo it (an item, or a length for appends)."""
+
+    def __init__(self, data, journal):
+        self.data = data
+        self.journal = journal
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.data[index]
+        return _wrap(self.data[index], self.journal)
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            index = range(len(self.data))[index]  # Normalized, raising IndexError like a list
+            self.journal.record_list(self.data, "set", index, self.data[index])
+            self.data[index] = _unwrap(value)
+            return
+        values = [_unwrap(item) for item in value]
+        start, _, step = index.indices(len(self.data))
+        previous = self.data[index]
+        self.data[index] = values
+        if step == 1:
+            # The slice may change length: the undo replaces the new items with the old ones
+            self.journal.record_list(self.data, "set", slice(start, start + len(values)), previous)
+        else:
+            self.journal.record_list(self.data, "set", index, previous)  # Extended slices keep their length
+
+    def __delitem__(self, index):
+        if not isinstance(index, slice):
+            index = range(len(self.data))[index]
+            self.journal.record_list(self.data, "reinsert", None, [(index, self.data[index])])
+            del self.data[index]
+            return
+        start, _, step = index.indices(len(self.data))
+        if step == 1:
+            self.journal.record_list(self.data, "set", slice(start, start), self.data[index])
+        else:
+            indices = sorted(range(len(self.data))[index])
+            self.journal.record_list(self.data, "reinsert", None, [(i, self.data[i]) for i in indices])
+        del self.data[index]
+
+    def __len__(self):
+        return len(self.data)
+
+    def insert(self, index, value):
+        index = min(max(index + len(self.data) if index < 0 else index, 0), len(self.data))
+        self.data.insert(index, _unwrap(value))
+        self.journal.record_list(self.data, "remove", index)
+
+    def append(self, value):
+        self.journal.record_list(self.data, "truncate", len(self.data))
+        self.data.append(_unwrap(value))
+
+    def extend(self, values):
+        self.journal.record_list(self.data, "truncate", len(self.data))
+        self.data.extend([_unwrap(value) for value in values])
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __repr__(self):
+        return repr(self.data)
+
+
+# Example usage
+if __name__ == "__main__":
+    journal = StateJournal()
+    storage = {"supply": 100, "holders": {"Alice": 100}}
+    state = JournaledDict(storage, journal)
+
+    state["holders"]["Bob"] = 10
+    call = journal.savepoint()
+    state["supply"] = 0
+    journal.revert_to(call)  # Failed call: only its own writes are undone
+    print("After failed call:", storage)
+
+    journal.commit_block("block1")
+    journal.revert_block("block1")  # Reorg
+    print("After block rollback:", storage)
@@ -0,0 +1,231 @@
+import json
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+STORAGE_PREFIX = "contract_storage/"
+_DELETED = object()
+
+
+def slot_key(address, slot):
+    """
+    Builds the StateDB key of a contract storage slot.
+    :param address: The contract address.
+    :param slot: The slot (a top-level key of the contract state).
+    :return: The StateDB key (string).
+    """
+    return f"{STORAGE_PREFIX}{address}/{json.dumps(slot)}"
+
+
+def decode_slot(slot):
+    """
+    Restores a slot read back from JSON, where tuple slots (at any depth) became lists.
+    :param slot: The decoded JSON value.
+    :return: The slot, hashable again.
+    """
+    return tuple(decode_slot(part) for part in slot) if isinstance(slot, list) else slot
+
+
+def parse_slot_key(key):
+    """
+    Splits a StateDB key produced by slot_key.
+    :return: A tuple (address, slot).
+    """
+    address, encoded_slot = key[len(STORAGE_PREFIX):].split("/", 1)
+    return address, decode_slot(json.loads(encoded_slot))
+
+
+class SlotCache:
+    """
+    Contract storage slots held in StateDB. Clean slots are kept in an LRU shared by all contracts;
+    written slots stay pinned in memory until flush() writes them back in one batch.
+    """
+
+    def __init__(self, state_db, max_slots=100_000):
+        """
+        Initializes the SlotCache.
+        :param state_db: The StateDB holding the slots.
+        :param max_slots: Maximum number of clean slots kept in memory.
+        """
+        self.state_db = state_db
+        self.max_slots = max_slots
+        self.clean = OrderedDict()  # (address, slot) -> value or _DELETED, least recently used first
+        self.dirty = {}  # (address, slot) -> value or _DELETED, not yet written back
+        self.touched = set()  # (address, slot) changed since the last state-root commit
+        self.stats = {"hits": 0, "misses": 0, "written": 0}
+
+    def get(self, address, slot):
+        """
+        Reads a slot.
+        :return: The value, or _DELETED if the slot does not exist.
+        """
+        key = (address, slot)
+        if key in self.dirty:
+            return self.dirty[key]
+        if key in self.clean:
+            self.clean.move_to_end(key)
+            self.stats["hits"] += 1
+            return self.clean[key]
+
+        self.stats["misses"] += 1
+        value = self.state_db.get_value(slot_key(address, slot), _DELETED)
+        self.clean[key] = value
+        while len(self.clean) > self.max_slots:
+            self.clean.popitem(last=False)
+        return value
+
+    def set(self, address, slot, value):
+        """
+        Writes a slot (value _DELETED removes it).
+        """
+        key = (address, slot)
+        self.clean.pop(key, None)
+        self.dirty[key] = value
+        self.touched.add(key)
+
+    def iter_slots(self, address):
+        """
+        Iterates over the existing slots of a contract (reads the contract's whole key range).
+        """
+        for key in self.state_db.iterate_prefix(f"{STORAGE_PREFIX}{address}/", keys_only=True):
+            slot = parse_slot_key(key)[1]
+            if (address, slot) not in self.dirty:
+                yield slot
+        for (dirty_address, slot), value in list(self.dirty.items()):
+            if dirty_address == address and value is not _DELETED:
+                yield slot
+
+    def iter_all(self):
+        """
+        Iterates over every existing slot of every contract (reads the whole storage key range).
+        :return: A generator yielding (address, slot, value) tuples.
+        """
+        for key, value in self.state_db.iterate_prefix(STORAGE_PREFIX):
+            address, slot = parse_slot_key(key)
+            if (address, slot) not in self.dirty:
+                yield address, slot, value
+        for (address, slot), value in list(self.dirty.items()):
+            if value is not _DELETED:
+                yield address, slot, value
+
+    def replace_all(self, slots):
+        """
+        Replaces the whole contract storage, e.g. with the slots of a restored snapshot.
+        :param slots: A dictionary {(address, slot): value}.
+        :return: The number of slots written.
+        """
+        for key in list(self.state_db.iterate_prefix(STORAGE_PREFIX, keys_only=True)):
+            self.set(*parse_slot_key(key), _DELETED)
+        for (address, slot), value in slots.items():
+            self.set(address, slot, value)
+        return self.flush()
+
+    def flush(self):
+        """
+        Writes the dirty slots back to StateDB in a single batch.
+        :return: The number of slots written.
+        """
+        if not self.dirty:
+            return 0
+        puts = {slot_key(*key): value for key, value in self.dirty.items() if value is not _DELETED}
+        deletes = [slot_key(*key) for key, value in self.dirty.items() if value is _DELETED]
+        self.state_db.apply_batch(puts, deletes)
+        written = len(self.dirty)
+        for key, value in self.dirty.items():
+            self.clean[key] = value
+        self.dirty = {}
+        while len(self.clean) > self.max_slots:
+            self.clean.popitem(last=False)
+        self.stats["written"] += written
+        return written
+
+    def pop_touched(self):
+        """
+        Returns the slots changed since the previous call with their current values.
+        :return: A list of (address, slot, value or None) tuples.
+        """
+        changes = []
+        for address, slot in self.touched:
+            value = self.get(address, slot)
+            changes.append((address, slot, None if value is _DELETED else value))
+        self.touched = set()
+        return changes
+
+    def touch_all(self):
+        """
+        Marks every stored slot as touched, e.g. to rebuild the state tree from scratch.
+        """
+        for key in self.state_db.iterate_prefix(STORAGE_PREFIX, keys_only=True):
+            self.touched.add(parse_slot_key(key))
+
+
+class ContractStorage(MutableMapping):
+    """
+    A contract's state as seen by contract code: a mapping whose top-level keys are loaded from StateDB
+    one slot at a time. Only the slots a call touches are ever resident.
+    """
+
+    def __init__(self, slots, address):
+        """
+        Initializes the ContractStorage.
+        :param slots: The SlotCache backing the storage.
+        :param address: The contract address.
+        """
+        self.slots = slots
+        self.address = address
+
+    def __getitem__(self, slot):
+        value = self.slots.get(self.address, slot)
+        if value is _DELETED:
+            raise KeyError(slot)
+        if isinstance(value, (dict, list)):
+            # Nested values are mutated in place, so the slot has to be written back
+            self.slots.set(self.address, slot, value)
+        return value
+
+    def __setitem__(self, slot, value):
+        self.slots.set(self.address, slot, value)
+
+    def __delitem__(self, slot):
+        if self.slots.get(self.address, slot) is _DELETED:
+            raise KeyError(slot)
+        self.slots.set(self.address, slot, _DELETED)
+
+    def __contains__(self, slot):
+        return self.slots.get(self.address, slot) is not _DELETED
+
+    def __iter__(self):
+        return self.slots.iter_slots(self.address)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"ContractStorage({self.address})"
+
+
+# Example usage
+if __name__ == "__main__":
+    class MemoryStateDB:
+        def __init__(self):
+            self.data = {}
+
+        def get_value(self, key, default=None):
+            return json.loads(self.data[key]) if key in self.data else default
+
+        def iterate_prefix(self, prefix, keys_only=False):
+            for key in sorted(self.data):
+                if key.startswith(prefix):
+                    yield key if keys_only else (key, json.loads(self.data[key]))
+
+        def apply_batch(self, puts, deletes=()):
+            for key, value in puts.items():
+                self.data[key] = json.dumps(value)
+            for key in deletes:
+                self.data.pop(key, None)
+
+    slots = SlotCache(MemoryStateDB(), max_slots=2)
+    storage = ContractStorage(slots, "token")
+    for holder in range(5):
+        storage[f"balance:{holder}"] = 100
+    print("Written slots:", slots.flush(), "Resident clean slots:", len(slots.clean))
+    print("Holder 3:", storage["balance:3"], "Stats:", slots.stats)
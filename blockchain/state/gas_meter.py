@@ -0,0 +1,335 @@
+import ast
+import builtins
+import operator
+import re
+
+STATEMENT_GAS = 1  # Per statement, plus one per expression node it evaluates
+ITERATION_GAS = 1  # Per item produced by range() or consumed by a comprehension
+BIG_VALUE_UNIT = 256  # Bits or elements covered by one unit of gas for large arithmetic results
+
+# Names reserved for the instrumentation; contract code may not use them
+_GAS = "_gas"
+_GAS_ITER = "_gas_iter"
+_GAS_BINOP = "_gas_binop"
+_GAS_AUGITEM = "_gas_augitem"
+_GAS_AUGATTR = "_gas_augattr"
+_GAS_METHOD = "_gas_method"
+_GAS_FORMAT = "_gas_format"
+_GAS_SLICE = "_gas_slice"
+
+_METERED_OPERATORS = {ast.Add: "add", ast.Mult: "mul", ast.Pow: "pow", ast.LShift: "lshift", ast.Mod: "mod"}
+_OPERATORS = {"add": operator.add, "mul": operator.mul, "pow": operator.pow, "lshift": operator.lshift,
+              "mod": operator.mod}
+
+# String methods whose result can be far larger than their operands; they are charged for the result size
+_METERED_METHODS = {"center", "expandtabs", "join", "ljust", "replace", "rjust", "zfill"}
+# String methods whose result size cannot be bounded up front
+_BLOCKED_METHODS = {"format", "format_map", "translate"}
+_STRINGS = (str, bytes, bytearray)
+_SEQUENCES = (str, bytes, bytearray, list, tuple)
+_NUMBERS = re.compile(r"\d+")
+
+# Nodes binding names other than through ast.Name, with the fields holding the bound names
+_BINDING_FIELDS = {
+    ast.arg: ("arg",), ast.alias: ("name", "asname"), ast.ExceptHandler: ("name",), ast.FunctionDef: ("name",),
+    ast.AsyncFunctionDef: ("name",), ast.ClassDef: ("name",), ast.Global: ("names",), ast.Nonlocal: ("names",),
+    ast.MatchAs: ("name",), ast.MatchStar: ("name",), ast.MatchMapping: ("rest",)
+}
+
+_SAFE_BUILTINS = [
+    "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter", "float", "int", "isinstance",
+    "len", "list", "map", "max", "min", "reversed", "round", "set", "sorted", "str", "sum", "tuple", "zip",
+    "Exception", "KeyError", "ValueError", "__build_class__"
+]
+
+
+class OutOfGasError(Exception):
+    """Raised when a contract call exceeds its gas limit."""
+
+
+def _node_cost(node):
+    """
+    Counts the expression nodes a statement evaluates itself, excluding its nested statement bodies.
+    """
+    cost = STATEMENT_GAS
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.stmt, ast.excepthandler, ast.match_case)):
+            continue
+        cost += sum(1 for _ in ast.walk(child))
+    return cost
+
+
+def _charge(cost):
+    return ast.Expr(ast.Call(ast.Name(_GAS, ast.Load()), [ast.Constant(cost)], []))
+
+
+def _hook(name, *args):
+    return ast.Call(ast.Name(name, ast.Load()), list(args), [])
+
+
+def _check_name(name):
+    if name is not None and name.startswith(_GAS):
+        raise ValueError(f"Name '{name}' is reserved in metered contracts.")
+
+
+def _slice_value(node):
+    """
+    Turns a subscript slice (e.g. `a:b` in `x[a:b]`) into an expression that evaluates to the slice object.
+    """
+    if isinstance(node, ast.Slice):
+        return _hook(_GAS_SLICE, *(part or ast.Constant(None) for part in (node.lower, node.upper, node.step)))
+    if isinstance(node, ast.Tuple):
+        return ast.Tuple([_slice_value(element) for element in node.elts], ast.Load())
+    return node
+
+
+class _GasInstrumenter(ast.NodeTransformer):
+    """
+    Rewrites contract code so that every block charges for its statements when entered. Loop bodies
+    and function bodies are blocks, so the charge is paid per iteration and per call.
+    """
+
+    def visit_Name(self, node):
+        _check_name(node.id)
+        return node
+
+    def visit_Attribute(self, node):
+        if node.attr.startswith("__"):
+            raise ValueError(f"Access to attribute '{node.attr}' is not allowed in metered contracts.")
+        if node.attr in _BLOCKED_METHODS:
+            raise ValueError(f"Method '{node.attr}' is not allowed in metered contracts.")
+        self.generic_visit(node)
+        if node.attr in _METERED_METHODS and isinstance(node.ctx, ast.Load):
+            return _hook(_GAS_METHOD, node.value, ast.Constant(node.attr))
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        op_name = _METERED_OPERATORS.get(type(node.op))
+        if op_name is None:
+            return node
+        return _hook(_GAS_BINOP, ast.Constant(op_name), node.left, node.right)
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        op_name = _METERED_OPERATORS.get(type(node.op))
+        if op_name is None:
+            return node
+        target = node.target
+        if isinstance(target, ast.Name):
+            value = _hook(_GAS_BINOP, ast.Constant(op_name), ast.Name(target.id, ast.Load()), node.value)
+            return ast.Assign([ast.Name(target.id, ast.Store())], value)
+        # Container and key are evaluated once, as for the original statement
+        if isinstance(target, ast.Subscript):
+            return ast.Expr(_hook(_GAS_AUGITEM, ast.Constant(op_name), target.value, _slice_value(target.slice),
+                                  node.value))
+        return ast.Expr(_hook(_GAS_AUGATTR, ast.Constant(op_name), target.value, ast.Constant(target.attr),
+                              node.value))
+
+    def visit_FormattedValue(self, node):
+        self.generic_visit(node)
+        if node.format_spec is not None:
+            # Widths and precisions in format specs are charged like the padding they produce
+            node.format_spec = ast.JoinedStr([ast.FormattedValue(_hook(_GAS_FORMAT, node.format_spec), -1, None)])
+        return node
+
+    def visit_comprehension(self, node):
+        self.generic_visit(node)
+        node.iter = ast.Call(ast.Name(_GAS_ITER, ast.Load()), [node.iter], [])
+        return node
+
+    def visit_Lambda(self, node):
+        self.generic_visit(node)
+        charge = ast.Call(ast.Name(_GAS, ast.Load()), [ast.Constant(_node_cost(node.body))], [])
+        node.body = ast.Subscript(ast.Tuple([charge, node.body], ast.Load()), ast.Constant(1), ast.Load())
+        return node
+
+    def generic_visit(self, node):
+        for field in _BINDING_FIELDS.get(type(node), ()):
+            names = getattr(node, field)
+            for name in names if isinstance(names, list) else [names]:
+                _check_name(name)
+        # Compute block costs on the original statements, before they are rewritten
+        costs = {}
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(node, field, None)
+            if isinstance(block, list) and block and isinstance(block[0], ast.stmt):
+                costs[field] = sum(_node_cost(statement) for statement in block)
+                if isinstance(node, ast.While) and field == "body":
+                    costs[field] += sum(1 for _ in ast.walk(node.test))
+        super().generic_visit(node)
+        for field, cost in costs.items():
+            getattr(node, field).insert(0, _charge(cost))
+        return node
+
+
+def instrument(contract_code):
+    """
+    Compiles contract code with gas accounting inserted.
+    :param contract_code: The code of the smart contract.
+    :return: The compiled code object, to be executed with GasMeter.globals().
+    """
+    tree = _GasInstrumenter().visit(ast.parse(contract_code, "<string>", "exec"))
+    return compile(ast.fix_missing_locations(tree), "<string>", "exec")
+
+
+class GasMeter:
+    """Tracks the gas consumed by one contract call against its limit."""
+
+    def __init__(self, gas_limit):
+        """
+        Initializes the GasMeter.
+        :param gas_limit: The maximum gas the call may consume.
+        """
+        self.gas_limit = gas_limit
+        self.gas_used = 0
+
+    @property
+    def exhausted(self):
+        return self.gas_used > self.gas_limit
+
+    def charge(self, amount):
+        """
+        Consumes gas, aborting the call once the limit is exceeded.
+        :param amount: The gas to consume.
+        """
+        self.gas_used += amount
+        if self.gas_used > self.gas_limit:
+            raise OutOfGasError(f"Out of gas (limit {self.gas_limit}).")
+
+    def iterate(self, iterable):
+        for item in iterable:
+            self.charge(ITERATION_GAS)
+            yield item
+
+    def binop(self, op_name, left, right):
+        """
+        Charges for arithmetic whose result size depends on its operands (concatenation, repetition,
+        powers, shifts, string formatting) before computing it.
+        """
+        if op_name == "add":
+            if isinstance(left, _SEQUENCES) and isinstance(right, _SEQUENCES):
+                self.charge((len(left) + len(right)) // BIG_VALUE_UNIT)
+        elif op_name == "mul":
+            if isinstance(left, int) and not isinstance(right, int):
+                left, right = right, left
+            if isinstance(right, int) and isinstance(left, _SEQUENCES):
+                self.charge(len(left) * max(right, 0) // BIG_VALUE_UNIT)
+            elif isinstance(left, int) and isinstance(right, int):
+                self.charge((left.bit_length() + right.bit_length()) // BIG_VALUE_UNIT)
+        elif op_name == "pow" and isinstance(left, int) and isinstance(right, int) and right > 0:
+            self.charge(right * left.bit_length() // BIG_VALUE_UNIT)
+        elif op_name == "lshift" and isinstance(left, int) and isinstance(right, int) and right > 0:
+            self.charge(right // BIG_VALUE_UNIT)
+        elif op_name == "mod" and isinstance(left, _STRINGS):
+            # printf-style widths and precisions, either literal or passed as '*' arguments
+            pattern = left.decode("latin-1") if isinstance(left, (bytes, bytearray)) else left
+            args = right if isinstance(right, tuple) else (right,)
+            size = self._spec_size(pattern)
+            if "*" in pattern:
+                size += sum(abs(arg) for arg in args if isinstance(arg, int))
+            self.charge(size // BIG_VALUE_UNIT)
+        return _OPERATORS[op_name](left, right)
+
+    def augitem(self, op_name, container, key, value):
+        """
+        Applies `container[key] op= value` with the charge of binop().
+        """
+        container[key] = self.binop(op_name, container[key], value)
+
+    def augattr(self, op_name, obj, name, value):
+        """
+        Applies `obj.name op= value` with the charge of binop().
+        """
+        setattr(obj, name, self.binop(op_name, getattr(obj, name), value))
+
+    @staticmethod
+    def _spec_size(spec):
+        # Every number in a format spec is at most a width or precision; the fill character may
+        # be a digit too, which only overcharges
+        return sum(int(number) for number in _NUMBERS.findall(spec))
+
+    def format_spec(self, spec):
+        """
+        Charges for the width and precision of an f-string format spec before it is applied.
+        """
+        self.charge(self._spec_size(spec) // BIG_VALUE_UNIT)
+        return spec
+
+    def method(self, obj, name):
+        """
+        Looks up a size-amplifying string method, wrapped so that calls are charged for their result size.
+        """
+        bound = getattr(obj, name)
+        unbound = isinstance(obj, type) and issubclass(obj, _STRINGS)
+        if not unbound and not isinstance(obj, _STRINGS):
+            return bound
+
+        def metered(*args, **kwargs):
+            target, call_args = (args[0], args[1:]) if unbound and args else (obj, args)
+            if not isinstance(target, _STRINGS):
+                return bound(*args, **kwargs)
+            if name == "join":
+                items = list(self.iterate(call_args[0])) if call_args else []
+                size = len(target) * len(items) + sum(len(item) for item in items if isinstance(item, _SEQUENCES))
+                args = (target, items) if unbound else (items,)
+            elif name == "replace":
+                old, new = call_args[0], call_args[1]
+                occurrences = target.count(old) if old else len(target) + 1
+                count = call_args[2] if len(call_args) > 2 else kwargs.get("count", -1)
+                if count >= 0:
+                    occurrences = min(occurrences, count)
+                size = len(target) + occurrences * len(new)
+            elif name == "expandtabs":
+                tabsize = call_args[0] if call_args else kwargs.get("tabsize", 8)
+                size = len(target) + target.count("\t" if isinstance(target, str) else b"\t") * max(tabsize, 0)
+            else:  # Padding to a width: center, ljust, rjust, zfill
+                size = max(call_args[0] if call_args else 0, len(target))
+            self.charge(size // BIG_VALUE_UNIT)
+            return bound(*args, **kwargs)
+
+        return metered
+
+    def metered_range(self, *args):
+        values = range(*args)
+        self.charge(len(values) * ITERATION_GAS)
+        return values
+
+    def globals(self):
+        """
+        Builds the globals for executing instrumented code: the gas hooks and a restricted set of builtins.
+        :return: The globals dictionary.
+        """
+        safe_builtins = {name: getattr(builtins, name) for name in _SAFE_BUILTINS}
+        safe_builtins["range"] = self.metered_range
+        return {
+            "__builtins__": safe_builtins,
+            _GAS: self.charge,
+            _GAS_ITER: self.iterate,
+            _GAS_BINOP: self.binop,
+            _GAS_AUGITEM: self.augitem,
+            _GAS_AUGATTR: self.augattr,
+            _GAS_METHOD: self.method,
+            _GAS_FORMAT: self.format_spec,
+            _GAS_SLICE: slice
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    code = instrument("""
+total = 0
+for i in range(100):
+    total += i
+state["total"] = total
+""")
+    meter = GasMeter(gas_limit=10_000)
+    context = {"state": {}}
+    exec(code, meter.globals(), context)
+    print("State:", context["state"], "Gas used:", meter.gas_used)
+
+    meter = GasMeter(gas_limit=10_000)
+    try:
+        exec(instrument("while True:\n    pass"), meter.globals(), {})
+    except OutOfGasError as e:
+        print("Aborted:", e)
@@ -1,16 +1,76 @@
-import hashlib
 import json
+import threading
 import time
+from collections import OrderedDict
+from blockchain.state.contract_journal import JournaledDict, StateJournal
+from blockchain.state.contract_storage import ContractStorage, SlotCache
+from blockchain.state.gas_meter import GasMeter, OutOfGasError, instrument
+from blockchain.cryptography.hashing import Hashing
 
 class SmartContractEngine:
     """Handles execution, validation, and state management for smart contracts."""
 
-    def __init__(self, initial_contracts=None):
+    def __init__(self, initial_contracts=None, code_cache_size=1024, gas_limit=None, state_db=None,
+                 slot_cache_size=100_000):
         """
         Initializes the SmartContractEngine.
         :param initial_contracts: A dictionary of deployed smart contracts and their states.
+        :param code_cache_size: Maximum number of compiled contract codes kept in memory.
+        :param gas_limit: Maximum gas per contract call. When set, contract code is compiled with gas
+                          metering and runs with restricted builtins; None keeps unmetered execution.
+        :param state_db: Optional StateDB holding contract storage as per-slot keys. When set, contract
+                         states are loaded lazily, slot by slot, instead of living in `contracts`.
+        :param slot_cache_size: Maximum number of clean storage slots kept in memory.
         """
         self.contracts = initial_contracts or {}
+        self.gas_limit = gas_limit
+        self.journal = StateJournal()
+        self.slots = SlotCache(state_db, slot_cache_size) if state_db is not None else None
+        self.code_cache_size = code_cache_size
+        self.code_cache = OrderedDict()  # code hash -> compiled code, least recently used first
+        self.code_cache_stats = {"hits": 0, "misses": 0}
+        self._code_cache_lock = threading.Lock()
+        self._move_states_to_storage()
+        self.warm_code_cache()
+
+    def load_contracts(self, contracts, slots=None):
+        """
+        Replaces the deployed contracts wholesale, e.g. with a restored snapshot.
+        :param contracts: A dictionary of deployed smart contracts and their states.
+        :param slots: The storage slots of the contracts keeping their storage in StateDB, as a
+                      dictionary {(address, slot): value} (see get_storage()).
+        """
+        self.contracts = contracts
+        self.journal.clear()
+        if self.slots is not None:
+            self.slots.replace_all(slots or {})
+        else:
+            # Without a StateDB, storage snapshotted from one is kept inline again
+            for contract in contracts.values():
+                if contract.pop("storage", None) == "state_db":
+                    contract["state"] = {}
+            for (address, slot), value in (slots or {}).items():
+                contracts[address]["state"][slot] = value
+        self._move_states_to_storage()
+        self.warm_code_cache()
+
+    def _move_states_to_storage(self):
+        """
+        Moves inline contract states into StateDB slots (no-op without a StateDB).
+        """
+        if self.slots is None:
+            return
+        for address, contract in self.contracts.items():
+            if "state" in contract:
+                for slot, value in contract.pop("state").items():
+                    self.slots.set(address, slot, value)
+                contract["storage"] = "state_db"
+        self.slots.flush()
+
+    def _storage(self, contract_address, contract):
+        if contract.get("storage") == "state_db":
+            return ContractStorage(self.slots, contract_address)
+        return contract["state"]
 
     def deploy_contract(self, contract_code, creator, initial_state=None):
         """
@@ -21,12 +81,14 @@ class SmartContractEngine:
         :return: The contract address (hash of the contract code and creator).
         """
         contract_address = self._compute_contract_address(contract_code, creator)
+        self.get_compiled_code(contract_code)
         self.contracts[contract_address] = {
             "creator": creator,
             "code": contract_code,
             "state": initial_state or {},
             "timestamp": int(time.time())
         }
+        self._move_states_to_storage()
         print(f"Contract deployed at address: {contract_address}")
         return contract_address
 
@@ -35,6 +97,38 @@ class SmartContractEngine:
         Executes a smart contract based on the provided transaction.
         :param transaction: The transaction that triggers the smart contract.
         :param state_manager: The StateManager instance to access global state.
+        :return: The gas used by the call (0 when metering is disabled).
+        """
+        contract_address = transaction["receiver"]
+        contract = self.contracts.get(contract_address)
+
+        if not contract:
+            raise ValueError(f"Contract at address {contract_address} not found.")
+
+        # The call writes through the journal, so a failure only undoes its own writes
+        storage = self._storage(contract_address, contract)
+        savepoint = self.journal.savepoint()
+        try:
+            new_state, gas_used = self.execute_isolated(
+                transaction, JournaledDict(storage, self.journal), state_manager
+            )
+            new_state = new_state.data if isinstance(new_state, JournaledDict) else new_state
+            if new_state is not storage:
+                self.set_contract_state(contract_address, new_state)
+        except Exception:
+            self.journal.revert_to(savepoint)
+            raise
+        print(f"Contract {contract_address} executed successfully.")
+        return gas_used
+
+    def execute_isolated(self, transaction, contract_state, global_state):
+        """
+        Runs the code of the contract targeted by a transaction against the given contract state,
+        without touching the stored contract.
+        :param transaction: The transaction that triggers the smart contract.
+        :param contract_state: The contract state the code operates on.
+        :param global_state: The object exposed to the contract as `global_state`.
+        :return: A tuple (contract state after execution, gas used).
         """
         contract_address = transaction["receiver"]
         contract = self.contracts.get(contract_address)
@@ -43,18 +137,72 @@ class SmartContractEngine:
             raise ValueError(f"Contract at address {contract_address} not found.")
 
         # Simulate contract execution by running its code (in real use, use a safe VM)
-        contract_code = compile(contract["code"], "<string>", "exec")
+        contract_code = self.get_compiled_code(contract["code"])
         exec_context = {
-            "state": contract["state"],
+            "state": contract_state,
             "transaction": transaction,
-            "global_state": state_manager,
+            "global_state": global_state,
             "result": None
         }
-        exec(contract_code, {}, exec_context)
+        if self.gas_limit is None:
+            exec(contract_code, {}, exec_context)
+            return exec_context["state"], 0
 
-        # Update the contract state after execution
-        contract["state"] = exec_context["state"]
-        print(f"Contract {contract_address} executed successfully.")
+        meter = GasMeter(min(transaction.get("gas_limit", self.gas_limit), self.gas_limit))
+        try:
+            exec(contract_code, meter.globals(), exec_context)
+        except OutOfGasError:
+            pass
+        # Contract code may swallow the error, so the meter decides
+        if meter.exhausted:
+            raise OutOfGasError(f"Contract {contract_address} ran out of gas (limit {meter.gas_limit}).")
+        return exec_context["state"], meter.gas_used
+
+    @staticmethod
+    def code_hash(contract_code):
+        """
+        Computes the hash identifying a contract code, shared by every address deploying it.
+        :param contract_code: The code of the smart contract.
+        :return: The SHA-256 hash of the code.
+        """
+        return Hashing.sha256(contract_code)
+
+    def get_compiled_code(self, contract_code):
+        """
+        Returns the compiled form of a contract code, compiling it only on a cache miss.
+        :param contract_code: The code of the smart contract.
+        :return: The compiled code object.
+        """
+        code_hash = self.code_hash(contract_code)
+        with self._code_cache_lock:
+            compiled = self.code_cache.get(code_hash)
+            if compiled is not None:
+                self.code_cache.move_to_end(code_hash)
+                self.code_cache_stats["hits"] += 1
+                return compiled
+
+        compiled = compile(contract_code, "<string>", "exec") if self.gas_limit is None else instrument(contract_code)
+        with self._code_cache_lock:
+            self.code_cache_stats["misses"] += 1
+            self.code_cache[code_hash] = compiled
+            self.code_cache.move_to_end(code_hash)
+            while len(self.code_cache) > self.code_cache_size:
+                self.code_cache.popitem(last=False)
+        return compiled
+
+    def warm_code_cache(self):
+        """
+        Compiles the code of the deployed contracts (e.g. loaded from persisted state) ahead of execution.
+        :return: The number of distinct codes in the cache.
+        """
+        for contract in list(self.contracts.values()):
+            if len(self.code_cache) >= self.code_cache_size:
+                break
+            try:
+                self.get_compiled_code(contract["code"])
+            except (SyntaxError, ValueError) as e:
+                print(f"Failed to compile persisted contract code: {e}")
+        return len(self.code_cache)
 
     def validate_contract(self, contract_code):
         """
@@ -76,27 +224,59 @@ class SmartContractEngine:
         contract = self.contracts.get(contract_address)
         if not contract:
             raise ValueError(f"Contract at address {contract_address} not found.")
-        return contract["state"]
+        return self._storage(contract_address, contract)
 
-    def rollback(self, transaction, state_manager):
+    def set_contract_state(self, contract_address, state):
         """
-        Rolls back the state of a smart contract based on a failed transaction.
-        :param transaction: The transaction that triggered the rollback.
-        :param state_manager: The StateManager instance.
+        Replaces the whole state of a contract, journaling the previous one.
+        :param contract_address: The address of the contract.
+        :param state: The new contract state.
         """
-        contract_address = transaction["receiver"]
-        contract = self.contracts.get(contract_address)
+        contract = self.contracts[contract_address]
+        if contract.get("storage") == "state_db":
+            raise ValueError(f"Contract {contract_address} keeps its storage in StateDB; update it slot by slot.")
+        self.journal.record(contract, "state")
+        contract["state"] = state
 
-        if not contract:
-            raise ValueError(f"Contract at address {contract_address} not found.")
+    def commit_block(self, block_key):
+        """
+        Commits the contract writes of an applied block as one batch, keeping its journal for rollbacks.
+        :param block_key: Identifier of the block (e.g. its hash).
+        """
+        self.journal.commit_block(block_key)
+        if self.slots is not None:
+            self.slots.flush()
 
-        # For simplicity, we assume state is backed up before every transaction
-        # In production, this would be more complex and involve versioned state.
-        if "backup_state" in contract:
-            contract["state"] = contract["backup_state"]
-            print(f"Contract {contract_address} state rolled back.")
-        else:
-            print(f"No backup state found for contract {contract_address}.")
+    def pop_touched_slots(self):
+        """
+        Returns the StateDB storage slots changed since the previous call.
+        :return: A list of (address, slot, value or None) tuples.
+        """
+        return self.slots.pop_touched() if self.slots is not None else []
+
+    def rollback_block(self, block_key):
+        """
+        Reverts the journaled writes of the most recently applied block (e.g. during a reorg): contract
+        storage, and the StateManager tables sharing the journal.
+        :param block_key: Identifier of the block.
+        :return: True if the block was reverted, False if its journal is no longer available.
+        """
+        if self.journal.revert_block(block_key):
+            if self.slots is not None:
+                self.slots.flush()
+            print(f"State of block {block_key} rolled back.")
+            return True
+        print(f"No journal found for block {block_key}.")
+        return False
+
+    def get_storage(self):
+        """
+        Returns the storage slots of the contracts keeping their storage in StateDB (read in full).
+        :return: A dictionary {(address, slot): value}.
+        """
+        if self.slots is None:
+            return {}
+        return {(address, slot): value for address, slot, value in self.slots.iter_all()}
 
     def get_state(self):
         """
@@ -112,8 +292,7 @@ class SmartContractEngine:
         :param creator: The address of the creator.
         :return: A unique contract address (SHA-256 hash).
         """
-        combined_data = f"{contract_code}{creator}".encode("utf-8")
-        return hashlib.sha256(combined_data).hexdigest()
+        return Hashing.sha256(f"{contract_code}{creator}")
 
 
 # Example usage
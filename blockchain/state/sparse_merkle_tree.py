@@ -0,0 +1,237 @@
+import json
+from blockchain.cryptography.hashing import Hashing
+
+EMPTY_HASH = b"\x00" * 32
+LEAF_PREFIX = b"\x00"
+INTERNAL_PREFIX = b"\x01"
+
+
+class SparseMerkleTree:
+    """
+    Authenticated key/value commitment over 256-bit key paths (SHA-256 of the key).
+    Subtrees holding a single leaf are collapsed into that leaf, so a key sits at depth ~log2(n)
+    and updates and proofs cost O(log n) hashes. Internal node hashes are cached and only the
+    nodes above touched keys are rehashed when the root is requested.
+    """
+
+    DEPTH = 256
+
+    def __init__(self, items=None):
+        """
+        Initializes the SparseMerkleTree.
+        :param items: Optional dictionary of initial key -> value pairs.
+        """
+        self.leaves = {}  # (depth, prefix) -> (path, value_hash, leaf_hash)
+        self.internal = {}  # (depth, prefix) -> cached hash, None while dirty
+        self.dirty = set()
+        if items:
+            self.update_many(items)
+
+    @staticmethod
+    def key_path(key):
+        """
+        Maps a key to its 256-bit path in the tree.
+        :param key: The key (string).
+        :return: The path as an integer.
+        """
+        return int.from_bytes(Hashing.sha256_digest(str(key)), "big")
+
+    @staticmethod
+    def hash_value(value):
+        """
+        Computes the canonical hash of a leaf value.
+        :param value: Any JSON-serializable value.
+        :return: The SHA-256 digest (bytes).
+        """
+        return Hashing.sha256_digest(json.dumps(value, sort_keys=True, separators=(",", ":")))
+
+    @staticmethod
+    def _leaf_hash(path, value_hash):
+        return Hashing.sha256_digest(LEAF_PREFIX + path.to_bytes(32, "big") + value_hash)
+
+    @staticmethod
+    def _internal_hash(left, right):
+        return Hashing.sha256_digest(INTERNAL_PREFIX + left + right)
+
+    def _child_prefix(self, path, depth):
+        return path >> (self.DEPTH - depth)
+
+    def _mark_ancestors(self, depth, prefix):
+        """
+        Marks every internal node above (depth, prefix) as needing a rehash.
+        """
+        while depth > 0:
+            depth -= 1
+            prefix >>= 1
+            self.dirty.add((depth, prefix))
+
+    def update(self, key, value):
+        """
+        Inserts, updates or (with value None) deletes a single key.
+        :param key: The key (string).
+        :param value: The new value, or None to delete the key.
+        """
+        if value is None:
+            self._delete(self.key_path(key))
+        else:
+            self._insert(self.key_path(key), self.hash_value(value))
+
+    def update_many(self, items):
+        """
+        Applies a batch of updates; shared ancestors are rehashed once on the next root request.
+        :param items: Dictionary of key -> value (None deletes the key).
+        """
+        for key, value in items.items():
+            self.update(key, value)
+
+    def _insert(self, path, value_hash):
+        depth, prefix = 0, 0
+        while (depth, prefix) in self.internal:
+            depth += 1
+            prefix = self._child_prefix(path, depth)
+
+        existing = self.leaves.get((depth, prefix))
+        if existing is not None and existing[0] != path:
+            # Push the existing leaf down until the two paths diverge
+            other_path = existing[0]
+            del self.leaves[(depth, prefix)]
+            while True:
+                self.internal[(depth, prefix)] = None
+                self.dirty.add((depth, prefix))
+                depth += 1
+                prefix = self._child_prefix(path, depth)
+                other_prefix = self._child_prefix(other_path, depth)
+                if prefix != other_prefix:
+                    self.leaves[(depth, other_prefix)] = existing
+                    break
+
+        self.leaves[(depth, prefix)] = (path, value_hash, self._leaf_hash(path, value_hash))
+        self._mark_ancestors(depth, prefix)
+
+    def _delete(self, path):
+        depth, prefix = 0, 0
+        while (depth, prefix) in self.internal:
+            depth += 1
+            prefix = self._child_prefix(path, depth)
+
+        existing = self.leaves.get((depth, prefix))
+        if existing is None or existing[0] != path:
+            return
+        del self.leaves[(depth, prefix)]
+
+        # Collapse parents left with a single leaf (or nothing) beneath them
+        while depth > 0:
+            sibling = (depth, prefix ^ 1)
+            if sibling in self.internal or ((depth, prefix) in self.leaves and sibling in self.leaves):
+                break
+            survivor = self.leaves.pop((depth, prefix), None) or self.leaves.pop(sibling, None)
+            depth, prefix = depth - 1, prefix >> 1
+            del self.internal[(depth, prefix)]
+            self.dirty.discard((depth, prefix))
+            if survivor is not None:
+                self.leaves[(depth, prefix)] = survivor
+
+        self._mark_ancestors(depth, prefix)
+
+    def _node_hash(self, position):
+        leaf = self.leaves.get(position)
+        if leaf is not None:
+            return leaf[2]
+        return self.internal.get(position) or EMPTY_HASH
+
+    def _rehash(self):
+        """
+        Recomputes the cached hashes of dirty internal nodes, deepest first.
+        """
+        for depth, prefix in sorted(self.dirty, reverse=True):
+            if (depth, prefix) in self.internal:
+                left = self._node_hash((depth + 1, prefix << 1))
+                right = self._node_hash((depth + 1, (prefix << 1) | 1))
+                self.internal[(depth, prefix)] = self._internal_hash(left, right)
+        self.dirty.clear()
+
+    def get_root(self):
+        """
+        Returns the current root hash.
+        :return: The root as a hexadecimal string.
+        """
+        if self.dirty:
+            self._rehash()
+        return self._node_hash((0, 0)).hex()
+
+    def generate_proof(self, key):
+        """
+        Generates an inclusion or exclusion proof for a key.
+        :param key: The key (string).
+        :return: A dictionary with the sibling hashes (top-down) and, if the path ends in a leaf,
+                 that leaf's path and value hash (a leaf with a different path proves exclusion).
+        """
+        if self.dirty:
+            self._rehash()
+        path = self.key_path(key)
+        siblings = []
+        depth, prefix = 0, 0
+        while (depth, prefix) in self.internal:
+            depth += 1
+            prefix = self._child_prefix(path, depth)
+            siblings.append(self._node_hash((depth, prefix ^ 1)).hex())
+
+        leaf = self.leaves.get((depth, prefix))
+        proof = {"siblings": siblings, "leaf": None}
+        if leaf is not None:
+            proof["leaf"] = {"path": leaf[0].to_bytes(32, "big").hex(), "value_hash": leaf[1].hex()}
+        return proof
+
+    @staticmethod
+    def verify_proof(root, key, value, proof):
+        """
+        Verifies a proof against a root.
+        :param root: The expected root (hexadecimal string).
+        :param key: The key the proof is for.
+        :param value: The claimed value, or None to verify the key is absent.
+        :param proof: A proof produced by generate_proof.
+        :return: True if the proof is valid, False otherwise.
+        """
+        depth_bits = SparseMerkleTree.DEPTH
+        path = SparseMerkleTree.key_path(key)
+        siblings = proof["siblings"]
+        leaf = proof["leaf"]
+
+        if value is not None:
+            if leaf is None or int(leaf["path"], 16) != path:
+                return False
+            node_hash = SparseMerkleTree._leaf_hash(path, SparseMerkleTree.hash_value(value))
+        elif leaf is None:
+            node_hash = EMPTY_HASH
+        else:
+            # Exclusion by a different leaf occupying the slot on our path
+            leaf_path = int(leaf["path"], 16)
+            shift = depth_bits - len(siblings)
+            if leaf_path == path or leaf_path >> shift != path >> shift:
+                return False
+            node_hash = SparseMerkleTree._leaf_hash(leaf_path, bytes.fromhex(leaf["value_hash"]))
+
+        for depth in range(len(siblings), 0, -1):
+            sibling = bytes.fromhex(siblings[depth - 1])
+            if (path >> (depth_bits - depth)) & 1:
+                node_hash = SparseMerkleTree._internal_hash(sibling, node_hash)
+            else:
+                node_hash = SparseMerkleTree._internal_hash(node_hash, sibling)
+        return node_hash.hex() == root
+
+
+# Example usage
+if __name__ == "__main__":
+    tree = SparseMerkleTree({"Alice": {"balance": 100, "nonce": 1}, "Bob": {"balance": 50, "nonce": 0}})
+    print("Root:", tree.get_root())
+
+    # Incremental update over the touched keys only
+    tree.update_many({"Alice": {"balance": 80, "nonce": 2}, "Carol": {"balance": 20, "nonce": 0}})
+    root = tree.get_root()
+    print("Updated Root:", root)
+
+    # Inclusion and exclusion proofs
+    proof = tree.generate_proof("Alice")
+    print("Alice included:", SparseMerkleTree.verify_proof(root, "Alice", {"balance": 80, "nonce": 2}, proof))
+    proof = tree.generate_proof("Dave")
+    print("Dave absent:", SparseMerkleTree.verify_proof(root, "Dave", None, proof))
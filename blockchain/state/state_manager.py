@@ -1,37 +1,106 @@
 import json
+from blockchain.state.state_snapshot import StateSnapshot
 from blockchain.state.utxo_set import UTXOSet
 from blockchain.state.smart_contracts import SmartContractEngine
+from blockchain.state.contract_storage import decode_slot
+from blockchain.state.sparse_merkle_tree import SparseMerkleTree
+from blockchain.transactions.fee_calculator import FeeCalculator
+
+
+def state_tree_key(table, *parts):
+    """
+    Builds the state tree key of an entry, tagged with its table so entries of different tables
+    (e.g. an account and a contract with the same name) never share a leaf.
+    :param table: The table ("accounts", "utxos", "contracts", "contract_code" or "slots").
+    :param parts: The key of the entry within the table.
+    :return: The state tree key (string).
+    """
+    return json.dumps([table, *parts])
+
+
+class _TrackedDict(dict):
+    """
+    Dictionary that records which keys were written, so the state root and delta snapshots
+    only have to process touched keys. With a journal, every write is also recorded for undo.
+    """
+
+    def __init__(self, data, *touched_sets, journal=None):
+        super().__init__(data)
+        self.touched_sets = touched_sets
+        self.journal = journal
+
+    def _touch(self, key):
+        # Called before the write, so the journal records the previous value
+        if self.journal is not None:
+            self.journal.record(self, key)
+        for touched in self.touched_sets:
+            touched.add(key)
+
+    def __setitem__(self, key, value):
+        self._touch(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._touch(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        self._touch(key)
+        return super().pop(key, *default)
+
+    def __reduce__(self):
+        # Copies (e.g. the snapshot head state) are plain dicts, detached from the touched sets and journal
+        return dict, (dict(self),)
 
 class StateManager:
     """Manages the global state of the blockchain, including balances, UTXOs, and smart contracts."""
 
-    def __init__(self, initial_state_path="blockchain/state/initial_state.json"):
+    def __init__(self, initial_state_path="blockchain/state/initial_state.json", gas_limit=None,
+                 fee_calculator=None, state_db=None):
         """
         Initializes the StateManager.
         :param initial_state_path: Path to the initial state file (used for genesis block or recovery).
+        :param gas_limit: Maximum gas per contract call (None = unmetered contract execution).
+        :param fee_calculator: FeeCalculator pricing the gas used by contract calls.
+        :param state_db: Optional StateDB keeping contract storage as lazily loaded per-slot keys.
         """
         with open(initial_state_path, "r") as file:
             self.state = json.load(file)
 
         self.utxo_set = UTXOSet(self.state["utxo_set"])
-        self.smart_contract_engine = SmartContractEngine(self.state["smart_contracts"])
-        self.balances = self.state["balances"]
-        self.nonces = self.state["nonces"]
+        self.smart_contract_engine = SmartContractEngine(self.state["smart_contracts"], gas_limit=gas_limit,
+                                                         state_db=state_db)
+        self.fee_calculator = fee_calculator or FeeCalculator()
+        self.rebuild_state_tree()
 
     def update_state(self, block):
         """
-        Updates the global state based on the transactions in the block.
+        Updates the global state based on the transactions in the block. The block is applied entirely
+        or not at all: balances, nonces, UTXOs and contract storage share one journal.
         :param block: The block containing the transactions to process.
         :return: True if the state is updated successfully, False otherwise.
         """
+        journal = self.smart_contract_engine.journal
+        savepoint = journal.savepoint()
         try:
             for transaction in block.transactions:
                 self._process_transaction(transaction)
             self._update_utxo_set(block)
+            self.smart_contract_engine.commit_block(self._block_key(block))
             return True
         except Exception as e:
             print(f"Failed to update state: {e}")
+            journal.revert_to(savepoint)
             return False
+        finally:
+            self.commit_state_root()
+
+    @staticmethod
+    def _block_key(block):
+        """
+        Identifies a block in the contract journal.
+        """
+        return getattr(block, "hash", None) or getattr(block, "index", None) or id(block)
 
     def _process_transaction(self, transaction):
         """
@@ -54,7 +123,20 @@ class StateManager:
 
         # Smart contract execution if receiver is a contract
         if "contract_code" in transaction:
-            self.smart_contract_engine.execute(transaction, self)
+            self._touch_contract(receiver)
+            gas_used = self.smart_contract_engine.execute(transaction, self)
+
+            # The declared fee is the most the sender pays, so it must cover the metered gas
+            gas_fee = self.fee_calculator.calculate_gas_fee(gas_used)
+            if gas_fee > fee:
+                raise ValueError(f"Fee {fee} does not cover the gas fee {gas_fee} of the contract call.")
+
+    def _touch_contract(self, address):
+        """
+        Marks a contract as changed for the next state root commit and delta snapshot.
+        """
+        self._touched_contracts.add(address)
+        self._snapshot_changes["smart_contracts"].add(address)
 
     def _update_utxo_set(self, block):
         """
@@ -64,6 +146,185 @@ class StateManager:
         for transaction in block.transactions:
             self.utxo_set.apply_transaction(transaction)
 
+    def load_state(self, state):
+        """
+        Replaces the whole global state, e.g. with a restored snapshot, and rebuilds the state tree.
+        :param state: The state dictionary (balances, nonces, utxo_set, smart_contracts and, for contracts
+                      keeping their storage in StateDB, contract_storage; see get_state()).
+        """
+        for table in ("balances", "nonces", "utxo_set", "smart_contracts"):
+            state.setdefault(table, {})
+        # Snapshots store slots as JSON, so tuple slots come back as lists
+        storage = {(address, decode_slot(slot)): value
+                   for (address, slot), value in state.pop("contract_storage", {}).items()}
+        self.state = state
+        self.utxo_set = UTXOSet(state["utxo_set"])
+        self.smart_contract_engine.load_contracts(state["smart_contracts"], storage)
+        self.rebuild_state_tree()
+
+    def get_state(self):
+        """
+        Returns every state table, e.g. to take a snapshot. Contract storage held in StateDB is read in
+        full into a contract_storage table keyed by (address, slot).
+        :return: The state dictionary ({table: {key: value}}).
+        """
+        state = dict(self.state)
+        if self.smart_contract_engine.slots is not None:
+            state["contract_storage"] = self.smart_contract_engine.get_storage()
+        return state
+
+    def rebuild_state_tree(self):
+        """
+        Rebuilds the authenticated state tree from scratch, e.g. after the state was replaced
+        wholesale by a snapshot. Regular block updates go through commit_state_root instead.
+        """
+        self._touched_accounts = set()
+        self._touched_utxos = set()
+        self._touched_contracts = set()
+        self._snapshot_changes = {table: set() for table in ("balances", "nonces", "utxo_set", "smart_contracts")}
+        self._slot_changes = {}  # (address, slot) -> value or None, since the last delta snapshot
+        # The tables are copied into new dicts, so journal entries for the old ones are dropped
+        journal = self.smart_contract_engine.journal
+        journal.clear()
+        self.balances = _TrackedDict(self.state["balances"], self._touched_accounts,
+                                     self._snapshot_changes["balances"], journal=journal)
+        self.nonces = _TrackedDict(self.state["nonces"], self._touched_accounts, self._snapshot_changes["nonces"],
+                                   journal=journal)
+        self.utxo_set.utxos = _TrackedDict(self.utxo_set.utxos, self._touched_utxos, self._snapshot_changes["utxo_set"],
+                                           journal=journal)
+        # Tracks deployments made directly through the engine
+        self.smart_contract_engine.contracts = _TrackedDict(self.smart_contract_engine.contracts,
+                                                            self._touched_contracts,
+                                                            self._snapshot_changes["smart_contracts"])
+        self.state["balances"] = self.balances
+        self.state["nonces"] = self.nonces
+        self.state["utxo_set"] = self.utxo_set.utxos
+        self.state["smart_contracts"] = self.smart_contract_engine.contracts
+
+        self.state_tree = SparseMerkleTree()
+        self._touched_accounts.update(self.balances, self.nonces)
+        self._touched_utxos.update(self.utxo_set.utxos)
+        self._touched_contracts.update(self.smart_contract_engine.contracts)
+        if self.smart_contract_engine.slots is not None:
+            self.smart_contract_engine.slots.touch_all()
+        self.commit_state_root()
+
+    def _account_leaf(self, account):
+        """
+        Returns the value committed in the state tree for an account, or None if it does not exist.
+        """
+        if account not in self.balances and account not in self.nonces:
+            return None
+        return {"balance": self.balances.get(account, 0), "nonce": self.nonces.get(account, 0)}
+
+    def commit_state_root(self):
+        """
+        Updates the state tree over the accounts, UTXOs, contracts and storage slots touched since the
+        last commit.
+        :return: The new state root (hexadecimal string).
+        """
+        updates = {state_tree_key("accounts", account): self._account_leaf(account)
+                   for account in self._touched_accounts}
+        utxos = self.utxo_set.utxos
+        for utxo in self._touched_utxos:
+            updates[state_tree_key("utxos", utxo)] = utxos.get(utxo)
+        contracts = self.smart_contract_engine.contracts
+        for address in self._touched_contracts:
+            contract = contracts.get(address)
+            updates[state_tree_key("contract_code", address)] = (
+                {"creator": contract["creator"], "code": contract["code"]} if contract else None
+            )
+            if contract is None or contract.get("storage") != "state_db":  # StateDB storage is committed per slot
+                updates[state_tree_key("contracts", address)] = contract["state"] if contract else None
+        for address, slot, value in self.smart_contract_engine.pop_touched_slots():
+            updates[state_tree_key("slots", address, slot)] = value
+            self._slot_changes[(address, slot)] = value
+        self.state_tree.update_many(updates)
+        self._touched_accounts.clear()
+        self._touched_utxos.clear()
+        self._touched_contracts.clear()
+        return self.state_tree.get_root()
+
+    def get_state_root(self):
+        """
+        Retrieves the root hash committing to all account balances, nonces, UTXOs and contracts.
+        :return: The state root (hexadecimal string).
+        """
+        return self.commit_state_root()
+
+    def compute_state_root(self, state):
+        """
+        Computes the state root a state dictionary would have once loaded, without loading it, e.g. to
+        check a downloaded snapshot before it replaces the current state. Contract storage is committed
+        as load_state would keep it: per slot with a StateDB, inline in the contract leaf without one.
+        :param state: The state dictionary (see load_state()).
+        :return: The state root (hexadecimal string).
+        """
+        balances, nonces = state.get("balances", {}), state.get("nonces", {})
+        leaves = {state_tree_key("accounts", account): {"balance": balances.get(account, 0),
+                                                        "nonce": nonces.get(account, 0)}
+                  for account in set(balances) | set(nonces)}
+        for utxo, output in state.get("utxo_set", {}).items():
+            leaves[state_tree_key("utxos", utxo)] = output
+
+        slots = {}
+        for (address, slot), value in state.get("contract_storage", {}).items():
+            slots.setdefault(address, {})[decode_slot(slot)] = value
+        in_state_db = self.smart_contract_engine.slots is not None
+        for address, contract in state.get("smart_contracts", {}).items():
+            leaves[state_tree_key("contract_code", address)] = {"creator": contract["creator"], "code": contract["code"]}
+            storage = {} if contract.get("storage") == "state_db" else dict(contract.get("state", {}))
+            storage.update(slots.get(address, {}))
+            if in_state_db:
+                for slot, value in storage.items():
+                    leaves[state_tree_key("slots", address, slot)] = value
+            else:
+                leaves[state_tree_key("contracts", address)] = storage
+
+        tree = SparseMerkleTree()
+        tree.update_many(leaves)
+        return tree.get_root()
+
+    def get_account_proof(self, account):
+        """
+        Generates an inclusion (or exclusion) proof for an account against the current state root.
+        :param account: The account to prove.
+        :return: A dictionary with the state root, the account, its state tree key, the account value
+                 (None if absent) and the proof.
+        """
+        state_root = self.commit_state_root()
+        key = state_tree_key("accounts", account)
+        return {
+            "state_root": state_root,
+            "account": account,
+            "key": key,
+            "value": self._account_leaf(account),
+            "proof": self.state_tree.generate_proof(key)
+        }
+
+    def get_snapshot_changes(self):
+        """
+        Returns the keys changed since the previous call, in the format expected by
+        StateSnapshot.create_snapshot, so delta snapshots cost O(changes) instead of a full diff.
+        :return: A dictionary {table: {key: value or StateSnapshot.DELETED}}.
+        """
+        tables = {
+            "balances": self.balances,
+            "nonces": self.nonces,
+            "utxo_set": self.utxo_set.utxos,
+            "smart_contracts": self.smart_contract_engine.contracts
+        }
+        changes = {}
+        for table, keys in self._snapshot_changes.items():
+            changes[table] = {key: tables[table].get(key, StateSnapshot.DELETED) for key in keys}
+            keys.clear()
+        if self.smart_contract_engine.slots is not None:
+            self.commit_state_root()  # Collects the slots written since the last commit
+            changes["contract_storage"] = {key: StateSnapshot.DELETED if value is None else value
+                                           for key, value in self._slot_changes.items()}
+            self._slot_changes.clear()
+        return changes
+
     def get_balance(self, account):
         """
         Retrieves the balance of a given account.
@@ -101,11 +362,19 @@ class StateManager:
         :param block: The block whose transactions should be undone.
         """
         try:
-            for transaction in reversed(block.transactions):
-                self._rollback_transaction(transaction)
-            self.utxo_set.rollback_block(block)
+            # Recent blocks are undone from the journal; older ones transaction by transaction
+            if self.smart_contract_engine.rollback_block(self._block_key(block)):
+                for transaction in block.transactions:
+                    if "contract_code" in transaction:
+                        self._touch_contract(transaction["receiver"])
+            else:
+                for transaction in reversed(block.transactions):
+                    self._rollback_transaction(transaction)
+                self.utxo_set.rollback_block(block)
         except Exception as e:
             print(f"Failed to rollback state: {e}")
+        finally:
+            self.commit_state_root()
 
     def _rollback_transaction(self, transaction):
         """
@@ -122,9 +391,9 @@ class StateManager:
         self.nonces[sender] -= 1
         self.balances[receiver] -= amount
 
-        # Rollback smart contract if applicable
+        # Contract storage can only be reverted from the journal (see rollback_state)
         if "contract_code" in transaction:
-            self.smart_contract_engine.rollback(transaction, self)
+            self._touch_contract(receiver)
 
 
 # Example usage
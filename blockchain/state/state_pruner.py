@@ -0,0 +1,88 @@
+import json
+import threading
+
+class StatePruner:
+    """
+    Pruned-node mode: keeps full state, block bodies and undo data (contract journals) for the last
+    `retention_blocks` blocks only, and compacts everything older in a background thread.
+    """
+
+    def __init__(self, blockchain=None, state_manager=None, snapshot_manager=None, state_db=None,
+                 config_file="blockchain/state/storage/storage_config.json", retention_blocks=None,
+                 compaction_interval=None):
+        """
+        Initializes the StatePruner.
+        :param blockchain: The Blockchain whose old block bodies are dropped.
+        :param state_manager: The StateManager whose undo data is bounded by the retention window.
+        :param snapshot_manager: The StateSnapshot whose history below the window is compacted away.
+        :param state_db: The StateDB compacted after pruning.
+        :param config_file: Path to the storage configuration (its "pruning" section).
+        :param retention_blocks: Overrides the configured retention window.
+        :param compaction_interval: Overrides the configured number of blocks between compactions.
+        """
+        with open(config_file, "r") as file:
+            config = json.load(file).get("pruning", {})
+        self.enabled = config.get("enabled", False)
+        self.retention_blocks = retention_blocks or config.get("retention_blocks", 128)
+        self.compaction_interval = compaction_interval or config.get("compaction_interval_blocks", 32)
+
+        self.blockchain = blockchain
+        self.state_manager = state_manager
+        self.snapshot_manager = snapshot_manager
+        self.state_db = state_db
+        if state_manager is not None:
+            # Blocks older than the window can no longer be rolled back
+            state_manager.smart_contract_engine.journal.max_blocks = self.retention_blocks
+
+        self.last_compaction_height = 0
+        self.stats = {"compactions": 0, "pruned_blocks": 0, "pruned_snapshots": 0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def on_block_committed(self, block_height):
+        """
+        Schedules a background compaction every `compaction_interval` blocks.
+        :param block_height: The height of the block just committed.
+        :return: The compaction thread, or None if no compaction was started.
+        """
+        if not self.enabled or block_height - self.last_compaction_height < self.compaction_interval:
+            return None
+        if self._thread is not None and self._thread.is_alive():
+            return None  # The previous compaction will be followed by the next interval's one
+        self.last_compaction_height = block_height
+        self._thread = threading.Thread(target=self.compact, args=(block_height,), daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def compact(self, block_height):
+        """
+        Drops block bodies and state history older than the retention window.
+        :param block_height: The current chain height.
+        """
+        cutoff = block_height - self.retention_blocks + 1  # First height of the retention window
+        if cutoff <= 0:
+            return
+        with self._lock:
+            pruned_blocks = self.blockchain.prune_block_bodies(cutoff) if self.blockchain else 0
+            pruned_snapshots = self.snapshot_manager.prune_before(cutoff) if self.snapshot_manager else 0
+            if self.state_db is not None:
+                self.state_db.compact()
+            self.stats["compactions"] += 1
+            self.stats["pruned_blocks"] += pruned_blocks
+            self.stats["pruned_snapshots"] += pruned_snapshots
+        print(f"Pruned state below block height {cutoff}: {pruned_blocks} block bodies, "
+              f"{pruned_snapshots} snapshots.")
+
+
+# Example usage
+if __name__ == "__main__":
+    from blockchain.state.state_snapshot import StateSnapshot
+
+    snapshots = StateSnapshot("blockchain/state/snapshots", base_interval=4)
+    for height in range(1, 21):
+        snapshots.create_snapshot({"balances": {"Alice": 100 - height}}, height)
+
+    pruner = StatePruner(snapshot_manager=snapshots, retention_blocks=8, compaction_interval=10)
+    pruner.enabled = True
+    pruner.on_block_committed(20).join()
+    print("Remaining snapshots:", sorted(snapshots.index), "Stats:", pruner.stats)
@@ -1,77 +1,338 @@
+import copy
 import json
 import os
 import shutil
+import threading
 import time
+import zlib
+from blockchain.state.chunked_snapshot import MANIFEST_FILE, ChunkedSnapshotReader, ChunkedSnapshotWriter, iter_state_entries
+from blockchain.cryptography.hashing import Hashing
 
 class StateSnapshot:
-    """Manages blockchain state snapshots for recovery and synchronization."""
+    """
+    Manages blockchain state snapshots for recovery and synchronization.
+    A full base snapshot is written every `base_interval` snapshots; the snapshots in between
+    store only the keys that changed since the previous one. Every file is zlib-compressed and
+    its SHA-256 checksum is recorded in the snapshot index.
+    """
 
-    def __init__(self, snapshot_dir="blockchain/state/snapshots"):
+    DELETED = object()  # Marks a removed key in the `changes` passed to create_snapshot
+    INDEX_FILE = "snapshot_index.json"
+
+    def __init__(self, snapshot_dir="blockchain/state/snapshots", base_interval=10, compression_level=6):
         """
         Initializes the StateSnapshot.
         :param snapshot_dir: Directory where snapshots are stored.
+        :param base_interval: Number of snapshots per chain (one base followed by deltas).
+        :param compression_level: zlib compression level for snapshot files.
         """
         self.snapshot_dir = snapshot_dir
+        self.base_interval = base_interval
+        self.compression_level = compression_level
         os.makedirs(self.snapshot_dir, exist_ok=True)
+        self.index = self._load_index()
+        self._lock = threading.RLock()  # Pruning compacts snapshots from a background thread
+        self.head_height = max(self.index, default=None)  # Height that the next delta is relative to
+        self.head_state = None  # Cached copy of the state at head_height (used to compute diffs)
+
+    def _load_index(self):
+        index_path = os.path.join(self.snapshot_dir, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path, "r") as file:
+            return {int(height): entry for height, entry in json.load(file).items()}
+
+    def _save_index(self):
+        index_path = os.path.join(self.snapshot_dir, self.INDEX_FILE)
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump({str(height): entry for height, entry in sorted(self.index.items())}, file)
+        os.replace(temp_path, index_path)
+
+    @staticmethod
+    def _encode_key(key):
+        return list(key) if isinstance(key, tuple) else key
+
+    @classmethod
+    def _decode_key(cls, key):
+        return tuple(cls._decode_key(part) for part in key) if isinstance(key, list) else key
+
+    def _write_file(self, file_name, payload):
+        """
+        Compresses and writes a snapshot payload.
+        :return: The SHA-256 checksum (hex) and size of the written file.
+        """
+        data = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), self.compression_level)
+        with open(os.path.join(self.snapshot_dir, file_name), "wb") as file:
+            file.write(data)
+        return Hashing.sha256(data), len(data)
+
+    def _read_file(self, height):
+        """
+        Reads a snapshot file and verifies its checksum.
+        :param height: The block height of the snapshot.
+        :return: The decoded payload.
+        """
+        entry = self.index[height]
+        with open(os.path.join(self.snapshot_dir, entry["file"]), "rb") as file:
+            data = file.read()
+        if Hashing.sha256(data) != entry["checksum"]:
+            raise ValueError(f"Snapshot at block height {height} is corrupted (checksum mismatch).")
+        return json.loads(zlib.decompress(data).decode("utf-8"))
+
+    def _diff(self, state):
+        """
+        Computes the changes of a state relative to the cached head state.
+        :return: A dictionary {table: {key: value or DELETED}}, or {table: value} for non-dict entries.
+        """
+        changes = {}
+        for table, current in state.items():
+            previous = self.head_state.get(table)
+            if not isinstance(current, dict) or not isinstance(previous, dict):
+                if current != previous:
+                    changes[table] = current
+                continue
+            table_changes = {key: value for key, value in current.items()
+                             if key not in previous or previous[key] != value}
+            table_changes.update({key: self.DELETED for key in previous if key not in current})
+            if table_changes:
+                changes[table] = table_changes
+        return changes
 
-    def create_snapshot(self, state, block_height):
+    def _apply_changes(self, state, changes):
+        """
+        Applies decoded changes to a state dictionary in place.
+        """
+        for table, table_changes in changes.items():
+            if not isinstance(table_changes, dict) or not isinstance(state.get(table), dict):
+                state[table] = copy.deepcopy(table_changes)
+                continue
+            target = state[table]
+            for key, value in table_changes.items():
+                if value is self.DELETED:
+                    target.pop(key, None)
+                else:
+                    target[key] = copy.deepcopy(value)
+
+    def create_snapshot(self, state, block_height, changes=None):
         """
         Creates a snapshot of the current blockchain state.
         :param state: The current global state to snapshot (dict format).
         :param block_height: The block height at which the snapshot is taken.
+        :param changes: Optional changes since the previous snapshot, as {table: {key: value}} with
+                        StateSnapshot.DELETED for removed keys (e.g. StateManager.get_snapshot_changes()).
+                        When omitted they are computed by diffing against the previous snapshot.
         :return: The file path of the created snapshot.
         """
-        snapshot_file = os.path.join(self.snapshot_dir, f"snapshot_{block_height}.json")
-        with open(snapshot_file, "w") as file:
-            json.dump(state, file, indent=4)
-        print(f"Snapshot created at block height {block_height}: {snapshot_file}")
-        return snapshot_file
+        with self._lock:
+            # Snapshots at or above this height belong to a state we are no longer on
+            for height in [h for h in self.index if h >= block_height]:
+                self._remove(height)
+            if self.head_height is not None and self.head_height >= block_height:
+                self.head_height, self.head_state = None, None
+
+            chain_length = self._chain_length(self.head_height) if self.head_height is not None else 0
+            is_base = self.head_height is None or chain_length >= self.base_interval
+
+            if is_base:
+                payload = {"type": "base", "block_height": block_height, "tables": self._encode_tables(state)}
+                # Only diff-based callers need a resident copy of the state
+                self.head_state = copy.deepcopy(state) if changes is None else None
+            else:
+                if changes is None:
+                    if self.head_state is None:
+                        self.head_state = self.load_snapshot(self.head_height)
+                    changes = self._diff(state)
+                payload = {"type": "delta", "block_height": block_height, "parent": self.head_height,
+                           "tables": self._encode_tables(changes)}
+                if self.head_state is not None:
+                    self._apply_changes(self.head_state, changes)
+
+            file_name = f"snapshot_{block_height}.{payload['type']}.gz"
+            checksum, size = self._write_file(file_name, payload)
+            self.index[block_height] = {"type": payload["type"], "parent": payload.get("parent"),
+                                        "file": file_name, "checksum": checksum, "size": size,
+                                        "timestamp": int(time.time())}
+            self._save_index()
+            self.head_height = block_height
+
+            snapshot_file = os.path.join(self.snapshot_dir, file_name)
+            print(f"Snapshot ({payload['type']}) created at block height {block_height}: {snapshot_file}")
+            return snapshot_file
+
+    def _encode_tables(self, tables):
+        """
+        Encodes state tables as lists of [key, value] entries so that tuple keys survive JSON.
+        """
+        encoded = {}
+        for table, content in tables.items():
+            if isinstance(content, dict):
+                encoded[table] = {
+                    "upserts": [[self._encode_key(key), value] for key, value in content.items()
+                                if value is not self.DELETED],
+                    "deletes": [self._encode_key(key) for key, value in content.items() if value is self.DELETED]
+                }
+            else:
+                encoded[table] = {"value": content}
+        return encoded
+
+    def _decode_tables(self, encoded):
+        tables = {}
+        for table, content in encoded.items():
+            if "value" in content:
+                tables[table] = content["value"]
+                continue
+            table_changes = {self._decode_key(key): value for key, value in content["upserts"]}
+            table_changes.update({self._decode_key(key): self.DELETED for key in content["deletes"]})
+            tables[table] = table_changes
+        return tables
+
+    def _chain(self, block_height):
+        """
+        Returns the heights to apply to restore a snapshot, from its base to the snapshot itself.
+        """
+        chain = [block_height]
+        while self.index[chain[-1]]["type"] == "delta":
+            chain.append(self.index[chain[-1]]["parent"])
+        return chain[::-1]
+
+    def _chain_length(self, block_height):
+        return len(self._chain(block_height))
 
     def load_snapshot(self, block_height):
         """
-        Loads a snapshot for a given block height.
+        Loads a snapshot for a given block height by applying its delta chain to the base.
         :param block_height: The block height of the desired snapshot.
         :return: The loaded state (dict format).
         """
-        snapshot_file = os.path.join(self.snapshot_dir, f"snapshot_{block_height}.json")
-        if not os.path.exists(snapshot_file):
-            raise FileNotFoundError(f"Snapshot for block height {block_height} not found.")
-        with open(snapshot_file, "r") as file:
-            state = json.load(file)
-        print(f"Loaded snapshot from block height {block_height}.")
-        return state
+        with self._lock:
+            if block_height not in self.index:
+                raise FileNotFoundError(f"Snapshot for block height {block_height} not found.")
+            state = {}
+            for height in self._chain(block_height):
+                changes = self._decode_tables(self._read_file(height)["tables"])
+                if self.index[height]["type"] == "base":
+                    state = changes
+                else:
+                    self._apply_changes(state, changes)
+            print(f"Loaded snapshot from block height {block_height}.")
+            return state
+
+    def _remove(self, block_height):
+        entry = self.index.pop(block_height)
+        file_path = os.path.join(self.snapshot_dir, entry["file"])
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
     def cleanup_old_snapshots(self, keep_last_n=5):
         """
-        Removes old snapshots, keeping only the latest `n` snapshots.
+        Compacts the snapshot history, keeping only the latest `n` snapshots restorable.
+        The oldest kept snapshot is rewritten as a base (merging its delta chain), after which
+        everything older is removed.
         :param keep_last_n: Number of recent snapshots to keep.
         """
-        snapshots = sorted(
-            [f for f in os.listdir(self.snapshot_dir) if f.startswith("snapshot_")],
-            key=lambda x: int(x.split("_")[1].split(".")[0])
-        )
+        with self._lock:
+            heights = sorted(self.index)
+            if len(heights) <= keep_last_n:
+                print("No old snapshots to clean up.")
+                return
+
+            self._compact_from(heights[-keep_last_n])
+            print(f"Compacted snapshots, keeping the last {keep_last_n}.")
+
+    def prune_before(self, block_height):
+        """
+        Drops the snapshot history below a height (the start of a pruned node's retention window).
+        The latest snapshot at or below the height is kept, as a base, so the window stays restorable;
+        chunked snapshots below the height are removed unless they are the latest one.
+        :param block_height: The first block height of the retention window.
+        :return: The number of snapshots removed.
+        """
+        with self._lock:
+            removed = 0
+            older = [height for height in self.index if height <= block_height]
+            if len(older) > 1:
+                removed = len(older) - 1
+                self._compact_from(max(older))
+
+            chunked = sorted(int(name.split("_")[1]) for name in os.listdir(self.snapshot_dir) if name.startswith("chunked_"))
+            for height in chunked[:-1]:
+                if height < block_height:
+                    shutil.rmtree(self._chunked_dir(height))
+                    removed += 1
+            return removed
+
+    def _compact_from(self, oldest_kept):
+        """
+        Rewrites a snapshot as a base (merging its delta chain) and removes every older snapshot.
+        """
+        heights = sorted(self.index)
+        if self.index[oldest_kept]["type"] == "delta":
+            state = self.load_snapshot(oldest_kept)
+            file_name = f"snapshot_{oldest_kept}.base.gz"
+            payload = {"type": "base", "block_height": oldest_kept, "tables": self._encode_tables(state)}
+            checksum, size = self._write_file(file_name, payload)
+            os.remove(os.path.join(self.snapshot_dir, self.index[oldest_kept]["file"]))
+            self.index[oldest_kept].update({"type": "base", "parent": None, "file": file_name,
+                                            "checksum": checksum, "size": size})
+
+        for height in heights:
+            if height < oldest_kept:
+                self._remove(height)
+        self._save_index()
 
-        if len(snapshots) > keep_last_n:
-            for old_snapshot in snapshots[:-keep_last_n]:
-                os.remove(os.path.join(self.snapshot_dir, old_snapshot))
-            print(f"Cleaned up old snapshots, keeping the last {keep_last_n}.")
-        else:
-            print("No old snapshots to clean up.")
+    def create_chunked_snapshot(self, entries, block_height, state_root=None, chunk_size=4 * 1024 * 1024,
+                                block_hash=None):
+        """
+        Streams a large state into a chunked binary snapshot without materializing it.
+        :param entries: Iterable of (key_bytes, value_bytes) pairs, e.g. StateDB.iterate_all(raw=True)
+                        or chunked_snapshot.iter_state_entries(state).
+        :param block_height: The block height at which the snapshot is taken.
+        :param state_root: Optional state root recorded in the manifest.
+        :param chunk_size: Target size of a chunk in bytes before compression.
+        :param block_hash: Optional hash of the block at block_height, anchoring the blocks replayed after it.
+        :return: The manifest (dict).
+        """
+        writer = ChunkedSnapshotWriter(self._chunked_dir(block_height), chunk_size, self.compression_level)
+        return writer.write(entries, block_height, state_root, {"block_hash": block_hash} if block_hash else None)
+
+    def restore_chunked_snapshot(self, block_height, state_db):
+        """
+        Streams a chunked snapshot into a StateDB, one verified chunk at a time.
+        :param block_height: The block height of the chunked snapshot.
+        :param state_db: The StateDB instance to restore into.
+        :return: The number of entries restored.
+        """
+        chunked_dir = self._chunked_dir(block_height)
+        if not os.path.isdir(chunked_dir):
+            raise FileNotFoundError(f"Chunked snapshot for block height {block_height} not found.")
+        return ChunkedSnapshotReader(chunked_dir).restore_into_state_db(state_db)
+
+    def _chunked_dir(self, block_height):
+        return os.path.join(self.snapshot_dir, f"chunked_{block_height}")
+
+    def get_latest_chunked_snapshot(self):
+        """
+        Retrieves the most recent chunked snapshot.
+        :return: The directory of the latest chunked snapshot and its block height.
+        """
+        # The manifest is written last, so directories without one are incomplete
+        heights = [int(name.split("_")[1]) for name in os.listdir(self.snapshot_dir)
+                   if name.startswith("chunked_")
+                   and os.path.exists(os.path.join(self.snapshot_dir, name, MANIFEST_FILE))]
+        if not heights:
+            raise FileNotFoundError("No chunked snapshots found.")
+        return self._chunked_dir(max(heights)), max(heights)
 
     def get_latest_snapshot(self):
         """
         Retrieves the latest available snapshot.
         :return: The file path of the latest snapshot and its block height.
         """
-        snapshots = sorted(
-            [f for f in os.listdir(self.snapshot_dir) if f.startswith("snapshot_")],
-            key=lambda x: int(x.split("_")[1].split(".")[0])
-        )
-        if not snapshots:
+        if not self.index:
             raise FileNotFoundError("No snapshots found.")
-        latest_snapshot = snapshots[-1]
-        block_height = int(latest_snapshot.split("_")[1].split(".")[0])
-        return os.path.join(self.snapshot_dir, latest_snapshot), block_height
+        block_height = max(self.index)
+        return os.path.join(self.snapshot_dir, self.index[block_height]["file"]), block_height
 
     def rollback_to_snapshot(self, block_height, state_manager):
         """
@@ -80,11 +341,9 @@ class StateSnapshot:
         :param state_manager: The StateManager instance to update the global state.
         """
         snapshot = self.load_snapshot(block_height)
-        state_manager.state = snapshot
-        state_manager.utxo_set = snapshot["utxo_set"]
-        state_manager.balances = snapshot["balances"]
-        state_manager.nonces = snapshot["nonces"]
-        state_manager.smart_contract_engine.contracts = snapshot["smart_contracts"]
+        self.head_height, self.head_state = block_height, None
+
+        state_manager.load_state(snapshot)
         print(f"Rolled back to snapshot at block height {block_height}.")
 
 # Example usage
@@ -105,21 +364,29 @@ if __name__ == "__main__":
         }
     }
 
-    snapshot_manager = StateSnapshot()
+    snapshot_manager = StateSnapshot(base_interval=3)
 
-    # Create a snapshot at block height 10
+    # Create a base snapshot at block height 10
     snapshot_manager.create_snapshot(mock_state, 10)
 
-    # Load the snapshot
-    loaded_state = snapshot_manager.load_snapshot(10)
-    print("Loaded State:", loaded_state)
-
-    # Create another snapshot at block height 20
+    # Create delta snapshots holding only the changed keys
+    mock_state["balances"]["Alice"] = 80
+    mock_state["balances"]["Carol"] = 20
     snapshot_manager.create_snapshot(mock_state, 20)
+    del mock_state["utxo_set"][("tx1", 0)]
+    snapshot_manager.create_snapshot(mock_state, 30)
 
-    # Cleanup old snapshots, keeping only the last 1
+    # Load the snapshot by replaying the delta chain
+    loaded_state = snapshot_manager.load_snapshot(30)
+    print("Loaded State:", loaded_state)
+
+    # Compact old snapshots, keeping only the last 1
     snapshot_manager.cleanup_old_snapshots(keep_last_n=1)
 
     # Get the latest snapshot
     latest_snapshot, height = snapshot_manager.get_latest_snapshot()
     print(f"Latest Snapshot: {latest_snapshot} (Block Height: {height})")
+
+    # Stream the state into a chunked binary snapshot
+    manifest = snapshot_manager.create_chunked_snapshot(iter_state_entries(mock_state), 30, chunk_size=64)
+    print("Chunk hashes:", [chunk["hash"] for chunk in manifest["chunks"]])
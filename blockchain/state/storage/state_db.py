@@ -1,20 +1,94 @@
 import os
 import json
 import shutil
+import struct
+import threading
 from pathlib import Path
 import time
 import plyvel  # type: ignore # LevelDB library for Python
+from blockchain.state.chunked_snapshot import ChunkedSnapshotReader, ChunkedSnapshotWriter
+
+# Internal keys start with 0x00, so they sort before all state keys and the iterators skip them
+_STATE_START = b"\x01"
+_SEQUENCE_KEY = b"\x00meta/sequence"
+_CHANGELOG_PREFIX = b"\x00changelog/"
+_SEQUENCE = struct.Struct(">Q")
+
+# Defaults for the "backup" section of storage_config.json
+DEFAULT_BACKUP_CONFIG = {
+    "enabled": True,
+    "backup_path": "blockchain/state/storage/backups",
+    "online": True,
+    "incremental": False,
+    "track_changes": False,
+    "chunk_size_mb": 4,
+    "max_mb_per_second": None
+}
 
 class StateDB:
     """Manages persistent storage for blockchain state data."""
 
-    def __init__(self, db_path="blockchain/state/storage/state_db"):
+    def __init__(self, db_path="blockchain/state/storage/state_db", track_changes=False, backup_config=None):
         """
         Initializes the StateDB.
         :param db_path: Path to the database directory.
+        :param track_changes: If True, every write also logs the changed key under an increasing
+                              sequence number, which incremental backups use as their watermark.
+        :param backup_config: The "backup" section of storage_config.json (defaults are used for missing
+                              keys); it supplies the path, chunk size and throttle of online backups.
         """
         self.db_path = Path(db_path)
         self.db = plyvel.DB(str(self.db_path), create_if_missing=True)
+        self.track_changes = track_changes
+        self.backup_config = {**DEFAULT_BACKUP_CONFIG, **(backup_config or {})}
+        sequence = self.db.get(_SEQUENCE_KEY)
+        self.sequence = _SEQUENCE.unpack(sequence)[0] if sequence else 0
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_file="blockchain/state/storage/storage_config.json"):
+        """
+        Opens the StateDB described by a storage configuration. Change tracking is enabled as its
+        "backup" section asks, so that incremental backups have a changelog to read.
+        :param config_file: Path to the storage configuration.
+        :return: The StateDB.
+        """
+        with open(config_file, "r") as file:
+            config = json.load(file)
+        backup_config = config.get("backup", {})
+        return cls(config.get("database_path", "blockchain/state/storage/state_db"),
+                   track_changes=backup_config.get("track_changes", False), backup_config=backup_config)
+
+    def _log_change(self, batch, key_bytes):
+        """
+        Appends a changed key to the changelog within the same write batch.
+        """
+        if self.track_changes:
+            self.sequence += 1
+            batch.put(_CHANGELOG_PREFIX + _SEQUENCE.pack(self.sequence), key_bytes)
+            batch.put(_SEQUENCE_KEY, _SEQUENCE.pack(self.sequence))
+
+    def _write(self, puts=(), deletes=(), log_changes=True):
+        """
+        Writes encoded puts and deletes atomically in a single write batch.
+        :param puts: Iterable of (key_bytes, value_bytes) pairs.
+        :param deletes: Iterable of key_bytes.
+        :param log_changes: If False, the writes are not added to the changelog (restores).
+        :return: The number of puts and deletes written.
+        """
+        count = 0
+        with self._write_lock, self.db.write_batch() as batch:
+            for key_bytes, value_bytes in puts:
+                batch.put(key_bytes, value_bytes)
+                if log_changes:
+                    self._log_change(batch, key_bytes)
+                count += 1
+            for key_bytes in deletes:
+                batch.delete(key_bytes)
+                if log_changes:
+                    self._log_change(batch, key_bytes)
+                count += 1
+        return count
 
     def set_value(self, key, value):
         """
@@ -24,19 +98,20 @@ class StateDB:
         """
         key_bytes = key.encode("utf-8")
         value_bytes = json.dumps(value).encode("utf-8")
-        self.db.put(key_bytes, value_bytes)
+        self._write(puts=[(key_bytes, value_bytes)])
 
-    def get_value(self, key):
+    def get_value(self, key, default=None):
         """
         Retrieves a value by key from the database.
         :param key: The key (string).
-        :return: The value (deserialized), or None if the key is not found.
+        :param default: The value returned if the key is not found.
+        :return: The value (deserialized), or the default if the key is not found.
         """
         key_bytes = key.encode("utf-8")
         value_bytes = self.db.get(key_bytes)
         if value_bytes:
             return json.loads(value_bytes.decode("utf-8"))
-        return None
+        return default
 
     def delete_value(self, key):
         """
@@ -44,18 +119,104 @@ class StateDB:
         :param key: The key to delete.
         """
         key_bytes = key.encode("utf-8")
-        self.db.delete(key_bytes)
+        self._write(deletes=[key_bytes])
+
+    def _iterate(self, raw=False, keys_only=False, reverse=False, **options):
+        """
+        Runs a LevelDB iterator, decoding only what the caller asked for.
+        :param raw: If True, yield the stored bytes without decoding.
+        :param keys_only: If True, yield keys only; values are never read or decoded.
+        :param reverse: If True, iterate in descending key order.
+        :param options: Bounds passed to plyvel (prefix, start, stop, include_stop).
+        """
+        with self.db.iterator(include_value=not keys_only, reverse=reverse, **options) as it:
+            if keys_only:
+                for key_bytes in it:
+                    yield key_bytes if raw else key_bytes.decode("utf-8")
+            elif raw:
+                yield from it
+            else:
+                for key_bytes, value_bytes in it:
+                    yield key_bytes.decode("utf-8"), json.loads(value_bytes.decode("utf-8"))
 
-    def iterate_all(self):
+    def iterate_all(self, raw=False, keys_only=False, reverse=False):
         """
         Iterates over all key-value pairs in the database.
-        :return: A generator yielding (key, value) tuples.
+        :param raw: If True, yield the stored bytes without decoding.
+        :param keys_only: If True, yield keys only.
+        :param reverse: If True, iterate in descending key order.
+        :return: A generator yielding (key, value) tuples (or keys).
+        """
+        return self._iterate(raw, keys_only, reverse, start=_STATE_START)
+
+    def iterate_prefix(self, prefix, raw=False, keys_only=False, reverse=False):
+        """
+        Iterates over the key-value pairs whose key starts with a prefix, in key order.
+        :param prefix: The key prefix (string).
+        :param raw: If True, yield the stored bytes without decoding.
+        :param keys_only: If True, yield keys only.
+        :param reverse: If True, iterate in descending key order.
+        :return: A generator yielding (key, value) tuples (or keys).
         """
-        with self.db.iterator() as it:
-            for key_bytes, value_bytes in it:
-                key = key_bytes.decode("utf-8")
-                value = json.loads(value_bytes.decode("utf-8"))
-                yield key, value
+        return self._iterate(raw, keys_only, reverse, prefix=prefix.encode("utf-8"))
+
+    def iterate_range(self, start=None, stop=None, include_stop=False, raw=False, keys_only=False, reverse=False):
+        """
+        Iterates over the key-value pairs in a key range, without touching keys outside of it.
+        :param start: The first key of the range (inclusive), or None to start at the first key.
+        :param stop: The end of the range (exclusive unless include_stop), or None to run to the last key.
+        :param include_stop: If True, the stop key is part of the range.
+        :param raw: If True, yield the stored bytes without decoding.
+        :param keys_only: If True, yield keys only.
+        :param reverse: If True, iterate from the end of the range towards its start.
+        :return: A generator yielding (key, value) tuples (or keys).
+        """
+        options = {"include_stop": include_stop, "start": _STATE_START if start is None else start.encode("utf-8")}
+        if stop is not None:
+            options["stop"] = stop.encode("utf-8")
+        return self._iterate(raw, keys_only, reverse, **options)
+
+    def apply_batch(self, puts, deletes=()):
+        """
+        Writes and deletes several keys atomically in a single LevelDB write batch.
+        :param puts: Dictionary of key -> value to store.
+        :param deletes: Keys to delete.
+        """
+        self._write(((key.encode("utf-8"), json.dumps(value).encode("utf-8")) for key, value in puts.items()),
+                    (key.encode("utf-8") for key in deletes))
+
+    def put_raw_batch(self, entries):
+        """
+        Writes already-encoded key-value pairs in a single LevelDB write batch.
+        :param entries: Iterable of (key_bytes, value_bytes) pairs.
+        :return: The number of entries written.
+        """
+        return self._write(entries)
+
+    def bulk_load(self, entries, batch_size=10_000, raw=False):
+        """
+        Loads key-sorted pairs into the database in write batches of bounded size, e.g. for index
+        rebuilds or restores. Sorted input keeps LevelDB compaction cheap; unsorted input is rejected.
+        The order is checked over all pairs before the first batch is written, so rejected input leaves
+        the database untouched (the encoded pairs are held in memory until then).
+        :param entries: Iterable of (key, value) pairs in ascending key order.
+        :param batch_size: Number of pairs per write batch.
+        :param raw: If True, the pairs are already-encoded bytes; otherwise keys are strings and values
+                    are JSON-encoded.
+        :return: The number of pairs written.
+        """
+        encoded = []
+        previous_key = None
+        for key, value in entries:
+            key_bytes = key if raw else key.encode("utf-8")
+            if previous_key is not None and key_bytes <= previous_key:
+                raise ValueError(f"bulk_load requires strictly ascending keys ({key_bytes!r} after {previous_key!r}).")
+            encoded.append((key_bytes, value if raw else json.dumps(value).encode("utf-8")))
+            previous_key = key_bytes
+
+        for start in range(0, len(encoded), batch_size):
+            self._write(encoded[start:start + batch_size])
+        return len(encoded)
 
     def backup(self, backup_path="blockchain/state/storage/backups"):
         """
@@ -68,6 +229,170 @@ class StateDB:
         shutil.make_archive(str(backup_file).replace(".tar.gz", ""), 'gztar', str(self.db_path))
         print(f"Backup created at: {backup_file}")
 
+    @staticmethod
+    def _throttle(entries, max_bytes_per_second):
+        """
+        Paces an entry stream so that backups do not starve block processing of disk bandwidth.
+        """
+        if not max_bytes_per_second:
+            yield from entries
+            return
+        start_time = time.monotonic()
+        sent = 0
+        for key_bytes, value_bytes in entries:
+            sent += len(key_bytes) + len(value_bytes)
+            delay = sent / max_bytes_per_second - (time.monotonic() - start_time)
+            if delay > 0:
+                time.sleep(delay)
+            yield key_bytes, value_bytes
+
+    def _write_backup(self, snapshot, backup_path, since_sequence, chunk_size, max_bytes_per_second):
+        """
+        Writes a chunked backup from a LevelDB snapshot, then releases the snapshot.
+        """
+        try:
+            sequence = snapshot.get(_SEQUENCE_KEY)
+            sequence = _SEQUENCE.unpack(sequence)[0] if sequence else 0
+            if since_sequence is None:
+                kind = "full"
+                entries = snapshot.iterator(start=_STATE_START)
+            else:
+                kind = "incremental"
+                changed_keys = sorted(set(snapshot.iterator(
+                    start=_CHANGELOG_PREFIX + _SEQUENCE.pack(since_sequence + 1),
+                    stop=_CHANGELOG_PREFIX + _SEQUENCE.pack(sequence + 1),
+                    include_key=False
+                )))
+                # Deleted keys are recorded with an empty value
+                entries = ((key_bytes, snapshot.get(key_bytes, b"")) for key_bytes in changed_keys)
+
+            backup_dir = Path(backup_path) / f"state_backup_{kind}_{sequence}"
+            writer = ChunkedSnapshotWriter(str(backup_dir), chunk_size)
+            manifest = writer.write(self._throttle(entries, max_bytes_per_second), block_height=None, metadata={
+                "kind": kind, "sequence": sequence, "base_sequence": since_sequence
+            })
+        finally:
+            snapshot.close()
+
+        if kind == "full" and self.track_changes:
+            self.prune_changelog(sequence)
+        print(f"Online {kind} backup created at: {backup_dir} (sequence {sequence})")
+        return manifest
+
+    def _backup_options(self, backup_path, since_sequence, chunk_size, max_bytes_per_second):
+        """
+        Fills in the backup options left unset from the backup configuration.
+        """
+        if since_sequence is not None and not self.track_changes:
+            raise ValueError("Incremental backups require a StateDB opened with track_changes=True.")
+        config = self.backup_config
+        if backup_path is None:
+            backup_path = config["backup_path"]
+        if chunk_size is None:
+            chunk_size = int(config["chunk_size_mb"] * 1024 * 1024)
+        if max_bytes_per_second is None and config["max_mb_per_second"]:
+            max_bytes_per_second = int(config["max_mb_per_second"] * 1024 * 1024)
+        return backup_path, since_sequence, chunk_size, max_bytes_per_second
+
+    def online_backup(self, backup_path=None, since_sequence=None, chunk_size=None, max_bytes_per_second=None):
+        """
+        Creates a consistent backup from a point-in-time LevelDB snapshot while writes continue.
+        :param backup_path: Path to the backup directory (default: the configured backup_path).
+        :param since_sequence: If set, only keys changed after this sequence (the "sequence" of the
+                               previous backup) are included; requires track_changes.
+        :param chunk_size: Target size of a backup chunk in bytes before compression (default: the
+                           configured chunk_size_mb).
+        :param max_bytes_per_second: Read/write throttle (default: the configured max_mb_per_second;
+                                     0 disables it).
+        :return: The backup manifest (dict).
+        """
+        options = self._backup_options(backup_path, since_sequence, chunk_size, max_bytes_per_second)
+        return self._write_backup(self.db.snapshot(), *options)
+
+    def start_online_backup(self, backup_path=None, since_sequence=None, chunk_size=None, max_bytes_per_second=None,
+                            on_complete=None):
+        """
+        Runs online_backup in a background thread. The snapshot is taken before returning, so the
+        backup reflects the database as of this call.
+        :param on_complete: Optional callback receiving the backup manifest.
+        :return: The backup thread.
+        """
+        options = self._backup_options(backup_path, since_sequence, chunk_size, max_bytes_per_second)
+        snapshot = self.db.snapshot()
+
+        def run():
+            manifest = self._write_backup(snapshot, *options)
+            if on_complete:
+                on_complete(manifest)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def run_configured_backup(self, since_sequence=None):
+        """
+        Takes the backup the configuration asks for: nothing if backups are disabled, an archive of the
+        database directory if they are not online, and otherwise an online backup, incremental when
+        configured and a previous sequence is given.
+        :param since_sequence: The "sequence" of the previous backup, if any.
+        :return: The backup manifest, or None if no online backup was taken.
+        """
+        config = self.backup_config
+        if not config["enabled"]:
+            return None
+        if not config["online"]:
+            self.backup(config["backup_path"])
+            return None
+        return self.online_backup(since_sequence=since_sequence if config["incremental"] else None)
+
+    def prune_changelog(self, up_to_sequence):
+        """
+        Deletes changelog entries up to a sequence that is covered by a full backup.
+        :param up_to_sequence: The last sequence to delete.
+        """
+        stop = _CHANGELOG_PREFIX + _SEQUENCE.pack(up_to_sequence + 1)
+        with self.db.write_batch() as batch:
+            for key_bytes in self.db.iterator(start=_CHANGELOG_PREFIX, stop=stop, include_value=False):
+                batch.delete(key_bytes)
+
+    def restore_online_backup(self, backup_dirs):
+        """
+        Restores a full online backup followed by its incremental backups into the open database. The
+        restored writes are not logged; the sequence watermark is set to the last backup's, so that the
+        next incremental backup continues from it.
+        :param backup_dirs: Backup directories, the full backup first and then incrementals in order.
+        :return: The sequence the database was restored to.
+        """
+        sequence = None
+        for backup_dir in backup_dirs:
+            reader = ChunkedSnapshotReader(backup_dir)
+            manifest = reader.manifest
+            if manifest["kind"] == "full":
+                stale_keys = list(self.iterate_all(raw=True, keys_only=True))
+                for start in range(0, len(stale_keys), 10_000):
+                    self._write(deletes=stale_keys[start:start + 10_000], log_changes=False)
+            elif manifest["base_sequence"] != sequence:
+                raise ValueError(f"Backup {backup_dir} does not continue from sequence {sequence}.")
+            for index in range(len(manifest["chunks"])):
+                entries = list(reader.iter_chunk_entries(reader.read_chunk(index)))
+                self._write(puts=[(key, value) for key, value in entries if value],
+                            deletes=[key for key, value in entries if not value], log_changes=False)
+            sequence = manifest["sequence"]
+        if sequence is not None:
+            self._set_sequence(sequence)
+        print(f"Database restored from online backups up to sequence {sequence}.")
+        return sequence
+
+    def _set_sequence(self, sequence):
+        """
+        Moves the sequence watermark, dropping the changelog, which describes the replaced contents.
+        """
+        with self._write_lock, self.db.write_batch() as batch:
+            for key_bytes in self.db.iterator(prefix=_CHANGELOG_PREFIX, include_value=False):
+                batch.delete(key_bytes)
+            batch.put(_SEQUENCE_KEY, _SEQUENCE.pack(sequence))
+        self.sequence = sequence
+
     def restore(self, backup_file):
         """
         Restores the database from a backup file.
@@ -80,6 +405,12 @@ class StateDB:
         self.db = plyvel.DB(str(self.db_path), create_if_missing=False)
         print(f"Database restored from: {backup_file}")
 
+    def compact(self):
+        """
+        Compacts the whole key range, reclaiming the space of deleted and overwritten keys.
+        """
+        self.db.compact_range()
+
     def close(self):
         """
         Closes the database connection.
@@ -120,5 +451,10 @@ if __name__ == "__main__":
     for key, value in state_db.iterate_all():
         print(f"{key}: {value}")
 
+    # Bulk-load sorted per-account keys and scan them by prefix and range
+    state_db.bulk_load((f"account/{name}", balance) for name, balance in sorted(balances.items()))
+    print("Accounts:", list(state_db.iterate_prefix("account/", keys_only=True)))
+    print("From Bob backwards:", list(state_db.iterate_range(stop="account/Bob", include_stop=True, reverse=True)))
+
     # Close the database
     state_db.close()
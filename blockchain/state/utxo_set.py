@@ -1,5 +1,5 @@
-import hashlib
 import json
+from blockchain.cryptography.hashing import Hashing
 
 class UTXOSet:
     """Manages the Unspent Transaction Output (UTXO) set."""
@@ -108,7 +108,7 @@ class UTXOSet:
         :return: The transaction ID as a hexadecimal string.
         """
         transaction_data = json.dumps(transaction, sort_keys=True)
-        return hashlib.sha256(transaction_data.encode("utf-8")).hexdigest()
+        return Hashing.sha256(transaction_data)
 
 
 # Example usage
@@ -1,16 +1,18 @@
 class FeeCalculator:
     """Calculates transaction fees using different fee models."""
 
-    def __init__(self, base_fee=1, dynamic_fee_rate=0.01, congestion_threshold=1000):
+    def __init__(self, base_fee=1, dynamic_fee_rate=0.01, congestion_threshold=1000, gas_price=0.001):
         """
         Initializes the FeeCalculator.
         :param base_fee: The static base fee for all transactions.
         :param dynamic_fee_rate: The dynamic fee rate (percentage of transaction amount).
         :param congestion_threshold: Number of pending transactions that triggers congestion pricing.
+        :param gas_price: The fee per unit of gas used by contract calls.
         """
         self.base_fee = base_fee
         self.dynamic_fee_rate = dynamic_fee_rate
         self.congestion_threshold = congestion_threshold
+        self.gas_price = gas_price
 
     def calculate_static_fee(self):
         """
@@ -37,18 +39,28 @@ class FeeCalculator:
             return self.base_fee * 2  # Double the base fee as congestion penalty
         return 0
 
-    def calculate_total_fee(self, transaction_amount, pending_transactions):
+    def calculate_gas_fee(self, gas_used):
+        """
+        Calculates the fee for the gas consumed by a contract call.
+        :param gas_used: The gas used by the call.
+        :return: The gas fee.
+        """
+        return gas_used * self.gas_price
+
+    def calculate_total_fee(self, transaction_amount, pending_transactions, gas_used=0):
         """
         Calculates the total fee for a transaction.
         :param transaction_amount: The amount of the transaction.
         :param pending_transactions: The current number of pending transactions in the pool.
+        :param gas_used: The gas used (or the gas limit, when estimating) of a contract call.
         :return: The total transaction fee.
         """
         static_fee = self.calculate_static_fee()
         dynamic_fee = self.calculate_dynamic_fee(transaction_amount)
         congestion_fee = self.calculate_congestion_fee(pending_transactions)
+        gas_fee = self.calculate_gas_fee(gas_used)
 
-        total_fee = static_fee + dynamic_fee + congestion_fee
+        total_fee = static_fee + dynamic_fee + congestion_fee + gas_fee
         return total_fee
 
 
@@ -1,7 +1,7 @@
-import hashlib
 import time
 import heapq
 import json
+from blockchain.cryptography.hashing import Hashing
 
 class MempoolManager:
     """Manages the mempool of unconfirmed transactions."""
@@ -105,7 +105,7 @@ class MempoolManager:
         :return: A string hash representing the transaction ID.
         """
         transaction_data = json.dumps(transaction, sort_keys=True, separators=(',', ':'))
-        return hashlib.sha256(transaction_data.encode('utf-8')).hexdigest()
+        return Hashing.sha256(transaction_data)
 
 
 # Example usage
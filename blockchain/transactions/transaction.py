@@ -1,8 +1,8 @@
-import hashlib
 import json
 from typing import Optional
 from cryptography.hazmat.primitives.asymmetric import rsa, padding # type: ignore
 from cryptography.hazmat.primitives import hashes, serialization # type: ignore
+from blockchain.cryptography.hashing import Hashing
 
 
 class Transaction:
@@ -19,12 +19,13 @@ class Transaction:
         return int(time.time())
 
     def calculate_hash(self) -> str:
-        """Calculates the hash of the transaction."""
+        """Calculates the hash of the transaction (hex: it identifies the transaction in pools and APIs)."""
         tx_content = f"{self.sender}{self.receiver}{self.amount}{self.timestamp}"
-        return hashlib.sha256(tx_content.encode()).hexdigest()
+        return Hashing.sha256(tx_content)
 
     def sign_transaction(self, private_key: rsa.RSAPrivateKey):
         """Signs the transaction using the sender's private key."""
+        # The signed message stays the hex hash: wallets and the API sign and verify that encoding
         tx_hash = self.calculate_hash()
         self.signature = private_key.sign(
             tx_hash.encode(),
@@ -1,8 +1,8 @@
-import hashlib
 import json
 from cryptography.hazmat.primitives.asymmetric import rsa, padding # type: ignore
 from cryptography.hazmat.primitives import hashes # type: ignore
 from cryptography.hazmat.primitives.serialization import load_pem_public_key # type: ignore
+from blockchain.cryptography.hashing import Hashing
 
 class TransactionValidation:
     """Validates transactions for signature authenticity, balance sufficiency, and protocol compliance."""
@@ -22,7 +22,7 @@ class TransactionValidation:
         :return: The SHA-256 hash of the transaction as a hexadecimal string.
         """
         transaction_data = json.dumps(transaction, sort_keys=True)
-        return hashlib.sha256(transaction_data.encode('utf-8')).hexdigest()
+        return Hashing.sha256(transaction_data)
 
     def validate_signature(self, transaction):
         """
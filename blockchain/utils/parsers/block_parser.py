@@ -1,6 +1,5 @@
 import json
-from hashlib import sha256
-from utils.merkle_tree import MerkleTree  # type: ignore # Assuming MerkleTree is implemented in utils/merkle_tree.py
+from blocks.block import Block
 from utils.data_serializer import DataSerializer  # Assuming DataSerializer is in utils/
 
 class BlockParser:
@@ -45,13 +44,11 @@ class BlockParser:
     @staticmethod
     def recompute_merkle_root(transactions):
         """
-        Recomputes the Merkle root from the transactions.
+        Recomputes the Merkle root from the transactions, as the block computed it.
         :param transactions: A list of transaction data.
         :return: The recomputed Merkle root as a hexadecimal string.
         """
-        transaction_hashes = [sha256(json.dumps(tx).encode('utf-8')).hexdigest() for tx in transactions]
-        merkle_tree = MerkleTree(transaction_hashes)
-        return merkle_tree.root
+        return Block.compute_merkle_root(transactions)
 
     @staticmethod
     def validate_merkle_root(block):
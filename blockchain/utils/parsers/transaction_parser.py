@@ -1,5 +1,4 @@
 import json
-from hashlib import sha256
 from cryptography.hazmat.primitives import hashes # type: ignore
 from cryptography.hazmat.primitives.asymmetric import ec # type: ignore
 from cryptography.hazmat.primitives.serialization import load_pem_public_key # type: ignore
@@ -1,6 +1,6 @@
-import hashlib
 from typing import Dict, Any
 from zksnark_library import generate_proof, verify_proof  # type: ignore # Mocked ZK-SNARK library
+from blockchain.cryptography.hashing import Hashing
 
 class ZKTransaction:
     """Handles private transactions using ZK-SNARKs for confidentiality and validity."""
@@ -25,7 +25,7 @@ class ZKTransaction:
         :return: The transaction hash as a string.
         """
         tx_string = f"{self.sender}{self.receiver}{self.amount}"
-        return hashlib.sha256(tx_string.encode()).hexdigest()
+        return Hashing.sha256(tx_string)
 
     def generate_proof(self) -> Dict[str, Any]:
         """
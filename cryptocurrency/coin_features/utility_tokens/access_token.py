@@ -1,6 +1,6 @@
-import hashlib
 import time
 from typing import Dict, Optional
+from blockchain.cryptography.hashing import Hashing
 
 
 class AccessToken:
@@ -22,7 +22,7 @@ class AccessToken:
         """
         timestamp = int(time.time())
         token_data = f"{user_id}{timestamp}"
-        token = hashlib.sha256(token_data.encode()).hexdigest()
+        token = Hashing.sha256(token_data)
 
         self.tokens[token] = {"user": user_id, "expiry": timestamp + self.token_expiry_seconds}
         print(f"Generated token for user '{user_id}': {token}")
@@ -1,24 +1,34 @@
 import time
-import hashlib
 from typing import List, Dict
-from random import choices
+from random import Random
+from blockchain.consensus.stake_sampler import AliasSampler
+from blockchain.cryptography.hashing import Hasher, Hashing
 
 
 class HybridMining:
     """Implements a hybrid Proof of Work (PoW) and Proof of Stake (PoS) consensus mechanism."""
 
-    def __init__(self, pow_difficulty: int, pos_weight: float, block_reward: float):
+    def __init__(self, pow_difficulty: int, pos_weight: float, block_reward: float, seed: int = None,
+                 stake_epoch_blocks: int = 100):
         """
         Initializes the hybrid mining system.
         :param pow_difficulty: Difficulty level for PoW mining.
         :param pos_weight: Weightage of PoS in block validation (0.0 to 1.0).
         :param block_reward: Reward for successfully mining a block.
+        :param seed: Optional seed making PoS validator selection reproducible.
+        :param stake_epoch_blocks: Number of blocks after which validator rewards are reflected in PoS
+                                   selection; stakes added with add_stake count immediately.
         """
+        if stake_epoch_blocks < 1:
+            raise ValueError("stake_epoch_blocks must be at least 1.")
         self.pow_difficulty = pow_difficulty
         self.pos_weight = pos_weight
         self.block_reward = block_reward
         self.stakes = {}  # Stores stakes {address: amount}
         self.chain = []   # Stores mined blocks
+        self.rng = Random(seed)
+        self.stake_epoch_blocks = stake_epoch_blocks
+        self._sampler = None  # Alias table over the stakes, rebuilt lazily after a deposit or an epoch
 
     def proof_of_work(self, block_data: str) -> (str, int):
         """
@@ -27,10 +37,11 @@ class HybridMining:
         :return: A tuple of the valid hash and nonce.
         """
         nonce = 0
+        prefix = Hasher('sha256', block_data)
         while True:
-            hash_value = hashlib.sha256(f"{block_data}{nonce}".encode('utf-8')).hexdigest()
-            if hash_value.startswith('0' * self.pow_difficulty):
-                return hash_value, nonce
+            digest = prefix.digest_with(str(nonce))
+            if Hashing.meets_difficulty(digest, self.pow_difficulty):
+                return digest.hex(), nonce
             nonce += 1
 
     def proof_of_stake(self) -> str:
@@ -40,8 +51,9 @@ class HybridMining:
         """
         if not self.stakes:
             raise ValueError("No validators available for PoS.")
-        addresses, weights = zip(*self.stakes.items())
-        return choices(addresses, weights=weights)[0]
+        if self._sampler is None:
+            self._sampler = AliasSampler(self.stakes, self.rng)
+        return self._sampler.sample()
 
     def mine_block(self, miner_address: str, block_data: str) -> Dict:
         """
@@ -74,8 +86,11 @@ class HybridMining:
         # Append block to the chain
         self.chain.append(block)
 
-        # Reward miner and validator
+        # Reward miner and validator; rewards reach PoS selection at the next epoch boundary, so the
+        # alias table is rebuilt once per epoch rather than once per block
         self.stakes[pos_validator] += self.block_reward * self.pos_weight
+        if len(self.chain) % self.stake_epoch_blocks == 0:
+            self._sampler = None
         return block
 
     def add_stake(self, address: str, amount: float):
@@ -87,6 +102,7 @@ class HybridMining:
         if amount <= 0:
             raise ValueError("Stake amount must be positive.")
         self.stakes[address] = self.stakes.get(address, 0.0) + amount
+        self._sampler = None
 
     def get_chain(self) -> List[Dict]:
         """
@@ -0,0 +1,135 @@
+from typing import Dict
+
+
+class RewardAccumulator:
+    """
+    Lazy reward distribution in the style of F1 fee distribution. Each block adds its reward pool divided by
+    the total stake to a cumulative reward-per-stake counter, which is O(1) whatever the number of
+    delegators. A delegator's reward is settled only when its stake changes or it is queried:
+    stake * (counter now - counter when its stake last changed).
+
+    Over any sequence of blocks this pays every delegator exactly what RewardDistribution.calculate_rewards
+    would pay block by block for the same stakes; rewards accrue separately from the stake (use
+    restake_rewards to compound them).
+    """
+
+    def __init__(self, total_block_reward: float, commission_rate: float = 0.1):
+        """
+        Initializes the RewardAccumulator.
+        :param total_block_reward: Total reward for a mined or validated block.
+        :param commission_rate: Percentage (as a decimal) of rewards taken as network fees or validator commission.
+        """
+        self.total_block_reward = total_block_reward
+        self.commission_rate = commission_rate
+        self.total_stake = 0.0
+        self.reward_per_stake = 0.0  # Cumulative reward paid per unit of stake since the start
+        self.commission = 0.0  # Commission collected so far
+        self.delegators: Dict[str, Dict[str, float]] = {}  # {address: {"stake", "snapshot", "accrued"}}
+
+    def distribute(self, block_reward: float = None):
+        """
+        Pays out one block reward to all current stakers in O(1).
+        :param block_reward: The reward of the block (defaults to total_block_reward).
+        """
+        if self.total_stake <= 0:
+            raise ValueError("Total stake cannot be zero.")
+        block_reward = self.total_block_reward if block_reward is None else block_reward
+        self.commission += block_reward * self.commission_rate
+        self.reward_per_stake += block_reward * (1 - self.commission_rate) / self.total_stake
+
+    def _settle(self, address: str) -> Dict[str, float]:
+        """
+        Moves the rewards earned since the delegator's last settlement into its accrued balance.
+        """
+        delegator = self.delegators.setdefault(address, {"stake": 0.0, "snapshot": self.reward_per_stake,
+                                                         "accrued": 0.0})
+        delegator["accrued"] += delegator["stake"] * (self.reward_per_stake - delegator["snapshot"])
+        delegator["snapshot"] = self.reward_per_stake
+        return delegator
+
+    def stake(self, address: str, amount: float):
+        """
+        Adds stake for a delegator, settling its rewards at the old stake first.
+        :param address: The delegator's address.
+        :param amount: The amount to stake.
+        """
+        if amount <= 0:
+            raise ValueError("Stake amount must be positive.")
+        delegator = self._settle(address)
+        delegator["stake"] += amount
+        self.total_stake += amount
+
+    def unstake(self, address: str, amount: float = None) -> float:
+        """
+        Removes stake from a delegator (all of it by default). Accrued rewards stay claimable.
+        :param address: The delegator's address.
+        :param amount: The amount to unstake.
+        :return: The amount unstaked.
+        """
+        if address not in self.delegators:
+            raise ValueError(f"No stakes found for address {address}.")
+        delegator = self._settle(address)
+        amount = delegator["stake"] if amount is None else amount
+        if amount <= 0 or amount > delegator["stake"]:
+            raise ValueError(f"Cannot unstake {amount} tokens from a stake of {delegator['stake']}.")
+        delegator["stake"] -= amount
+        self.total_stake -= amount
+        if delegator["stake"] == 0 and delegator["accrued"] == 0:
+            del self.delegators[address]
+        return amount
+
+    def get_stake(self, address: str) -> float:
+        """
+        :return: The stake of a delegator.
+        """
+        return self.delegators.get(address, {}).get("stake", 0.0)
+
+    def get_rewards(self, address: str) -> float:
+        """
+        Returns the rewards a delegator has earned and not yet withdrawn.
+        :param address: The delegator's address.
+        :return: The accrued rewards.
+        """
+        delegator = self.delegators.get(address)
+        if delegator is None:
+            return 0.0
+        return delegator["accrued"] + delegator["stake"] * (self.reward_per_stake - delegator["snapshot"])
+
+    def withdraw_rewards(self, address: str) -> float:
+        """
+        Pays out a delegator's accrued rewards.
+        :param address: The delegator's address.
+        :return: The amount withdrawn.
+        """
+        if address not in self.delegators:
+            return 0.0
+        delegator = self._settle(address)
+        rewards, delegator["accrued"] = delegator["accrued"], 0.0
+        if delegator["stake"] == 0:
+            del self.delegators[address]
+        return rewards
+
+    def restake_rewards(self, address: str) -> float:
+        """
+        Compounds a delegator's accrued rewards into its stake.
+        :param address: The delegator's address.
+        :return: The amount restaked.
+        """
+        rewards = self.withdraw_rewards(address)
+        if rewards > 0:
+            self.stake(address, rewards)
+        return rewards
+
+
+# Example usage
+if __name__ == "__main__":
+    accumulator = RewardAccumulator(total_block_reward=12.5, commission_rate=0.05)
+    accumulator.stake("address1", 100)
+    accumulator.stake("address2", 200)
+    for _ in range(10):
+        accumulator.distribute()
+    accumulator.stake("address3", 300)
+    accumulator.distribute()
+
+    for address in ["address1", "address2", "address3"]:
+        print(f"{address}: stake {accumulator.get_stake(address):.2f}, rewards {accumulator.get_rewards(address):.4f}")
@@ -0,0 +1,163 @@
+from typing import Dict, Iterable, Tuple
+import numpy as np # type: ignore
+
+
+class StakeLedger:
+    """
+    Columnar stake ledger: account ids index a NumPy array of integer amounts (in base units), so rewards,
+    commission and slashing over every staker are single vectorized operations instead of dict loops.
+    """
+
+    def __init__(self, unit: int = 10 ** 8, capacity: int = 1024):
+        """
+        Initializes an empty StakeLedger.
+        :param unit: Base units per token; amounts are stored as integers of this unit.
+        :param capacity: Initial number of accounts the arrays can hold.
+        """
+        self.unit = unit
+        self.ids: Dict[str, int] = {}  # {address: account id}
+        self.addresses = []  # account id -> address
+        self.amounts = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+    @classmethod
+    def from_dict(cls, stakes: Dict[str, float], unit: int = 10 ** 8) -> 'StakeLedger':
+        """
+        Builds a ledger from the dict API's {address: amount} stakes.
+        :param stakes: Dictionary of stakes {address: amount in tokens}.
+        :param unit: Base units per token.
+        :return: The StakeLedger.
+        """
+        ledger = cls(unit, capacity=max(len(stakes), 1))
+        ledger.addresses = list(stakes)
+        ledger.ids = {address: account_id for account_id, address in enumerate(ledger.addresses)}
+        ledger.size = len(stakes)
+        amounts = np.fromiter(stakes.values(), dtype=np.float64, count=len(stakes))
+        ledger.amounts[:ledger.size] = np.round(amounts * unit)
+        return ledger
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Converts the ledger back to {address: amount in tokens}.
+        :return: Dictionary of stakes.
+        """
+        return dict(zip(self.addresses, (self.stakes / self.unit).tolist()))
+
+    @property
+    def stakes(self) -> np.ndarray:
+        """The amounts of the existing accounts (a view, in base units)."""
+        return self.amounts[:self.size]
+
+    def account_ids(self, addresses: Iterable[str]) -> np.ndarray:
+        """
+        :return: The account ids of addresses, as an array usable to index stakes.
+        """
+        return np.fromiter((self.ids[address] for address in addresses), dtype=np.int64)
+
+    def set_stake(self, address: str, amount: float):
+        """
+        Sets the stake of an account, creating it if needed.
+        :param address: The staker's address.
+        :param amount: The stake in tokens.
+        """
+        account_id = self.ids.get(address)
+        if account_id is None:
+            if self.size == len(self.amounts):
+                self.amounts = np.concatenate([self.amounts, np.zeros(len(self.amounts), dtype=np.int64)])
+            account_id = self.size
+            self.ids[address] = account_id
+            self.addresses.append(address)
+            self.size += 1
+        self.amounts[account_id] = round(amount * self.unit)
+
+    def get_stake(self, address: str) -> float:
+        """
+        :return: The stake of an address in tokens (0 for unknown addresses).
+        """
+        account_id = self.ids.get(address)
+        return 0.0 if account_id is None else int(self.amounts[account_id]) / self.unit
+
+    def total_stake(self) -> int:
+        """
+        :return: The total stake in base units.
+        """
+        return int(self.stakes.sum())
+
+    def calculate_rewards(self, reward: float, commission_rate: float = 0.0) -> Tuple[np.ndarray, int, int]:
+        """
+        Splits a reward proportionally to stake after commission. Shares are rounded down, so the result
+        never pays out more than the pool; the rounding remainder is returned as dust.
+        :param reward: The reward in tokens.
+        :param commission_rate: Percentage (as a decimal) taken as commission.
+        :return: A tuple (rewards per account in base units, commission, dust).
+        """
+        total = self.total_stake()
+        if total == 0:
+            raise ValueError("Total stake cannot be zero.")
+        reward_units = round(reward * self.unit)
+        commission = int(reward_units * commission_rate)
+        pool = reward_units - commission
+        rewards = np.floor(self.stakes * (pool / total)).astype(np.int64)
+        excess = int(rewards.sum()) - pool
+        if excess > 0:  # Float rounding overshoot of a few units: take them back from the largest shares
+            largest = np.argpartition(rewards, len(rewards) - excess)[len(rewards) - excess:]
+            rewards[largest] -= 1
+        return rewards, commission, pool - int(rewards.sum())
+
+    def distribute(self, reward: float, commission_rate: float = 0.0) -> Tuple[int, int]:
+        """
+        Adds a reward to every stake proportionally (compounding), in one vectorized step.
+        :param reward: The reward in tokens.
+        :param commission_rate: Percentage (as a decimal) taken as commission.
+        :return: A tuple (commission, dust) in base units, not credited to any staker.
+        """
+        rewards, commission, dust = self.calculate_rewards(reward, commission_rate)
+        self.amounts[:self.size] += rewards
+        return commission, dust
+
+    def slash(self, fraction: float, mask: np.ndarray = None) -> int:
+        """
+        Removes a fraction of the stake of every account selected by a mask (all accounts by default).
+        :param fraction: The fraction of stake slashed (e.g. 0.05).
+        :param mask: Optional boolean array over the accounts, or an array of account ids.
+        :return: The total amount slashed in base units.
+        """
+        selected = self.stakes if mask is None else self.stakes[mask]
+        penalties = np.floor(selected * fraction).astype(np.int64)
+        if mask is None:
+            self.amounts[:self.size] -= penalties
+        else:
+            self.stakes[mask] = selected - penalties
+        return int(penalties.sum())
+
+    def slash_for_downtime(self, downtime_seconds: np.ndarray, threshold_seconds: float, fraction: float) -> int:
+        """
+        Slashes every account whose downtime exceeds the threshold.
+        :param downtime_seconds: Array of downtime per account.
+        :param threshold_seconds: The downtime threshold.
+        :param fraction: The fraction of stake slashed.
+        :return: The total amount slashed in base units.
+        """
+        return self.slash(fraction, np.asarray(downtime_seconds)[:self.size] > threshold_seconds)
+
+    def settle_epoch(self, reward: float, commission_rate: float = 0.0, downtime_seconds: np.ndarray = None,
+                     downtime_threshold: float = 0.0, downtime_penalty: float = 0.0) -> Dict[str, int]:
+        """
+        End-of-epoch settlement: downtime slashing, then proportional reward distribution.
+        :return: A dictionary with the slashed, commission and dust amounts in base units.
+        """
+        slashed = 0
+        if downtime_seconds is not None:
+            slashed = self.slash_for_downtime(downtime_seconds, downtime_threshold, downtime_penalty)
+        commission, dust = self.distribute(reward, commission_rate)
+        return {"slashed": slashed, "commission": commission, "dust": dust}
+
+
+# Example usage
+if __name__ == "__main__":
+    ledger = StakeLedger.from_dict({"address1": 100, "address2": 200, "address3": 300})
+    commission, dust = ledger.distribute(12.5, commission_rate=0.05)
+    print("After rewards:", ledger.to_dict(), "Commission:", commission / ledger.unit, "Dust:", dust)
+
+    slashed = ledger.slash(0.05, ledger.account_ids(["address2"]))
+    print("After slashing address2:", ledger.to_dict(), "Slashed:", slashed / ledger.unit)
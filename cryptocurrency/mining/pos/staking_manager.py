@@ -1,9 +1,17 @@
+import heapq
 import time
-from typing import Dict, List
+from typing import Callable, Dict, List, Tuple
 
 
 class StakingManager:
-    """Manages staking operations in a Proof of Stake system."""
+    """
+    Manages staking operations in a Proof of Stake system.
+
+    Stake withdrawn with request_unstake leaves the validator set at once and waits in an unbonding queue,
+    a heap ordered by maturity time; process_unbonding releases the matured entries in O(k log n) for k
+    entries, so it can run on every block. Listeners (e.g. ValidatorSelection.update_stake) are called
+    with (address, active stake) on every stake change.
+    """
 
     def __init__(self, min_stake: float, lock_period: int):
         """
@@ -14,6 +22,23 @@ class StakingManager:
         self.min_stake = min_stake
         self.lock_period = lock_period
         self.stakes: Dict[str, Dict] = {}  # Stores staking data {address: {"amount": float, "timestamp": float}}
+        self.unbonding_queue: List[Tuple[float, int, str, float]] = []  # Heap of (maturity, sequence, address, amount)
+        self.unbonding: Dict[str, float] = {}  # {address: amount waiting in the unbonding queue}
+        self._sequence = 0  # Keeps heap order stable for entries maturing at the same time
+        self._validators = None  # Eligible validators, rebuilt lazily after a stake change
+        self.listeners: List[Callable[[str, float], None]] = []
+
+    def add_listener(self, callback: Callable[[str, float], None]):
+        """
+        Registers a callback notified of stake changes.
+        :param callback: Called with (address, active stake) after each change; the stake is 0 once withdrawn.
+        """
+        self.listeners.append(callback)
+
+    def _stake_changed(self, address: str):
+        self._validators = None
+        for callback in self.listeners:
+            callback(address, self.get_stake(address))
 
     def stake(self, address: str, amount: float) -> str:
         """
@@ -30,6 +55,7 @@ class StakingManager:
         else:
             self.stakes[address] = {"amount": amount, "timestamp": time.time()}
 
+        self._stake_changed(address)
         return f"Successfully staked {amount} tokens for address {address}."
 
     def unstake(self, address: str) -> str:
@@ -50,8 +76,62 @@ class StakingManager:
 
         unstaked_amount = stake_data["amount"]
         del self.stakes[address]  # Remove stake record
+        self._stake_changed(address)
         return f"Successfully unstaked {unstaked_amount} tokens for address {address}."
 
+    def request_unstake(self, address: str, amount: float = None, now: float = None) -> float:
+        """
+        Withdraws stake into the unbonding queue. The stake stops counting at once and is released by
+        process_unbonding when the lock period of the stake has passed.
+        :param address: Wallet address of the user unstaking tokens.
+        :param amount: Amount of tokens to unstake (all of the stake by default).
+        :param now: The current time (defaults to time.time()).
+        :return: The time at which the tokens are released.
+        """
+        if address not in self.stakes:
+            raise ValueError(f"No stakes found for address {address}.")
+
+        stake_data = self.stakes[address]
+        amount = stake_data["amount"] if amount is None else amount
+        if amount <= 0 or amount > stake_data["amount"]:
+            raise ValueError(f"Cannot unstake {amount} tokens from a stake of {stake_data['amount']}.")
+
+        now = time.time() if now is None else now
+        maturity = max(stake_data["timestamp"] + self.lock_period, now)
+        heapq.heappush(self.unbonding_queue, (maturity, self._sequence, address, amount))
+        self._sequence += 1
+        self.unbonding[address] = self.unbonding.get(address, 0.0) + amount
+
+        stake_data["amount"] -= amount
+        if stake_data["amount"] == 0:
+            del self.stakes[address]
+        self._stake_changed(address)
+        return maturity
+
+    def process_unbonding(self, now: float = None) -> List[Tuple[str, float]]:
+        """
+        Releases every unbonding entry that has matured; meant to run once per block.
+        :param now: The current time (defaults to time.time()).
+        :return: List of (address, amount) released, in maturity order.
+        """
+        now = time.time() if now is None else now
+        released = []
+        while self.unbonding_queue and self.unbonding_queue[0][0] <= now:
+            _, _, address, amount = heapq.heappop(self.unbonding_queue)
+            self.unbonding[address] -= amount
+            if self.unbonding[address] <= 0:
+                del self.unbonding[address]
+            released.append((address, amount))
+        return released
+
+    def get_unbonding(self, address: str) -> float:
+        """
+        Returns the amount of an address waiting in the unbonding queue.
+        :param address: Wallet address of the user.
+        :return: Amount of tokens unbonding.
+        """
+        return self.unbonding.get(address, 0.0)
+
     def get_stake(self, address: str) -> float:
         """
         Returns the staked amount for a given address.
@@ -62,10 +142,12 @@ class StakingManager:
 
     def get_all_validators(self) -> List[str]:
         """
-        Returns a list of all addresses that qualify as validators.
+        Returns a list of all addresses that qualify as validators, cached until the next stake change.
         :return: List of validator addresses.
         """
-        return [address for address, data in self.stakes.items() if data["amount"] >= self.min_stake]
+        if self._validators is None:
+            self._validators = [address for address, data in self.stakes.items() if data["amount"] >= self.min_stake]
+        return list(self._validators)
 
     def get_staking_info(self) -> Dict[str, Dict]:
         """
@@ -107,3 +189,9 @@ if __name__ == "__main__":
 
     # Check remaining staking info
     print("\nStaking Info After Unstaking:", manager.get_staking_info())
+
+    # Unbond through the queue: the stake leaves the validator set now and is released once matured
+    print(manager.stake("address1", 80))
+    maturity = manager.request_unstake("address1")
+    print("\nValidators while unbonding:", manager.get_all_validators())
+    print("Released:", manager.process_unbonding(now=maturity + manager.lock_period))
@@ -1,27 +1,32 @@
-import hashlib
+from typing import Union
+from blockchain.cryptography.hashing import Hashing, to_bytes
+
+BytesLike = Union[str, bytes, bytearray, memoryview]
 
 
 class HashingAlgorithm:
-    """Implements cryptographic hashing functions for the blockchain."""
+    """
+    Implements cryptographic hashing functions for the blockchain. Hex strings are produced for callers
+    that need them; the mining loop itself works on raw digests (see Block.mine_block).
+    """
 
     @staticmethod
-    def sha256(data: str) -> str:
+    def sha256(data: BytesLike) -> str:
         """
         Computes the SHA-256 hash of the input data.
-        :param data: The input data as a string.
+        :param data: The input data as a string or bytes.
         :return: The hexadecimal SHA-256 hash.
         """
-        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+        return Hashing.sha256_digest(data).hex()
 
     @staticmethod
-    def double_sha256(data: str) -> str:
+    def double_sha256(data: BytesLike) -> str:
         """
         Computes the double SHA-256 hash of the input data.
-        :param data: The input data as a string.
+        :param data: The input data as a string or bytes.
         :return: The hexadecimal double SHA-256 hash.
         """
-        first_hash = hashlib.sha256(data.encode('utf-8')).digest()
-        return hashlib.sha256(first_hash).hexdigest()
+        return Hashing.double_sha256_digest(data).hex()
 
     @staticmethod
     def merkle_hash(left_hash: str, right_hash: str) -> str:
@@ -31,8 +36,7 @@ class HashingAlgorithm:
         :param right_hash: The right hash as a hexadecimal string.
         :return: The hexadecimal hash of the concatenated hashes.
         """
-        combined = left_hash + right_hash
-        return hashlib.sha256(combined.encode('utf-8')).hexdigest()
+        return Hashing.sha256_digest(to_bytes(left_hash) + to_bytes(right_hash)).hex()
 
     @staticmethod
     def is_valid_hash(hash_value: str, difficulty: int) -> bool:
@@ -45,6 +49,16 @@ class HashingAlgorithm:
         target = '0' * difficulty
         return hash_value.startswith(target)
 
+    @staticmethod
+    def is_valid_digest(digest: bytes, difficulty: int) -> bool:
+        """
+        Checks if a raw digest satisfies the difficulty level, without converting it to hex.
+        :param digest: The digest as bytes.
+        :param difficulty: The number of leading zero hexadecimal digits required.
+        :return: True if the digest meets the difficulty requirement, False otherwise.
+        """
+        return Hashing.meets_difficulty(digest, difficulty)
+
 
 # Example usage
 if __name__ == "__main__":
@@ -61,8 +75,8 @@ if __name__ == "__main__":
     # Proof of Work Simulation
     nonce = 0
     while True:
-        hash_value = HashingAlgorithm.sha256(data + str(nonce))
-        if HashingAlgorithm.is_valid_hash(hash_value, difficulty):
-            print(f"Valid hash found: {hash_value} with nonce {nonce}")
+        digest = Hashing.sha256_digest(data + str(nonce))
+        if HashingAlgorithm.is_valid_digest(digest, difficulty):
+            print(f"Valid hash found: {digest.hex()} with nonce {nonce}")
             break
         nonce += 1
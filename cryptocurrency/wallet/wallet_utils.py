@@ -1,8 +1,8 @@
-import hashlib
 import base58 # type: ignore
 import qrcode # type: ignore
 from cryptography.hazmat.primitives.serialization import load_pem_public_key # type: ignore
 from cryptography.hazmat.primitives import hashes # type: ignore
+from blockchain.cryptography.hashing import Hasher, Hashing
 
 
 class WalletUtils:
@@ -25,18 +25,16 @@ class WalletUtils:
         )
 
         # Perform SHA-256 hash on the public key
-        sha256_hash = hashlib.sha256(public_key_bytes).digest()
+        sha256_hash = Hashing.sha256_digest(public_key_bytes)
 
         # Perform RIPEMD-160 hash on the SHA-256 hash
-        ripemd160 = hashlib.new('ripemd160')
-        ripemd160.update(sha256_hash)
-        hashed_public_key = ripemd160.digest()
+        hashed_public_key = Hasher('ripemd160', sha256_hash).digest()
 
         # Add a version byte (e.g., 0x00 for Bitcoin mainnet)
         versioned_key = b'\x00' + hashed_public_key
 
         # Perform double SHA-256 to get the checksum
-        checksum = hashlib.sha256(hashlib.sha256(versioned_key).digest()).digest()[:4]
+        checksum = Hashing.double_sha256_digest(versioned_key)[:4]
 
         # Append the checksum to the versioned key
         full_key = versioned_key + checksum
@@ -1,6 +1,6 @@
-import hashlib
 import time
 from typing import Dict, Any
+from blockchain.cryptography.hashing import Hashing
 
 
 class ProofSubmitter:
@@ -15,10 +15,10 @@ class ProofSubmitter:
         Generates a cryptographic proof for a batch of transactions.
         :param batch_id: The unique ID of the batch.
         :param transactions: The transactions included in the batch.
-        :param state_root: The state root hash after processing the batch.
+        :param state_root: The state root hash after processing the batch (e.g. StateManager.get_state_root()).
         :return: A dictionary containing the proof details.
         """
-        proof_hash = hashlib.sha256(f"{batch_id}{transactions}{state_root}".encode()).hexdigest()
+        proof_hash = Hashing.sha256(f"{batch_id}{transactions}{state_root}")
         proof = {
             "batch_id": batch_id,
             "transactions": transactions,
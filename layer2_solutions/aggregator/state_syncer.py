@@ -1,5 +1,7 @@
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from blockchain.state.sparse_merkle_tree import SparseMerkleTree
+from blockchain.state.state_manager import state_tree_key
 
 
 class StateSyncer:
@@ -52,19 +54,40 @@ class StateSyncer:
         layer1_state = self.fetch_layer1_state()
         layer2_state = self.fetch_layer2_state(solution_type)
 
-        # Simple consistency check for demonstration purposes
-        consistent = layer1_state.get("balances") == layer2_state.get("balances")
+        # Compare state roots when both sides commit to one; fall back to the full balances otherwise
+        if "state_root" in layer1_state and "state_root" in layer2_state:
+            consistent = layer1_state["state_root"] == layer2_state["state_root"]
+        else:
+            consistent = layer1_state.get("balances") == layer2_state.get("balances")
         print(f"State consistency between Layer 1 and {solution_type}: {'consistent' if consistent else 'inconsistent'}")
         return consistent
 
+    def verify_account(self, account: str, value: Optional[Dict[str, Any]], proof: Dict[str, Any]) -> bool:
+        """
+        Verifies a single account against the Layer 1 state root without the full state.
+        :param account: The account to verify.
+        :param value: The claimed account value ({"balance", "nonce"}), or None to prove absence.
+        :param proof: A proof from StateManager.get_account_proof()["proof"].
+        :return: True if the proof matches the synced Layer 1 state root, False otherwise.
+        """
+        state_root = self.layer1_state.get("state_root")
+        if state_root is None:
+            print("Layer 1 state has no state root to verify against.")
+            return False
+        return SparseMerkleTree.verify_proof(state_root, state_tree_key("accounts", account), value, proof)
+
 
 # Example usage
 if __name__ == "__main__":
     syncer = StateSyncer()
 
     # Mock Layer 1 state
+    layer1_balances = {"address1": 100, "address2": 200}
+    layer1_tree = SparseMerkleTree({state_tree_key("accounts", account): {"balance": balance, "nonce": 0}
+                                    for account, balance in layer1_balances.items()})
     layer1_state = {
-        "balances": {"address1": 100, "address2": 200},
+        "balances": layer1_balances,
+        "state_root": layer1_tree.get_root(),
         "last_block": 1500,
         "timestamp": time.time(),
     }
@@ -73,6 +96,7 @@ if __name__ == "__main__":
     # Mock Layer 2 state for zk-rollups
     zk_rollups_state = {
         "balances": {"address1": 100, "address2": 200},
+        "state_root": layer1_tree.get_root(),
         "last_rollup_batch": 50,
         "timestamp": time.time(),
     }
@@ -81,6 +105,10 @@ if __name__ == "__main__":
     # Verify state consistency
     syncer.verify_state_consistency("zk_rollups")
 
+    # Verify a single account with an O(log n) proof
+    proof = layer1_tree.generate_proof(state_tree_key("accounts", "address1"))
+    print("address1 verified:", syncer.verify_account("address1", {"balance": 100, "nonce": 0}, proof))
+
     # Fetch and display state
     print("\nLayer 1 State:", syncer.fetch_layer1_state())
     print("Layer 2 State (zk_rollups):", syncer.fetch_layer2_state("zk_rollups"))
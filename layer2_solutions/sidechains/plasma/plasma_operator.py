@@ -1,6 +1,6 @@
-import hashlib
 import time
 from typing import List, Dict, Any
+from blockchain.cryptography.hashing import Hashing
 
 
 class PlasmaOperator:
@@ -73,7 +73,7 @@ class PlasmaOperator:
         :return: The hash of the block.
         """
         block_string = f"{block_data['block_number']}{block_data['transactions']}{block_data['timestamp']}"
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        return Hashing.sha256(block_string)
 
     def list_blocks(self) -> List[Dict[str, Any]]:
         """
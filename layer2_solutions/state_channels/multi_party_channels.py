@@ -1,6 +1,6 @@
-import hashlib
 import time
 from typing import List, Dict, Any
+from blockchain.cryptography.hashing import Hashing
 
 
 class MultiPartyChannelManager:
@@ -22,7 +22,7 @@ class MultiPartyChannelManager:
         if any(balance <= 0 for balance in initial_balances):
             raise ValueError("All initial balances must be greater than zero.")
 
-        channel_id = hashlib.sha256(f"{participants}{time.time()}".encode()).hexdigest()
+        channel_id = Hashing.sha256(f"{participants}{time.time()}")
         self.channels[channel_id] = {
             "participants": participants,
             "balances": initial_balances,
@@ -1,4 +1,3 @@
-import hashlib
 import hmac
 import base64
 from typing import Dict, Any
@@ -1,6 +1,6 @@
-import hashlib
 import time
 from typing import Dict, Any, List
+from blockchain.cryptography.hashing import Hashing
 
 
 class StateChannelManager:
@@ -20,7 +20,7 @@ class StateChannelManager:
         if initial_balance <= 0:
             raise ValueError("Initial balance must be greater than zero.")
 
-        channel_id = hashlib.sha256(f"{sender}{receiver}{time.time()}".encode()).hexdigest()
+        channel_id = Hashing.sha256(f"{sender}{receiver}{time.time()}")
         self.channels[channel_id] = {
             "sender": sender,
             "receiver": receiver,
@@ -1,5 +1,5 @@
-import hashlib
 from typing import List, Dict, Any
+from blockchain.cryptography.hashing import Hashing
 
 class ZKProofGenerator:
     """Generates Zero-Knowledge Proofs for zk-rollup transactions."""
@@ -16,7 +16,7 @@ class ZKProofGenerator:
 
         # Simulate proof generation by hashing the transaction data
         batch_data = "".join([f"{tx['sender']}{tx['receiver']}{tx['amount']}" for tx in transactions])
-        batch_hash = hashlib.sha256(batch_data.encode()).hexdigest()
+        batch_hash = Hashing.sha256(batch_data)
 
         # Simulate proof data
         proof = {
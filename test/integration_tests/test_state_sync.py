@@ -0,0 +1,159 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+sys.path.append("blockchain")  # Blockchain imports the block modules as top-level packages
+from blocks.blockchain_state import Blockchain  # noqa: E402
+from blockchain.blocks.block import Block  # noqa: E402
+from blockchain.network.state_sync import LocalPeer, SnapshotServer, StateSyncClient, block_from_dict  # noqa: E402
+from blockchain.state.chunked_snapshot import iter_state_entries  # noqa: E402
+from blockchain.state.state_manager import StateManager  # noqa: E402
+from blockchain.state.state_snapshot import StateSnapshot  # noqa: E402
+
+SNAPSHOT_HEIGHT = 20
+CHAIN_HEIGHT = 35
+
+def generate_chain():
+    """Generates mined blocks of transfers between a few accounts, each with one UTXO output."""
+    chain = []
+    previous_hash = Blockchain().get_latest_block().hash
+    for index in range(1, CHAIN_HEIGHT + 1):
+        transactions = [{
+            "sender": f"User{(index + i) % 10}",
+            "receiver": f"User{(index + 2 * i + 1) % 12}",
+            "amount": 1 + i,
+            "fee": 1,
+            "inputs": [],
+            "outputs": [{"receiver": f"User{i}", "amount": index}]
+        } for i in range(5)]
+        block = Block(index, previous_hash, transactions)
+        block.mine_block(2)
+        chain.append(block.to_dict())
+        previous_hash = block.hash
+    return chain
+
+class LocalNode:
+    """A provider node that applied the whole chain and took a chunked snapshot on the way."""
+
+    def __init__(self, name, initial_state_path, snapshot_dir, chain, forge_snapshot=None):
+        self.chain = chain
+        self.state_manager = StateManager(initial_state_path)
+        self.snapshots = StateSnapshot(snapshot_dir)
+        for block in chain:
+            self.state_manager.update_state(block_from_dict(block))
+            if block["index"] == SNAPSHOT_HEIGHT:
+                state = self.state_manager.get_state()
+                if forge_snapshot:
+                    state = forge_snapshot(state)
+                self.snapshots.create_chunked_snapshot(iter_state_entries(state), SNAPSHOT_HEIGHT,
+                                                       self.state_manager.get_state_root(), chunk_size=256,
+                                                       block_hash=block["hash"])
+        self.server = SnapshotServer(self.snapshots, self.get_blocks)
+        self.peer = LocalPeer(name, self.server)
+
+    def get_blocks(self, from_height, count):
+        return self.chain[from_height - 1:from_height - 1 + count]
+
+class TestStateSync(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.initial_state_path = os.path.join(self.temp_dir, "initial_state.json")
+        with open(self.initial_state_path, "w") as file:
+            json.dump({
+                "balances": {f"User{i}": 1000 for i in range(12)},
+                "nonces": {f"User{i}": 0 for i in range(12)},
+                "utxo_set": {},
+                "smart_contracts": {}
+            }, file)
+        self.chain = generate_chain()
+        self.nodes = [LocalNode(f"node{i}", self.initial_state_path, os.path.join(self.temp_dir, f"node{i}"), self.chain)
+                      for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def corrupt_chunks(self, node):
+        """Makes a node serve tampered chunk data."""
+        handle_request = node.server.handle_request
+
+        def corrupted(message):
+            response = handle_request(message)
+            if response["type"] == "snapshot_chunk":
+                response["data"] = response["data"][::-1]
+            return response
+        node.server.handle_request = corrupted
+
+    def create_client(self, peers, state_manager, **options):
+        return StateSyncClient(peers, state_manager, os.path.join(self.temp_dir, "fresh"),
+                               config={"max_parallel_downloads": 4}, blockchain=Blockchain(), **options)
+
+    def test_fresh_node_syncs_from_snapshot(self):
+        """Tests that a fresh node restores the snapshot, replays the newer blocks and matches the providers."""
+        self.corrupt_chunks(self.nodes[1])
+        fresh = StateManager(self.initial_state_path)
+        client = self.create_client([node.peer for node in self.nodes], fresh)
+
+        height = client.sync()
+
+        reference = self.nodes[0].state_manager
+        self.assertEqual(height, CHAIN_HEIGHT)
+        self.assertEqual(client.stats["blocks_replayed"], CHAIN_HEIGHT - SNAPSHOT_HEIGHT)
+        self.assertEqual(fresh.get_state_root(), reference.get_state_root())
+        self.assertEqual(dict(fresh.balances), dict(reference.balances))
+        self.assertEqual(dict(fresh.utxo_set.utxos), dict(reference.utxo_set.utxos))
+        self.assertGreater(client.stats["failed_chunk_requests"], 0)
+        self.assertNotIn("node1", client.stats["chunks_per_peer"])
+        self.assertGreater(len(client.stats["chunks_per_peer"]), 1)
+        self.assertEqual(client.blockchain.get_latest_block().hash, self.chain[-1]["hash"])
+
+    def test_rejects_tables_not_matching_the_root(self):
+        """Tests that a snapshot with a forged UTXO set fails the state root check, whatever the manifest says."""
+        def forge(state):
+            return dict(state, utxo_set={**state["utxo_set"], ("forged", 0): {"receiver": "Mallory", "amount": 10**6}})
+        forger = LocalNode("forger", self.initial_state_path, os.path.join(self.temp_dir, "forger"), self.chain, forge)
+        fresh = StateManager(self.initial_state_path)
+        root = fresh.get_state_root()
+        balances = fresh.balances
+        client = self.create_client([forger.peer], fresh)
+        with self.assertRaises(ValueError):
+            client.sync()
+        self.assertEqual(fresh.get_state_root(), root)
+        self.assertIs(fresh.balances, balances)  # The root is checked before the state is swapped in
+
+    def test_rejects_invalid_replayed_blocks(self):
+        """Tests that replayed blocks go through validation: a tampered block after the snapshot is refused."""
+        for node in self.nodes:
+            node.chain = [dict(block) for block in self.chain]
+            tampered = node.chain[SNAPSHOT_HEIGHT + 2]
+            tampered["transactions"] = [dict(tampered["transactions"][0], amount=900)] + tampered["transactions"][1:]
+        client = self.create_client([node.peer for node in self.nodes], StateManager(self.initial_state_path))
+        with self.assertRaises(ValueError):
+            client.sync()
+        self.assertEqual(client.stats["blocks_replayed"], 2)
+
+    def test_failed_block_requests_do_not_end_the_replay(self):
+        """Tests that peers failing to serve blocks abort the sync instead of looking like the end of the chain."""
+        for node in self.nodes:
+            handle_request = node.server.handle_request
+
+            def failing(message, handle_request=handle_request):
+                if message["type"] == "blocks_request" and message["data"]["from_height"] > SNAPSHOT_HEIGHT:
+                    return {"type": "error", "data": "unavailable"}
+                return handle_request(message)
+            node.server.handle_request = failing
+        client = self.create_client([node.peer for node in self.nodes], StateManager(self.initial_state_path))
+        with self.assertRaises(ConnectionError):
+            client.sync()
+        self.assertEqual(client.stats["blocks_replayed"], 0)
+
+    def test_rejects_untrusted_state_root(self):
+        """Tests that manifests not committing to the trusted state root are refused."""
+        client = self.create_client([node.peer for node in self.nodes], StateManager(self.initial_state_path),
+                                    trusted_state_root="00" * 32)
+        with self.assertRaises(ValueError):
+            client.sync()
+
+if __name__ == "__main__":
+    unittest.main()
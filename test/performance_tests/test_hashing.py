@@ -0,0 +1,67 @@
+import hashlib
+import time
+from blockchain.blocks.block import Block
+from blockchain.cryptography.hashing import Hashing
+
+def measure_merkle_root(num_leaves):
+    """
+    Builds a Merkle root by hashing hex-string pairs (the previous scheme) and raw digest pairs.
+    :return: Tuple (hex time, bytes time) in seconds.
+    """
+    leaves = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(num_leaves)]
+
+    start_time = time.perf_counter()
+    level = list(leaves)
+    while len(level) > 1:
+        if len(level) % 2 != 0:
+            level.append(level[-1])
+        level = [hashlib.sha256((level[i] + level[i + 1]).encode()).hexdigest() for i in range(0, len(level), 2)]
+    hex_time = time.perf_counter() - start_time
+
+    digests = [bytes.fromhex(leaf) for leaf in leaves]
+    start_time = time.perf_counter()
+    Hashing.merkle_root_digest(digests).hex()
+    return hex_time, time.perf_counter() - start_time
+
+def measure_hash_many(num_items, item_size, workers):
+    """
+    Hashes a batch of equal-sized inputs with the given number of threads.
+    :return: The elapsed time in seconds.
+    """
+    items = [bytes([i % 256]) * item_size for i in range(num_items)]
+    start_time = time.perf_counter()
+    Hashing.hash_many(items, workers=workers)
+    return time.perf_counter() - start_time
+
+def measure_mining(difficulty):
+    """
+    Mines a block, hashing each nonce from scratch to hex (the previous loop) and with Block.mine_block.
+    :return: Tuple (hex hashes per second, mine_block hashes per second).
+    """
+    block = Block(1, "0" * 64, [{"sender": "Alice", "receiver": "Bob", "amount": 1}])
+    start_time = time.perf_counter()
+    while not block.hash.startswith("0" * difficulty):
+        block.nonce += 1
+        block.hash = block.calculate_hash()
+    hex_rate = block.nonce / (time.perf_counter() - start_time)
+
+    block.nonce = 0
+    block.hash = block.calculate_hash()
+    start_time = time.perf_counter()
+    block.mine_block(difficulty)
+    return hex_rate, block.nonce / (time.perf_counter() - start_time)
+
+if __name__ == "__main__":
+    print("Leaves | Hex pairs (ms) | Digest pairs (ms)")
+    for num_leaves in [1_000, 10_000, 100_000]:
+        hex_time, bytes_time = measure_merkle_root(num_leaves)
+        print(f"{num_leaves:>6} | {hex_time * 1000:>14.1f} | {bytes_time * 1000:>17.1f}")
+
+    # Threads only pay off with as many free cores; on a single core the numbers show the pool overhead.
+    print("\nhash_many (2,000 x 64 KiB) | Time (ms) | MiB/s")
+    for workers in [1, 2, 4, 8]:
+        elapsed = measure_hash_many(2_000, 65_536, workers)
+        print(f"{workers:>18} workers | {elapsed * 1000:>9.1f} | {2_000 * 64 / 1024 / elapsed:>5.0f}")
+
+    hex_rate, digest_rate = measure_mining(difficulty=5)
+    print(f"\nMining: {hex_rate:,.0f} hashes/s with hex strings, {digest_rate:,.0f} hashes/s with mine_block")
@@ -0,0 +1,63 @@
+import random
+import time
+from py_ecc import bn128 # type: ignore
+from blockchain.cryptography.scalar_multiplication import FixedBaseTable, multi_scalar_multiply, multiply
+
+def measure_fixed_base(scalars, window=None, projective=True):
+    """
+    Multiplies the generator by every scalar, with double-and-add or with a precomputed table.
+    :param window: Window size of the table, or None for double-and-add.
+    :return: Tuple (table build time, average time per multiplication) in seconds.
+    """
+    build_time, table = 0.0, None
+    if window is not None:
+        start_time = time.perf_counter()
+        table = FixedBaseTable(bn128.G1, window, projective)
+        build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for scalar in scalars:
+        if table is not None:
+            table.multiply(scalar)
+        else:
+            multiply(bn128.G1, scalar, projective)
+    return build_time, (time.perf_counter() - start_time) / len(scalars)
+
+def measure_multi_scalar(num_points, rng):
+    """
+    Computes a sum of num_points products naively and with Pippenger's method.
+    :return: Tuple (naive time, Pippenger time) in seconds.
+    """
+    points = [multiply(bn128.G1, rng.getrandbits(254)) for _ in range(num_points)]
+    scalars = [rng.getrandbits(254) for _ in points]
+
+    start_time = time.perf_counter()
+    expected = None
+    for point, scalar in zip(points, scalars):
+        expected = bn128.add(expected, multiply(point, scalar))
+    naive_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    result = multi_scalar_multiply(points, scalars)
+    pippenger_time = time.perf_counter() - start_time
+    assert result == expected, "Pippenger result differs from the naive sum"
+    return naive_time, pippenger_time
+
+if __name__ == "__main__":
+    rng = random.Random(48)
+    scalars = [rng.getrandbits(254) for _ in range(50)]
+    print("Method                  | Table build (ms) | Per multiplication (ms)")
+    for label, window, projective in [("double-and-add, affine", None, False),
+                                      ("double-and-add, proj.", None, True),
+                                      ("table w=4, affine", 4, False),
+                                      ("table w=4, projective", 4, True),
+                                      ("table w=6, projective", 6, True),
+                                      ("table w=8, projective", 8, True)]:
+        build_time, per_call = measure_fixed_base(scalars, window, projective)
+        print(f"{label:<23} | {build_time * 1000:>16.1f} | {per_call * 1000:>23.2f}")
+
+    print("\nPoints | Naive (ms) | Pippenger (ms) | Speedup")
+    for num_points in [4, 16, 64, 256]:
+        naive_time, pippenger_time = measure_multi_scalar(num_points, rng)
+        print(f"{num_points:>6} | {naive_time * 1000:>10.1f} | {pippenger_time * 1000:>14.1f} | "
+              f"{naive_time / pippenger_time:>6.1f}x")
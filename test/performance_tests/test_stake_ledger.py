@@ -0,0 +1,43 @@
+import time
+import numpy as np # type: ignore
+from cryptocurrency.mining.pos.stake_ledger import StakeLedger
+
+def settle_with_dicts(stakes, reward, commission_rate, downtime, threshold, penalty):
+    """
+    The dict-based equivalent of StakeLedger.settle_epoch: one Python loop per step.
+    :return: The updated stakes.
+    """
+    stakes = {address: amount * (1 - penalty) if downtime[address] > threshold else amount
+              for address, amount in stakes.items()}
+    pool = reward * (1 - commission_rate)
+    total = sum(stakes.values())
+    return {address: amount + amount / total * pool for address, amount in stakes.items()}
+
+def measure_settlement(num_accounts):
+    """
+    Times one epoch settlement (downtime slashing and reward distribution) over all accounts.
+    :return: Tuple (dict time, ledger time) in seconds.
+    """
+    rng = np.random.default_rng(7)
+    amounts = rng.uniform(1, 10_000, num_accounts)
+    downtime_seconds = rng.uniform(0, 7200, num_accounts)
+    stakes = {f"address{i}": float(amount) for i, amount in enumerate(amounts)}
+    downtime = {f"address{i}": float(seconds) for i, seconds in enumerate(downtime_seconds)}
+
+    start_time = time.perf_counter()
+    settle_with_dicts(stakes, 12.5, 0.05, downtime, 3600, 0.02)
+    dict_time = time.perf_counter() - start_time
+
+    ledger = StakeLedger.from_dict(stakes)
+    start_time = time.perf_counter()
+    ledger.settle_epoch(12.5, 0.05, downtime_seconds=downtime_seconds, downtime_threshold=3600,
+                        downtime_penalty=0.02)
+    ledger_time = time.perf_counter() - start_time
+    return dict_time, ledger_time
+
+if __name__ == "__main__":
+    print("Accounts | Dicts (ms) | StakeLedger (ms) | Speedup")
+    for num_accounts in [1_000, 10_000, 100_000, 1_000_000]:
+        dict_time, ledger_time = measure_settlement(num_accounts)
+        print(f"{num_accounts:>8} | {dict_time * 1000:>10.2f} | {ledger_time * 1000:>16.2f} | "
+              f"{dict_time / ledger_time:>6.1f}x")
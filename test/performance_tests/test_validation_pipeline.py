@@ -0,0 +1,73 @@
+import sys
+import time
+from cryptography.hazmat.primitives import hashes, serialization # type: ignore
+from cryptography.hazmat.primitives.asymmetric import padding, rsa # type: ignore
+from blockchain.blocks.block import Block
+from blockchain.blocks.checkpoints import Checkpoints
+from blockchain.blocks.validation_pipeline import ValidationPipeline
+from blockchain.transactions.transaction_validation import TransactionValidation
+
+sys.path.append("blockchain")
+from blocks.blockchain_state import Blockchain # noqa: E402
+
+def generate_blocks(num_blocks, transactions_per_block):
+    """
+    Generates a run of blocks of signed transfers.
+    :return: Tuple (genesis_block, blocks).
+    """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("utf-8")
+
+    genesis_block = Blockchain().get_latest_block()
+    blocks, previous_hash = [], genesis_block.hash
+    for index in range(1, num_blocks + 1):
+        transactions = []
+        for i in range(transactions_per_block):
+            transaction = {"sender": "Alice", "receiver": f"User{i}", "amount": 1, "nonce": index * 1000 + i}
+            transaction_hash = TransactionValidation.compute_transaction_hash(transaction)
+            transaction["signature"] = private_key.sign(
+                transaction_hash.encode("utf-8"), padding.PKCS1v15(), hashes.SHA256()
+            ).hex()
+            transaction["sender_public_key"] = public_key_pem
+            transactions.append(transaction)
+        block = Block(index, previous_hash, transactions)
+        block.mine_block(1)
+        blocks.append(block)
+        previous_hash = block.hash
+    return genesis_block, blocks
+
+def measure_sync(genesis_block, blocks, workers, assume_valid=None):
+    """
+    Validates and appends the blocks to a chain holding only the genesis block.
+    :param assume_valid: Optional hash of the assume-valid block; headers are then synced first.
+    :return: The elapsed time in seconds.
+    """
+    blockchain = Blockchain()
+    blockchain.chain = [genesis_block]
+    checkpoints = Checkpoints(checkpoints={}, assume_valid=assume_valid) if assume_valid else None
+    pipeline = ValidationPipeline(blockchain, difficulty=1, workers=workers, require_signatures=True,
+                                  checkpoints=checkpoints)
+    start_time = time.perf_counter()
+    if checkpoints is not None:
+        pipeline.process_headers(block.header() for block in blocks)
+    applied = pipeline.process(blocks)
+    elapsed = time.perf_counter() - start_time
+    pipeline.shutdown()
+    assert applied == len(blocks), "Pipeline rejected a valid block"
+    return elapsed
+
+if __name__ == "__main__":
+    genesis_block, blocks = generate_blocks(num_blocks=100, transactions_per_block=50)
+    # Workers only pay off with as many free cores; on a single core the numbers show the pool overhead.
+    print("Workers | Sync time (ms) | Blocks/s")
+    for workers in [0, 1, 2, 4, 8]:
+        elapsed = measure_sync(genesis_block, blocks, workers)
+        print(f"{workers:>7} | {elapsed * 1000:>14.2f} | {len(blocks) / elapsed:>8.1f}")
+
+    print("\nAssume-valid block | Sync time (ms) | Blocks/s")
+    for assumed_height in [0, len(blocks) // 2, len(blocks)]:
+        assume_valid = blocks[assumed_height - 1].hash if assumed_height else None
+        elapsed = measure_sync(genesis_block, blocks, workers=0, assume_valid=assume_valid)
+        print(f"{assumed_height:>18} | {elapsed * 1000:>14.2f} | {len(blocks) / elapsed:>8.1f}")
@@ -0,0 +1,29 @@
+import contextlib
+import io
+import time
+from blockchain.cryptography.zk_proofs import ZeroKnowledgeProofs
+
+def measure_verification(num_proofs, zk):
+    """
+    Verifies num_proofs proofs one by one and as one batch.
+    :return: Tuple (one-by-one time, batch time) in seconds.
+    """
+    proofs = [zk.generate_proof(f"secret{i}", zk.generate_commitment(f"secret{i}")) for i in range(num_proofs)]
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # verify_proof prints every result
+        assert all(zk.verify_proof(proof) for proof in proofs), "Valid proof rejected"
+    single_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    assert zk.batch_verify(proofs), "Valid batch rejected"
+    batch_time = time.perf_counter() - start_time
+    return single_time, batch_time
+
+if __name__ == "__main__":
+    zk = ZeroKnowledgeProofs()
+    print("Proofs | One by one (ms) | Batch (ms) | Batch per proof (ms) | Speedup")
+    for num_proofs in [1, 10, 100, 500]:
+        single_time, batch_time = measure_verification(num_proofs, zk)
+        print(f"{num_proofs:>6} | {single_time * 1000:>15.1f} | {batch_time * 1000:>10.1f} | "
+              f"{batch_time * 1000 / num_proofs:>20.2f} | {single_time / batch_time:>6.1f}x")
@@ -0,0 +1,164 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from blockchain.blocks.block import Block
+from blockchain.blocks.validation_pipeline import ValidationPipeline, check_block_stateless
+from blockchain.blocks.checkpoints import Checkpoints
+from blockchain.cryptography.hashing import Hasher, Hashing
+from blockchain.state.state_manager import StateManager
+
+sys.path.append("blockchain")
+
+class TestHashing(unittest.TestCase):
+    def test_digests_accept_any_bytes_like_input(self):
+        """
+        Test that str, bytes and memoryview inputs hash alike, and that double SHA-256 hashes the raw first digest.
+        """
+        data = b"Hello, Blockchain!"
+        digest = Hashing.sha256_digest(data)
+        self.assertEqual(Hashing.sha256_digest(memoryview(data)), digest)
+        self.assertEqual(Hashing.sha256(data.decode()), digest.hex())
+        self.assertEqual(Hashing.double_sha256_digest(data), Hashing.sha256_digest(digest))
+
+        hasher = Hasher("sha256", data[:5]).update(memoryview(data)[5:])
+        self.assertEqual(hasher.digest(), digest)
+        self.assertEqual(hasher.digest_with(b"!"), Hashing.sha256_digest(data + b"!"))
+        self.assertEqual(hasher.digest_with("!"), hasher.digest_with(b"!"))
+        self.assertEqual(hasher.hexdigest(), digest.hex())
+
+    def test_hash_many_matches_sequential_hashing(self):
+        items = [bytes([i % 256]) * 4096 for i in range(300)]  # Large enough to use the thread pool
+        expected = [Hashing.sha256_digest(item) for item in items]
+        self.assertEqual(Hashing.hash_many(items, workers=3), expected)
+        self.assertEqual(Hashing.hash_many(["tx1", "tx2"]), [Hashing.sha256_digest("tx1"), Hashing.sha256_digest("tx2")])
+
+    def test_difficulty_is_checked_on_raw_digests(self):
+        for nonce in range(200):
+            digest = Hashing.sha256_digest(f"block{nonce}")
+            for difficulty in range(4):
+                self.assertEqual(Hashing.meets_difficulty(digest, difficulty), digest.hex().startswith("0" * difficulty))
+
+        block = Block(1, "0" * 64, [{"sender": "Alice", "receiver": "Bob", "amount": 1}])
+        block.mine_block(3)
+        self.assertTrue(block.is_valid(3))
+        self.assertFalse(Hashing.meets_difficulty(bytes(32), 65))
+        self.assertTrue(Hashing.meets_difficulty(bytes(32), 64))
+
+    def test_merkle_implementations_agree_with_blocks(self):
+        from blockchain.blocks.merkle_tree.merkle_tree import MerkleTree
+        from blockchain.blocks.merkle_tree.merkle_proof import MerkleProof
+        from blockchain.cryptography import merkle_proof
+        transactions = [{"sender": f"User{i}", "receiver": "Bob", "amount": i} for i in range(7)]
+        root = Block.compute_merkle_root(transactions)
+        self.assertEqual(MerkleTree(transactions).get_merkle_root(), root)
+        tree = merkle_proof.MerkleTree([json.dumps(transaction) for transaction in transactions])
+        self.assertEqual(tree.root, root)
+
+        for index, transaction in enumerate(transactions):
+            proof, position = MerkleProof.generate_proof(transactions, transaction)
+            self.assertTrue(MerkleProof.verify_proof(root, transaction, proof, position))
+            proof, position = tree.get_proof(json.dumps(transaction))
+            self.assertEqual(position, index)
+            self.assertTrue(merkle_proof.MerkleTree.verify_proof(json.dumps(transaction), proof, root, position))
+        self.assertFalse(MerkleProof.verify_proof(root, transactions[0], proof, 6))
+
+class TestValidationPipeline(unittest.TestCase):
+    def setUp(self):
+        from blocks.blockchain_state import Blockchain
+        self.blockchain = Blockchain()
+        self.blocks = self.build_blocks()
+
+    def build_blocks(self, forged_signature_at=None, unknown_sender_at=None):
+        blocks, previous_hash = [], self.blockchain.get_latest_block().hash
+        for index in range(1, 11):
+            sender = "Mallory" if index == unknown_sender_at else "Alice"
+            transaction = {"sender": sender, "receiver": "Bob", "amount": index, "inputs": [], "outputs": []}
+            if index == forged_signature_at:
+                transaction.update({"signature": "00" * 256, "sender_public_key": "forged"})
+            block = Block(index, previous_hash, [transaction])
+            block.mine_block(1)
+            blocks.append(block)
+            previous_hash = block.hash
+        return blocks
+
+    def test_blocks_are_applied_in_height_order(self):
+        """
+        Test that stateless checks run in worker processes while state is applied in height order.
+        """
+        applied_heights = []
+        pipeline = ValidationPipeline(self.blockchain, apply_state=lambda block: applied_heights.append(block.index),
+                                      difficulty=1, workers=2, lookahead=4)
+        try:
+            self.assertEqual(pipeline.process(self.blocks), 10)
+        finally:
+            pipeline.shutdown()
+        self.assertEqual(applied_heights, list(range(1, 11)))
+        self.assertEqual(self.blockchain.get_latest_block().hash, self.blocks[-1].hash)
+
+    def test_pipeline_stops_at_the_first_invalid_block(self):
+        self.blocks[4].transactions[0]["amount"] = 1000  # Breaks the Merkle root
+        self.assertEqual(check_block_stateless(self.blocks[4].to_dict(), 1), "invalid Merkle root")
+
+        pipeline = ValidationPipeline(self.blockchain, difficulty=1, workers=0)
+        self.assertEqual(pipeline.process(self.blocks), 4)
+        self.assertEqual(len(self.blockchain.chain), 5)
+        self.assertEqual(pipeline.stats["rejected"], 1)
+
+    def test_blocks_the_state_manager_cannot_apply_are_rejected(self):
+        """
+        Test that a block StateManager.update_state reports as failed (it returns False) is not appended.
+        """
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"Alice": 100, "Bob": 0}, "nonces": {"Alice": 0, "Bob": 0}, "utxo_set": {},
+                       "smart_contracts": {}}, file)
+        self.addCleanup(os.remove, file.name)
+        state_manager = StateManager(file.name)
+        pipeline = ValidationPipeline(self.blockchain, apply_state=state_manager.update_state, difficulty=1, workers=0)
+        self.assertEqual(pipeline.process(self.build_blocks(unknown_sender_at=4)), 3)
+        self.assertEqual(len(self.blockchain.chain), 4)
+        self.assertEqual(pipeline.stats["rejected"], 1)
+        self.assertEqual(state_manager.balances["Bob"], 1 + 2 + 3)
+
+    def test_assume_valid_ancestors_skip_signature_checks(self):
+        """
+        Test that signatures below the assume-valid block are not checked, while later ones still are.
+        """
+        blocks = self.build_blocks(forged_signature_at=3)
+        strict = ValidationPipeline(self.blockchain, difficulty=1, workers=0)
+        self.assertEqual(strict.process(blocks), 2)
+
+        checkpoints = Checkpoints(checkpoints={}, assume_valid=blocks[5].hash)
+        pipeline = ValidationPipeline(self.blockchain, difficulty=1, workers=0, checkpoints=checkpoints)
+        self.assertEqual(pipeline.process_headers(block.header() for block in blocks[2:]), 8)
+        self.assertEqual(pipeline.assume_valid_height, 6)
+        self.assertEqual(pipeline.process(blocks[2:]), 8)
+        self.assertEqual(pipeline.stats["signatures_skipped_blocks"], 4)
+
+    def test_headers_conflicting_with_checkpoints_are_rejected(self):
+        checkpoints = Checkpoints(checkpoints={"5": "00" * 32})
+        pipeline = ValidationPipeline(self.blockchain, difficulty=1, workers=0, checkpoints=checkpoints)
+        self.assertEqual(pipeline.process_headers(block.header() for block in self.blocks), 4)
+        self.assertEqual(pipeline.process(self.blocks), 4)
+
+    @unittest.skipUnless(importlib.util.find_spec("py_ecc"), "py_ecc is not installed")
+    def test_zero_knowledge_proofs_are_batch_verified(self):
+        from blockchain.cryptography.zk_proofs import ZeroKnowledgeProofs
+        zk = ZeroKnowledgeProofs()
+        transactions = [{"sender": f"User{i}", "receiver": "Bob", "amount": 1,
+                         "zk_proof": zk.serialize_proof(zk.generate_proof(f"secret{i}", zk.generate_commitment(f"secret{i}")))}
+                        for i in range(6)]
+        block = Block(1, self.blockchain.get_latest_block().hash, transactions)
+        block.mine_block(1)
+        self.assertIsNone(check_block_stateless(block.to_dict(), 1))
+
+        transactions[4]["zk_proof"]["response"] += 1
+        block = Block(1, self.blockchain.get_latest_block().hash, transactions)
+        block.mine_block(1)
+        self.assertEqual(check_block_stateless(block.to_dict(), 1), "invalid zero-knowledge proof in transaction 4")
+        self.assertIsNone(check_block_stateless(block.to_dict(), 1, verify_signatures=False))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,21 @@
+import importlib.util
+import os
+import random
+import sys
+import tempfile
 import unittest
-from blockchain.consensus.consensus_engine import ConsensusEngine
-from blockchain.consensus.validator_selection import ValidatorSelection
-from blockchain.blocks.block import Block
+
+sys.path.append("blockchain")  # ConsensusEngine imports the chain modules as top-level packages
+from blockchain.consensus.consensus_engine import ConsensusEngine # noqa: E402
+from blockchain.consensus.validator_selection import ValidatorSelection # noqa: E402
+from blockchain.consensus.stake_sampler import AliasSampler # noqa: E402
+from blockchain.consensus.epoch_scheduler import EpochScheduler # noqa: E402
+from blockchain.consensus.block_finalization import BlockFinalization # noqa: E402
+from blockchain.consensus.vote_accumulator import QuorumCertificate, VoteAccumulator # noqa: E402
+from blockchain.consensus.evidence_tracker import DoubleSignEvidence, EvidenceTracker # noqa: E402
+from cryptocurrency.mining.hybrid.hybrid_mining import HybridMining # noqa: E402
+from blockchain.consensus.slashing_rules import SlashingRules # noqa: E402
+from blockchain.blocks.block import Block # noqa: E402
 
 class TestConsensus(unittest.TestCase):
     def setUp(self):
@@ -64,5 +78,338 @@ class TestConsensus(unittest.TestCase):
 
         self.assertTrue(is_finalized, "Consensus round failed to finalize the block")
 
+class TestStakeSampler(unittest.TestCase):
+    def setUp(self):
+        self.stakes = {"validator1": 5000, "validator2": 3000, "validator3": 2000, "validator4": 0}
+
+    def test_draws_follow_stake_distribution(self):
+        """
+        Test that alias-table draws are proportional to stake and never pick zero-stake validators.
+        """
+        draws = AliasSampler(self.stakes, random.Random(7)).sample_many(20_000)
+        self.assertNotIn("validator4", draws)
+        for validator in ("validator1", "validator2", "validator3"):
+            expected = self.stakes[validator] / 10_000
+            self.assertAlmostEqual(draws.count(validator) / len(draws), expected, delta=0.02)
+
+    def test_seeded_selection_is_reproducible(self):
+        """
+        Test that equally seeded selections agree and that the table is rebuilt after a stake change.
+        """
+        selections = []
+        for _ in range(2):
+            selection = ValidatorSelection(seed=11)
+            selection.rotation_policy = "stake_weighted"
+            for validator, stake in self.stakes.items():
+                selection.update_stake(validator, stake)
+            selections.append(selection)
+        self.assertEqual(selections[0].select_committee(200), selections[1].select_committee(200))
+
+        sampler = selections[0].get_sampler()
+        self.assertIs(selections[0].get_sampler(), sampler)
+        selections[0].remove_validator("validator1")
+        self.assertNotIn("validator1", selections[0].select_committee(200))
+
+    def test_validators_are_changed_only_through_the_selection(self):
+        """
+        Test that the validator mapping is read-only and that stake updates rebuild the sampler.
+        """
+        selection = ValidatorSelection(seed=3)
+        selection.update_stake("validator1", 5000)
+        with self.assertRaises(TypeError):
+            selection.validators["validator2"] = 5000
+        sampler = selection.get_sampler()
+        selection.update_stake("validator2", 5000)
+        self.assertIsNot(selection.get_sampler(), sampler)
+        self.assertEqual(dict(selection.get_validators()), {"validator1": 5000, "validator2": 5000})
+
+    def test_hybrid_mining_rebuilds_the_sampler_per_epoch(self):
+        """
+        Test that block rewards only rebuild the hybrid PoS alias table at epoch boundaries.
+        """
+        miner = HybridMining(pow_difficulty=1, pos_weight=0.5, block_reward=10, seed=5, stake_epoch_blocks=3)
+        miner.add_stake("validator1", 100)
+        miner.add_stake("validator2", 100)
+        miner.mine_block("miner1", "block1")
+        sampler = miner._sampler
+        miner.mine_block("miner1", "block2")
+        self.assertIs(miner._sampler, sampler)
+        miner.mine_block("miner1", "block3")
+        self.assertIsNone(miner._sampler)
+        self.assertEqual(sum(miner.get_stakes().values()), 215)
+
+    def test_rejects_empty_or_zero_stakes(self):
+        with self.assertRaises(ValueError):
+            AliasSampler({})
+        with self.assertRaises(ValueError):
+            AliasSampler({"validator1": 0})
+
+class TestEpochScheduler(unittest.TestCase):
+    def setUp(self):
+        self.validators = {f"validator{i}": 1000 * (i + 1) for i in range(16)}
+
+    def test_schedule_is_deterministic_across_nodes(self):
+        """
+        Test that nodes with the same boundary hash derive the same schedule, whatever their insertion order.
+        """
+        node_a, node_b = EpochScheduler(), EpochScheduler()
+        schedule_a = node_a.compute_epoch(2, self.validators, "ab" * 32)
+        schedule_b = node_b.compute_epoch(2, dict(reversed(list(self.validators.items()))), "ab" * 32)
+        self.assertEqual(schedule_a.to_dict(), schedule_b.to_dict())
+
+        other = EpochScheduler().compute_epoch(2, self.validators, "cd" * 32)
+        self.assertNotEqual(schedule_a.proposers, other.proposers)
+
+    def test_lookups_and_frozen_stakes(self):
+        """
+        Test slot and committee lookups, and that later stake changes do not affect a computed epoch.
+        """
+        scheduler = EpochScheduler()
+        schedule = scheduler.compute_epoch(1, self.validators, "ab" * 32)
+        first_slot = scheduler.slots_per_epoch
+        self.assertEqual(len(schedule.proposers), scheduler.slots_per_epoch)
+        self.assertEqual(scheduler.proposer(first_slot + 3), schedule.proposers[3])
+
+        members = [v for shard in range(scheduler.shard_count) for v in scheduler.committee(first_slot, f"shard_{shard}")]
+        self.assertEqual(len(members), len(set(members)))
+
+        self.validators["validator0"] = 10 ** 9
+        self.assertEqual(schedule.stakes["validator0"], 1000)
+        with self.assertRaises(ValueError):
+            scheduler.proposer(0)  # Epoch 0 was never computed
+
+class TestVoteAccumulator(unittest.TestCase):
+    def setUp(self):
+        self.validators = {"validator1": 5000, "validator2": 3000, "validator3": 2000}
+
+    def test_quorum_is_stake_weighted_against_the_active_set(self):
+        """
+        Test that the certificate is emitted by the vote crossing the stake threshold, and only once.
+        """
+        certificates = []
+        accumulator = VoteAccumulator(self.validators, threshold=0.67, on_quorum=certificates.append)
+        self.assertIsNone(accumulator.add_vote(5, "hash5", "validator3"))
+        self.assertIsNone(accumulator.add_vote(5, "hash5", "validator3"))  # Duplicate
+        self.assertIsNone(accumulator.add_vote(5, "hash5", "validator2"))  # 5000 of 10000
+        self.assertIsNone(accumulator.add_vote(5, "hash5", "outsider"))
+        certificate = accumulator.add_vote(5, "hash5", "validator1")
+        self.assertIsNotNone(certificate)
+        self.assertEqual(certificates, [certificate])
+        self.assertEqual(accumulator.stats["duplicate_votes"], 1)
+        self.assertEqual(accumulator.stats["unknown_validators"], 1)
+
+        received = QuorumCertificate.from_dict(certificate.to_dict())
+        self.assertTrue(accumulator.verify_certificate(received))
+        self.assertEqual(accumulator.signers(received), ["validator1", "validator2", "validator3"])
+        received.stake = 10000
+        received.signer_bitmap = 0b001
+        self.assertFalse(accumulator.verify_certificate(received))
+
+    def test_conflicting_votes_are_not_counted(self):
+        accumulator = VoteAccumulator(self.validators)
+        accumulator.add_vote(7, "hashA", "validator1")
+        self.assertIsNone(accumulator.add_vote(7, "hashB", "validator1"))
+        self.assertEqual(accumulator.voted_stake(7, "hashB"), 0)
+        self.assertEqual(accumulator.stats["conflicting_votes"], 1)
+
+    def test_block_finalization_uses_the_validator_set(self):
+        """
+        Test that repeated votes from a minority no longer finalize a block.
+        """
+        finalization = BlockFinalization(config={"finalization_threshold": 0.67}, validators=self.validators)
+        block = {"index": 1, "hash": "hash1"}
+        self.assertFalse(finalization.finalize_block(block, ["validator3", "validator3", "validator3"]))
+        self.assertTrue(finalization.add_vote(block, "validator1"))
+        self.assertEqual(block["quorum_certificate"]["stake"], 7000)
+
+@unittest.skipUnless(importlib.util.find_spec("py_ecc"), "py_ecc is not installed")
+class TestSignedVotes(unittest.TestCase):
+    def setUp(self):
+        from blockchain.cryptography.bls_signatures import BLSSignatures
+        self.bls = BLSSignatures()
+        self.validators = {"validator1": 5000, "validator2": 3000, "validator3": 2000}
+        self.keys = {validator: self.bls.generate_keypair(i + 1) for i, validator in enumerate(self.validators)}
+        self.public_keys = {validator: public_key for validator, (_, public_key) in self.keys.items()}
+        self.proofs = {validator: self.bls.prove_possession(*keypair) for validator, keypair in self.keys.items()}
+
+    def test_quorum_certificate_carries_one_aggregate_signature(self):
+        """
+        Test that a forged vote is rejected on arrival, and that the certificate verifies.
+        """
+        accumulator = VoteAccumulator(self.validators, public_keys=self.public_keys, possession_proofs=self.proofs)
+        message = VoteAccumulator.vote_message(9, "hash9")
+        sign = lambda validator: self.bls.sign(self.keys[validator][0], message)
+
+        self.assertIsNone(accumulator.add_vote(9, "hash9", "validator1"))  # Unsigned
+        accumulator.add_vote(9, "hash9", "validator3", sign("validator3"))
+        self.assertIsNone(accumulator.add_vote(9, "hash9", "validator1", sign("validator3")))  # Forged
+        self.assertEqual(accumulator.stats["invalid_signatures"], 1)
+        certificate = accumulator.add_vote(9, "hash9", "validator1", sign("validator1"))
+        self.assertIsNotNone(certificate)
+        self.assertEqual(len(certificate.signature), 128)
+
+        received = QuorumCertificate.from_dict(certificate.to_dict())
+        self.assertTrue(accumulator.verify_certificate(received))
+        received.block_hash = "other"
+        self.assertFalse(accumulator.verify_certificate(received))
+
+    def test_forged_vote_does_not_lock_out_the_validator(self):
+        accumulator = VoteAccumulator(self.validators, public_keys=self.public_keys, possession_proofs=self.proofs)
+        forged = self.bls.sign(self.keys["validator3"][0], VoteAccumulator.vote_message(9, "hashX"))
+        self.assertIsNone(accumulator.add_vote(9, "hashX", "validator1", forged))
+        self.assertNotIn(9, accumulator.votes_by_height)
+
+        sign = lambda validator: self.bls.sign(self.keys[validator][0], VoteAccumulator.vote_message(9, "hash9"))
+        accumulator.add_vote(9, "hash9", "validator2", sign("validator2"))
+        self.assertIsNotNone(accumulator.add_vote(9, "hash9", "validator1", sign("validator1")))
+        self.assertEqual(accumulator.stats["conflicting_votes"], 0)
+
+    def test_public_keys_require_proofs_of_possession(self):
+        with self.assertRaises(ValueError):
+            VoteAccumulator(self.validators, public_keys=self.public_keys)
+        proofs = dict(self.proofs, validator2=self.proofs["validator3"])
+        with self.assertRaises(ValueError):
+            VoteAccumulator(self.validators, public_keys=self.public_keys, possession_proofs=proofs)
+
+@unittest.skipUnless(importlib.util.find_spec("py_ecc"), "py_ecc is not installed")
+class TestScalarMultiplication(unittest.TestCase):
+    def setUp(self):
+        from py_ecc import bn128
+        self.bn128 = bn128
+        self.rng = random.Random(48)
+
+    def test_fixed_base_table_matches_double_and_add(self):
+        from blockchain.cryptography.scalar_multiplication import FixedBaseTable
+        for projective in (True, False):
+            table = FixedBaseTable(self.bn128.G1, window=5, projective=projective)
+            for scalar in [0, 1, -3, self.bn128.curve_order + 7, self.rng.getrandbits(254)]:
+                expected = self.bn128.multiply(self.bn128.G1, scalar % self.bn128.curve_order)
+                self.assertEqual(table.multiply(scalar), expected)
+
+    def test_pippenger_matches_sum_of_products(self):
+        from blockchain.cryptography.scalar_multiplication import multi_scalar_multiply
+        points = [self.bn128.multiply(self.bn128.G1, self.rng.randint(1, 1000)) for _ in range(12)]
+        scalars = [self.rng.getrandbits(254) for _ in points]
+        expected = None
+        for point, scalar in zip(points, scalars):
+            expected = self.bn128.add(expected, self.bn128.multiply(point, scalar))
+        self.assertEqual(multi_scalar_multiply(points, scalars), expected)
+        self.assertEqual(multi_scalar_multiply(points, scalars, projective=False, window=3), expected)
+        self.assertIsNone(multi_scalar_multiply(points, [0] * len(points)))
+
+    def test_zero_knowledge_proof_round_trip(self):
+        from blockchain.cryptography.zk_proofs import ZeroKnowledgeProofs
+        zk = ZeroKnowledgeProofs()
+        commitment = zk.generate_commitment("secret")
+        self.assertEqual(commitment, self.bn128.multiply(self.bn128.G1, zk.hash_to_scalar("secret")))
+        proof = zk.generate_proof("secret", commitment)
+        self.assertTrue(zk.verify_proof(proof))
+        self.assertFalse(zk.verify_proof(dict(proof, statement=zk.generate_commitment("other"))))
+
+    def test_batch_verification_locates_invalid_proofs(self):
+        from blockchain.cryptography.zk_proofs import ZeroKnowledgeProofs
+        zk = ZeroKnowledgeProofs()
+        proofs = [zk.generate_proof(f"secret{i}", zk.generate_commitment(f"secret{i}")) for i in range(10)]
+        self.assertTrue(zk.batch_verify(proofs))
+        self.assertEqual(zk.find_invalid_proofs(proofs), [])
+
+        proofs[2] = dict(proofs[2], response=(proofs[2]["response"] + 1) % zk.order)
+        proofs[7] = dict(proofs[7], statement=zk.generate_commitment("other"))
+        self.assertFalse(zk.batch_verify(proofs))
+        self.assertEqual(zk.find_invalid_proofs(proofs), [2, 7])
+        self.assertEqual(zk.deserialize_proof(zk.serialize_proof(proofs[0])), proofs[0])
+
+@unittest.skipUnless(importlib.util.find_spec("py_ecc"), "py_ecc is not installed")
+class TestEvidenceTracker(unittest.TestCase):
+    def setUp(self):
+        from blockchain.cryptography.bls_signatures import BLSSignatures
+        self.bls = BLSSignatures()
+        self.keys = {validator: self.bls.generate_keypair(i + 1) for i, validator in enumerate(["validator1", "validator2"])}
+        self.public_keys = {validator: public_key for validator, (_, public_key) in self.keys.items()}
+        self.tracker = EvidenceTracker(public_keys=self.public_keys)
+        self.tracker.window = 4
+
+    def sign(self, validator, height, block_hash, kind="vote", round=0):
+        return self.bls.sign(self.keys[validator][0], EvidenceTracker.signed_message(kind, height, round, block_hash))
+
+    def test_conflicting_votes_produce_evidence_once(self):
+        """
+        Test that a conflicting vote yields evidence on arrival, independent of arrival order, and only once.
+        """
+        vote = lambda tracker, block_hash, round=0: tracker.observe_vote(
+            "validator1", 10, block_hash, self.sign("validator1", 10, block_hash, round=round), round=round)
+        self.assertIsNone(vote(self.tracker, "hashB"))
+        self.assertIsNone(vote(self.tracker, "hashB"))
+        self.assertIsNone(vote(self.tracker, "hashA", round=1))
+        evidence = vote(self.tracker, "hashA")
+        self.assertEqual((evidence.first[0], evidence.second[0]), ("hashA", "hashB"))
+        self.assertIsNone(vote(self.tracker, "hashC"))
+
+        other_node = EvidenceTracker(public_keys=self.public_keys)
+        vote(other_node, "hashA")
+        self.assertEqual(vote(other_node, "hashB").evidence_id, evidence.evidence_id)
+
+        included = self.tracker.take_evidence()
+        self.assertEqual(len(included), 1)
+        self.tracker.mark_included(included)
+        self.assertEqual(self.tracker.take_evidence(), [])
+
+    def test_unsigned_or_forged_votes_are_not_evidence(self):
+        self.assertIsNone(self.tracker.observe_vote("validator1", 3, "hashA"))
+        self.assertIsNone(self.tracker.observe_vote("validator1", 3, "hashB"))
+        self.assertFalse(self.tracker.verify_evidence(DoubleSignEvidence("vote", "validator1", 3, 0, ("hashA", None),
+                                                                         ("hashB", None))))
+        self.assertFalse(EvidenceTracker().verify_evidence(DoubleSignEvidence(
+            "vote", "validator1", 3, 0, ("hashA", None), ("hashB", None))))
+
+        # A forged first vote is replaced by the genuine one, which still catches a real double-sign
+        self.tracker.observe_vote("validator1", 4, "hashA", self.sign("validator2", 4, "hashA"))
+        self.assertIsNone(self.tracker.observe_vote("validator1", 4, "hashB", self.sign("validator1", 4, "hashB")))
+        self.assertIsNone(self.tracker.observe_vote("validator1", 4, "hashC", self.sign("validator2", 4, "hashC")))
+        self.assertIsNotNone(self.tracker.observe_vote("validator1", 4, "hashD", self.sign("validator1", 4, "hashD")))
+        self.assertEqual(self.tracker.stats["invalid_signatures"], 2)
+        self.assertEqual(len(self.tracker.pending), 1)
+
+    def test_forged_message_does_not_hide_a_later_equivocation(self):
+        """
+        Test that a genuine message with the hash of a forged indexed one replaces it, so the validator's
+        conflicting message still yields evidence.
+        """
+        self.tracker.observe_vote("validator1", 5, "hashA", self.sign("validator2", 5, "hashA"))  # Forged
+        self.assertIsNone(self.tracker.observe_vote("validator1", 5, "hashA", self.sign("validator1", 5, "hashA")))
+        evidence = self.tracker.observe_vote("validator1", 5, "hashB", self.sign("validator1", 5, "hashB"))
+        self.assertIsNotNone(evidence)
+        self.assertTrue(self.tracker.verify_evidence(evidence))
+        self.assertEqual(self.tracker.stats["invalid_signatures"], 1)
+
+    def test_window_evicts_old_heights(self):
+        self.tracker.observe_proposal("validator1", 1, "hashA", self.sign("validator1", 1, "hashA", "proposal"))
+        self.tracker.observe_proposal("validator2", 6, "hashA", self.sign("validator2", 6, "hashA", "proposal"))
+        self.assertNotIn(("proposal", "validator1", 1, 0), self.tracker.signed)
+        self.assertIsNone(self.tracker.observe_proposal("validator1", 1, "hashB",
+                                                        self.sign("validator1", 1, "hashB", "proposal")))
+        self.assertEqual(self.tracker.stats["expired"], 1)
+
+    def test_accumulator_reports_votes_and_evidence_is_slashed_once(self):
+        proofs = {validator: self.bls.prove_possession(*keypair) for validator, keypair in self.keys.items()}
+        accumulator = VoteAccumulator({"validator1": 5000, "validator2": 5000}, public_keys=self.public_keys,
+                                      possession_proofs=proofs, evidence_tracker=self.tracker)
+        accumulator.add_vote(3, "hashA", "validator1")  # Unsigned, rejected
+        self.assertEqual(self.tracker.take_evidence(), [])
+        accumulator.add_vote(3, "hashA", "validator1", self.sign("validator1", 3, "hashA"))
+        accumulator.add_vote(3, "hashB", "validator1", self.sign("validator1", 3, "hashB"))
+        evidence = DoubleSignEvidence.from_dict(self.tracker.take_evidence()[0])
+        self.assertTrue(EvidenceTracker(public_keys=self.public_keys).verify_evidence(evidence))
+
+        slashing = SlashingRules()
+        slashing.log_file = os.path.join(tempfile.mkdtemp(), "slashing_events.log")
+        stakes = slashing.slash_for_evidence(evidence, {"validator1": 5000, "validator2": 5000})
+        stakes = slashing.slash_for_evidence(evidence, stakes)
+        self.assertEqual(stakes["validator1"], 5000 * (1 - slashing.double_signing_penalty))
+        self.assertFalse(os.path.exists(slashing.log_file))  # Buffered
+        self.assertEqual(slashing.flush_log(), 1)
+        with open(slashing.log_file) as log_file:
+            self.assertIn("double_signing", log_file.read())
+
 if __name__ == "__main__":
     unittest.main()
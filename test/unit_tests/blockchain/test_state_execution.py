@@ -0,0 +1,410 @@
+import copy
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from blockchain.state.state_manager import StateManager
+from blockchain.state.smart_contracts import SmartContractEngine
+from blockchain.state.gas_meter import OutOfGasError
+from blockchain.state.contract_journal import JournaledDict, StateJournal
+from blockchain.state.contract_storage import parse_slot_key, slot_key
+from blockchain.state.chunked_snapshot import ChunkedSnapshotReader, ChunkedSnapshotWriter, iter_state_entries
+from blockchain.state.state_snapshot import StateSnapshot
+from blockchain.state.sparse_merkle_tree import SparseMerkleTree
+from blockchain.blocks.block import Block
+
+class TestBlockApplication(unittest.TestCase):
+    class MockBlock:
+        def __init__(self, transactions):
+            self.transactions = transactions
+
+    def _create_state_manager(self):
+        initial_state = {
+            "balances": {"Alice": 100, "Bob": 50, "Carol": 10},
+            "nonces": {"Alice": 0, "Bob": 0, "Carol": 0},
+            "utxo_set": {},
+            "smart_contracts": {}
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump(initial_state, file)
+        self.addCleanup(os.remove, file.name)
+        state_manager = StateManager(file.name)
+        state_manager._update_utxo_set = lambda block: None
+        return state_manager
+
+    def test_contract_calls_reach_the_root_and_delta_snapshot(self):
+        state_manager = self._create_state_manager()
+        address = state_manager.smart_contract_engine.deploy_contract(
+            "state['calls'] = state.get('calls', 0) + 1", "Alice")
+        state_manager.rebuild_state_tree()
+        state_manager.get_snapshot_changes()
+        root = state_manager.get_state_root()
+        call = {"sender": "Alice", "receiver": address, "amount": 0, "contract_code": True}
+        self.assertTrue(state_manager.update_state(self.MockBlock([call, dict(call, sender="Bob"), dict(call)])))
+        self.assertEqual(state_manager.smart_contract_engine.get_contract_state(address)["calls"], 3)
+        self.assertNotEqual(state_manager.get_state_root(), root)
+        self.assertEqual(set(state_manager.get_snapshot_changes()["smart_contracts"]), {address})
+
+    def test_failed_block_is_reverted_entirely(self):
+        """
+        Test that a failing transaction reverts the whole block.
+        """
+        block = self.MockBlock([
+            {"sender": "Alice", "receiver": "Bob", "amount": 20},
+            {"sender": "Unknown", "receiver": "Bob", "amount": 1},
+            {"sender": "Bob", "receiver": "Carol", "amount": 5}
+        ])
+        state_manager = self._create_state_manager()
+        root = state_manager.get_state_root()
+        self.assertFalse(state_manager.update_state(block))
+        self.assertEqual(state_manager.balances, {"Alice": 100, "Bob": 50, "Carol": 10})
+        self.assertEqual(state_manager.nonces, {"Alice": 0, "Bob": 0, "Carol": 0})
+        self.assertEqual(state_manager.get_state_root(), root)
+
+class TestStateRoot(unittest.TestCase):
+    def _create_state_manager(self, initial_state):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump(initial_state, file)
+        self.addCleanup(os.remove, file.name)
+        return StateManager(file.name)
+
+    def test_tables_do_not_share_state_tree_keys(self):
+        """
+        Test that an account named like a contract leaf no longer collides with the contract.
+        """
+        contract = {"creator": "Alice", "code": "state['nonce'] += 1", "state": {"balance": 0, "nonce": 0}}
+        with_contract = self._create_state_manager({"balances": {}, "nonces": {}, "utxo_set": {},
+                                                    "smart_contracts": {"token": contract}})
+        with_account = self._create_state_manager({"balances": {"contract:token": 0}, "nonces": {"contract:token": 0},
+                                                   "utxo_set": {}, "smart_contracts": {}})
+        self.assertNotEqual(with_contract.get_state_root(), with_account.get_state_root())
+
+    def test_root_commits_utxos_and_contract_code(self):
+        """
+        Test that UTXO changes and contract deployments change the state root.
+        """
+        state_manager = self._create_state_manager({"balances": {"Alice": 10}, "nonces": {"Alice": 0},
+                                                    "utxo_set": {}, "smart_contracts": {}})
+        root = state_manager.get_state_root()
+        state_manager.utxo_set._add_utxo("tx1", 0, {"address": "Alice", "amount": 5})
+        with_utxo = state_manager.get_state_root()
+        self.assertNotEqual(with_utxo, root)
+        state_manager.smart_contract_engine.deploy_contract("state['x'] = 1", "Alice")
+        self.assertNotEqual(state_manager.get_state_root(), with_utxo)
+
+        proof = state_manager.get_account_proof("Alice")
+        self.assertTrue(SparseMerkleTree.verify_proof(proof["state_root"], proof["key"], proof["value"], proof["proof"]))
+        self.assertFalse(SparseMerkleTree.verify_proof(proof["state_root"], "Alice", proof["value"], proof["proof"]))
+
+    def test_computed_root_matches_the_loaded_state(self):
+        """
+        Test that compute_state_root predicts the root of a state dictionary without loading it.
+        """
+        state_manager = self._create_state_manager({"balances": {"Alice": 10}, "nonces": {"Bob": 1},
+                                                    "utxo_set": {}, "smart_contracts": {}})
+        state_manager.utxo_set._add_utxo("tx1", 0, {"address": "Alice", "amount": 5})
+        state_manager.smart_contract_engine.deploy_contract("state['x'] = 1", "Alice", {"x": 0})
+        state = state_manager.get_state()
+        root = state_manager.compute_state_root(state)
+        self.assertEqual(root, state_manager.get_state_root())
+        self.assertNotEqual(state_manager.compute_state_root(dict(state, balances={"Alice": 11})), root)
+
+class TestContractCodeCache(unittest.TestCase):
+    CODE = "state['calls'] = state.get('calls', 0) + 1"
+
+    def test_identical_code_shares_one_entry(self):
+        """Tests that code is compiled once per code hash, whatever the address."""
+        engine = SmartContractEngine()
+        first = engine.deploy_contract(self.CODE, "Alice")
+        second = engine.deploy_contract(self.CODE, "Bob")
+        self.assertNotEqual(first, second)
+        for address in (first, second, first):
+            engine.execute({"sender": "Carol", "receiver": address, "amount": 0}, None)
+        self.assertEqual(len(engine.code_cache), 1)
+        self.assertEqual(engine.code_cache_stats["misses"], 1)
+        self.assertEqual(engine.get_contract_state(first)["calls"], 2)
+
+    def test_cache_is_warmed_and_bounded(self):
+        """Tests that persisted contracts are compiled at startup and the cache evicts the least recently used."""
+        contracts = {f"contract{i}": {"creator": "Alice", "code": f"state['id'] = {i}", "state": {}} for i in range(3)}
+        engine = SmartContractEngine(contracts, code_cache_size=2)
+        self.assertEqual(engine.code_cache_stats["misses"], 2)
+
+        engine.execute({"sender": "Bob", "receiver": "contract0", "amount": 0}, None)
+        self.assertEqual(engine.code_cache_stats["hits"], 1)
+        engine.execute({"sender": "Bob", "receiver": "contract2", "amount": 0}, None)
+        self.assertEqual(len(engine.code_cache), 2)
+        self.assertIn(engine.code_hash("state['id'] = 0"), engine.code_cache)
+        self.assertNotIn(engine.code_hash("state['id'] = 1"), engine.code_cache)
+
+class TestGasMetering(unittest.TestCase):
+    LOOP = "while True:\n    state['n'] = state.get('n', 0) + 1"
+
+    def test_looping_contract_is_aborted_deterministically(self):
+        """Tests that an endless contract runs out of gas, even when it swallows the error."""
+        engine = SmartContractEngine(gas_limit=5000)
+        errors = []
+        for code in (self.LOOP, "try:\n    " + self.LOOP.replace("\n", "\n    ") + "\nexcept Exception:\n    pass"):
+            address = engine.deploy_contract(code, "Alice")
+            with self.assertRaises(OutOfGasError) as context:
+                engine.execute({"sender": "Bob", "receiver": address, "amount": 0}, None)
+            errors.append(str(context.exception))
+        self.assertIn("limit 5000", errors[0])
+
+    def test_gas_used_is_charged_against_the_fee(self):
+        """Tests that gas is metered deterministically and that the declared fee must cover it."""
+        engine = SmartContractEngine(gas_limit=100_000)
+        address = engine.deploy_contract("for i in range(100):\n    state['total'] = state.get('total', 0) + i", "Alice")
+        transaction = {"sender": "Bob", "receiver": address, "amount": 0}
+        first = engine.execute(transaction, None)
+        self.assertEqual(engine.execute(transaction, None), first)
+        self.assertEqual(engine.get_contract_state(address)["total"], 9900)
+        with self.assertRaises(OutOfGasError):
+            engine.execute(dict(transaction, gas_limit=first // 2), None)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"Bob": 100}, "nonces": {"Bob": 0}, "utxo_set": {},
+                       "smart_contracts": copy.deepcopy(engine.contracts)}, file)
+        state_manager = StateManager(file.name, gas_limit=100_000)
+        os.remove(file.name)
+        state_manager._update_utxo_set = lambda block: None
+        call = {"sender": "Bob", "receiver": address, "amount": 0, "contract_code": True}
+        self.assertFalse(state_manager.update_state(type("Block", (), {"transactions": [dict(call, fee=0)]})))
+        self.assertTrue(state_manager.update_state(type("Block", (), {"transactions": [dict(call, fee=5)]})))
+
+    def test_reserved_names_cannot_be_rebound(self):
+        """Tests that contract code cannot shadow the gas hooks in any binding position."""
+        engine = SmartContractEngine(gas_limit=5000)
+        for code in ("def f(_gas=abs):\n    pass", "try:\n    pass\nexcept Exception as _gas:\n    pass",
+                     "import os as _gas", "[0 for _gas in range(3)]", "(_gas := abs)", "def f():\n    global _gas"):
+            with self.assertRaises(ValueError):
+                engine.deploy_contract(code, "Alice")
+
+    def test_size_amplifying_operations_are_charged(self):
+        """Tests that writes through subscripts, string padding and format widths pay for their result size."""
+        engine = SmartContractEngine(gas_limit=5000)
+        for code in ("state['s'] *= 50000000", "state['s'] = 'a'.ljust(300000000)",
+                     "state['s'] = f'{1:>300000000}'", "state['s'] = '%*d' % (300000000, 1)",
+                     "for i in range(40):\n    state['s'] += state['s']"):
+            address = engine.deploy_contract(code, "Alice")
+            engine.contracts[address]["state"] = {"s": "ab"}
+            with self.assertRaises(OutOfGasError):
+                engine.execute({"sender": "Bob", "receiver": address, "amount": 0}, None)
+
+class TestContractJournal(unittest.TestCase):
+    def setUp(self):
+        self.engine = SmartContractEngine(gas_limit=5000)
+        self.counter = self.engine.deploy_contract("state['holders'][transaction['sender']] = transaction['amount']\n"
+                                                   "state['calls'] = state.get('calls', 0) + 1", "Alice")
+        self.engine.contracts[self.counter]["state"] = {"holders": {}}
+
+    def call(self, sender, amount):
+        return {"sender": sender, "receiver": self.counter, "amount": amount, "contract_code": True}
+
+    def test_nested_savepoints_revert_only_their_writes(self):
+        """Tests that reverting a savepoint undoes the writes made after it, including nested ones."""
+        journal = StateJournal()
+        storage = {"a": 1, "nested": {"list": [1, 2]}}
+        state = JournaledDict(storage, journal)
+        state["a"] = 2
+        outer = journal.savepoint()
+        state["nested"]["list"].append(3)
+        inner = journal.savepoint()
+        state["b"] = 5
+        del state["a"]
+        journal.revert_to(inner)
+        self.assertEqual(storage, {"a": 2, "nested": {"list": [1, 2, 3]}})
+        journal.revert_to(outer)
+        self.assertEqual(storage, {"a": 2, "nested": {"list": [1, 2]}})
+
+    def test_list_writes_are_journaled_per_operation(self):
+        """Tests that list writes record only what they change and are undone exactly."""
+        journal = StateJournal()
+        storage = {"list": list(range(1000))}
+        state = JournaledDict(storage, journal)
+        items = state["list"]
+        items.append(1000)
+        items[3] = "x"
+        del items[10:20]
+        items[0:2] = ["a", "b", "c"]
+        items.insert(-1, "y")
+        items.pop(0)
+        self.assertTrue(all(not isinstance(previous, list) or len(previous) < 20
+                            for _, _, previous in journal.entries))
+        journal.revert_to(0)
+        self.assertEqual(storage, {"list": list(range(1000))})
+
+    def test_failed_call_leaves_no_partial_writes(self):
+        """Tests that a call aborted midway (here, out of gas) does not leave its writes behind."""
+        looping = self.engine.deploy_contract("state['x'] = 1\nwhile True:\n    state['n'] = state.get('n', 0) + 1", "Alice")
+        with self.assertRaises(OutOfGasError):
+            self.engine.execute({"sender": "Bob", "receiver": looping, "amount": 0}, None)
+        self.assertEqual(self.engine.get_contract_state(looping), {})
+
+    def test_rollback_state_reverts_blocks_in_reverse_order(self):
+        """Tests that StateManager.rollback_state restores contract storage from the journal."""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"Bob": 100, "Carol": 100, self.counter: 0},
+                       "nonces": {"Bob": 0, "Carol": 0, self.counter: 0}, "utxo_set": {},
+                       "smart_contracts": copy.deepcopy(self.engine.contracts)}, file)
+        state_manager = StateManager(file.name)
+        os.remove(file.name)
+        state_manager._update_utxo_set = lambda block: None
+        first = type("Block", (), {"hash": "b1", "transactions": [self.call("Bob", 1)]})
+        second = type("Block", (), {"hash": "b2", "transactions": [self.call("Carol", 2), self.call("Bob", 3)]})
+        root = state_manager.get_state_root()
+        self.assertTrue(state_manager.update_state(first))
+        after_first = state_manager.get_state_root()
+        self.assertTrue(state_manager.update_state(second))
+
+        with self.assertRaises(ValueError):
+            state_manager.smart_contract_engine.rollback_block("b1")
+        state_manager.rollback_state(second)
+        self.assertEqual(state_manager.smart_contract_engine.get_contract_state(self.counter),
+                         {"holders": {"Bob": 1}, "calls": 1})
+        self.assertEqual(state_manager.get_state_root(), after_first)
+        state_manager.rollback_state(first)
+        self.assertEqual(state_manager.get_state_root(), root)
+
+class TestContractStorage(unittest.TestCase):
+    class MemoryStateDB:
+        def __init__(self):
+            self.data = {}
+            self.reads = 0
+            self.batches = []
+
+        def get_value(self, key, default=None):
+            self.reads += 1
+            return json.loads(self.data[key]) if key in self.data else default
+
+        def iterate_prefix(self, prefix, keys_only=False):
+            for key in sorted(self.data):
+                if key.startswith(prefix):
+                    yield key if keys_only else (key, json.loads(self.data[key]))
+
+        def apply_batch(self, puts, deletes=()):
+            self.batches.append((dict(puts), list(deletes)))
+            for key, value in puts.items():
+                self.data[key] = json.dumps(value)
+            for key in deletes:
+                self.data.pop(key, None)
+
+    TOKEN = ("sender = transaction['sender']\n"
+             "state['balance:' + transaction['to']] = state.get('balance:' + transaction['to'], 0) + transaction['amount']\n"
+             "state['balance:' + sender] -= transaction['amount']")
+
+    def setUp(self):
+        self.state_db = self.MemoryStateDB()
+        holders = {f"balance:holder{i}": 10 for i in range(1000)}
+        self.engine = SmartContractEngine({"token": {"creator": "Alice", "code": self.TOKEN, "state": holders}},
+                                          state_db=self.state_db, slot_cache_size=10)
+
+    def test_only_touched_slots_are_loaded_and_written(self):
+        """Tests that a call reads and writes back only the slots it touches."""
+        self.assertNotIn("state", self.engine.contracts["token"])
+        self.assertEqual(len(self.engine.slots.clean), 10)
+        self.state_db.reads = 0
+        self.engine.execute({"sender": "holder1", "receiver": "token", "to": "holder2", "amount": 4}, None)
+        self.engine.commit_block("b1")
+        self.assertLessEqual(self.state_db.reads, 2)
+        self.assertEqual(self.state_db.batches[-1],
+                         ({slot_key("token", "balance:holder1"): 6, slot_key("token", "balance:holder2"): 14}, []))
+        self.assertEqual(len(self.engine.get_contract_state("token")), 1000)
+
+    def test_state_manager_commits_and_rolls_back_slots(self):
+        """Tests that slot writes feed the state root and are undone by rollback_state."""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"holder1": 0, "token": 0}, "nonces": {"holder1": 0, "token": 0}, "utxo_set": {},
+                       "smart_contracts": {"token": {"creator": "Alice", "code": self.TOKEN,
+                                                     "state": {"balance:holder1": 10}}}}, file)
+        state_manager = StateManager(file.name, state_db=self.MemoryStateDB())
+        os.remove(file.name)
+        state_manager._update_utxo_set = lambda block: None
+        root = state_manager.get_state_root()
+        block = type("Block", (), {"hash": "b1", "transactions": [
+            {"sender": "holder1", "receiver": "token", "to": "holder2", "amount": 0, "contract_code": True}
+        ]})
+        self.assertTrue(state_manager.update_state(block))
+        self.assertNotEqual(state_manager.get_state_root(), root)
+        self.assertIn("balance:holder2", state_manager.smart_contract_engine.get_contract_state("token"))
+
+        state_manager.rollback_state(block)
+        self.assertNotIn("balance:holder2", state_manager.smart_contract_engine.get_contract_state("token"))
+        self.assertEqual(state_manager.get_state_root(), root)
+
+    @unittest.skipUnless(importlib.util.find_spec("plyvel"), "plyvel is not installed")
+    def test_rolled_back_nested_writes_reach_the_state_db(self):
+        """Tests that rollback_block writes slots changed in place back to StateDB and restores the root."""
+        from blockchain.state.storage.state_db import StateDB
+        db_path = os.path.join(tempfile.mkdtemp(), "state_db")
+        self.addCleanup(shutil.rmtree, os.path.dirname(db_path))
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"holder1": 0, "token": 0}, "nonces": {"holder1": 0, "token": 0}, "utxo_set": {},
+                       "smart_contracts": {"token": {"creator": "Alice", "code": "state['holders'][transaction['to']] = 5",
+                                                     "state": {"holders": {"holder1": 10}}}}}, file)
+        self.addCleanup(os.remove, file.name)
+        state_db = StateDB(db_path)
+        state_manager = StateManager(file.name, state_db=state_db)
+        state_manager._update_utxo_set = lambda block: None
+        root = state_manager.get_state_root()
+        block = type("Block", (), {"hash": "b1", "transactions": [
+            {"sender": "holder1", "receiver": "token", "to": "holder2", "amount": 0, "contract_code": True}
+        ]})
+        self.assertTrue(state_manager.update_state(block))
+        self.assertEqual(state_db.get_value(slot_key("token", "holders")), {"holder1": 10, "holder2": 5})
+
+        state_manager.rollback_state(block)
+        self.assertEqual(state_manager.get_state_root(), root)
+        state_db.close()
+        reopened = StateDB(db_path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get_value(slot_key("token", "holders")), {"holder1": 10})
+
+    def test_tuple_slots_survive_storage_round_trips(self):
+        """Tests that tuple slots are decoded back to tuples from StateDB keys."""
+        slot = ("allowance", ("holder1", "holder2"))
+        self.assertEqual(parse_slot_key(slot_key("token", slot)), ("token", slot))
+        self.engine.slots.set("token", slot, 5)
+        self.engine.slots.flush()
+        self.engine.slots.touch_all()
+        self.assertIn(("token", slot), self.engine.slots.touched)
+        self.assertEqual(self.engine.get_contract_state("token")[slot], 5)
+        self.assertIn(slot, list(self.engine.get_contract_state("token")))
+
+    def test_snapshots_carry_the_contract_storage(self):
+        """Tests that snapshots, delta changes and state restores include the StateDB slots."""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"holder1": 0, "token": 0}, "nonces": {"holder1": 0, "token": 0}, "utxo_set": {},
+                       "smart_contracts": {"token": {"creator": "Alice", "code": self.TOKEN,
+                                                     "state": {"balance:holder1": 10}}}}, file)
+        self.addCleanup(os.remove, file.name)
+        state_manager = StateManager(file.name, state_db=self.MemoryStateDB())
+        state_manager._update_utxo_set = lambda block: None
+        state_manager.get_snapshot_changes()
+        block = type("Block", (), {"hash": "b1", "transactions": [
+            {"sender": "holder1", "receiver": "token", "to": "holder2", "amount": 3, "contract_code": True}
+        ]})
+        self.assertTrue(state_manager.update_state(block))
+        state_manager.smart_contract_engine.slots.set("token", ("allowance", "holder1"), 1)
+        self.assertEqual(state_manager.get_snapshot_changes()["contract_storage"],
+                         {("token", "balance:holder1"): 7, ("token", "balance:holder2"): 3,
+                          ("token", ("allowance", "holder1")): 1})
+
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        ChunkedSnapshotWriter(os.path.join(snapshot_dir, "chunked"), chunk_size=64).write(
+            iter_state_entries(state_manager.get_state()), 1, state_manager.get_state_root())
+        snapshots = StateSnapshot(os.path.join(snapshot_dir, "deltas"))
+        snapshots.create_snapshot(state_manager.get_state(), 1)
+        for restored in (ChunkedSnapshotReader(os.path.join(snapshot_dir, "chunked")).load_state(),
+                         snapshots.load_snapshot(1)):
+            fresh = StateManager(file.name, state_db=self.MemoryStateDB())
+            self.assertEqual(fresh.compute_state_root(restored), state_manager.get_state_root())
+            fresh.load_state(restored)
+            self.assertEqual(fresh.get_state_root(), state_manager.get_state_root())
+            self.assertEqual(fresh.get_state()["contract_storage"], state_manager.get_state()["contract_storage"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,292 @@
+import copy
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from blockchain.state.state_pruner import StatePruner
+from blockchain.state.sparse_merkle_tree import SparseMerkleTree
+from blockchain.state.state_snapshot import StateSnapshot
+from blockchain.state.chunked_snapshot import ChunkedSnapshotReader, iter_state_entries
+from blockchain.blocks.block import Block
+
+sys.path.append("blockchain")
+
+class TestSparseMerkleTree(unittest.TestCase):
+    def setUp(self):
+        self.accounts = {f"address{i}": {"balance": i * 10, "nonce": i} for i in range(20)}
+        self.tree = SparseMerkleTree(self.accounts)
+
+    def test_incremental_root_matches_rebuild(self):
+        """
+        Test that updating only the touched keys gives the same root as rebuilding the tree.
+        """
+        self.tree.update_many({"address3": {"balance": 1, "nonce": 4}, "address7": None, "new": {"balance": 5, "nonce": 0}})
+        self.accounts["address3"] = {"balance": 1, "nonce": 4}
+        del self.accounts["address7"]
+        self.accounts["new"] = {"balance": 5, "nonce": 0}
+        self.assertEqual(self.tree.get_root(), SparseMerkleTree(self.accounts).get_root())
+
+    def test_inclusion_and_exclusion_proofs(self):
+        """
+        Test that proofs verify for present and absent accounts and reject wrong values.
+        """
+        root = self.tree.get_root()
+        proof = self.tree.generate_proof("address5")
+        self.assertTrue(SparseMerkleTree.verify_proof(root, "address5", self.accounts["address5"], proof))
+        self.assertFalse(SparseMerkleTree.verify_proof(root, "address5", {"balance": 999, "nonce": 5}, proof))
+        self.assertFalse(SparseMerkleTree.verify_proof(root, "address5", None, proof))
+
+        proof = self.tree.generate_proof("missing")
+        self.assertTrue(SparseMerkleTree.verify_proof(root, "missing", None, proof))
+        self.assertFalse(SparseMerkleTree.verify_proof(root, "missing", {"balance": 0, "nonce": 0}, proof))
+
+class TestStateSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_dir)
+        self.snapshots = StateSnapshot(self.snapshot_dir, base_interval=3)
+        self.state = {
+            "balances": {"Alice": 100, "Bob": 50},
+            "nonces": {"Alice": 1, "Bob": 0},
+            "utxo_set": {("tx1", 0): {"receiver": "Alice", "amount": 50}},
+            "smart_contracts": {}
+        }
+
+    def _create_history(self):
+        history = {}
+        for height in range(1, 8):
+            self.state["balances"]["Alice"] -= 1
+            self.state["utxo_set"][(f"tx{height}", 0)] = {"receiver": "Bob", "amount": height}
+            self.state["utxo_set"].pop((f"tx{height - 1}", 0), None)
+            self.snapshots.create_snapshot(self.state, height)
+            history[height] = copy.deepcopy(self.state)
+        return history
+
+    def test_delta_chain_restores_every_height(self):
+        """
+        Test that bases plus deltas restore each snapshot exactly, including tuple UTXO keys.
+        """
+        history = self._create_history()
+        types = [self.snapshots.index[height]["type"] for height in sorted(self.snapshots.index)]
+        self.assertEqual(types, ["base", "delta", "delta", "base", "delta", "delta", "base"])
+        for height, expected in history.items():
+            self.assertEqual(StateSnapshot(self.snapshot_dir).load_snapshot(height), expected)
+
+    def test_compaction_merges_deltas_into_base(self):
+        """
+        Test that cleanup rewrites the oldest kept delta as a base and removes older snapshots.
+        """
+        history = self._create_history()
+        self.snapshots.cleanup_old_snapshots(keep_last_n=2)
+        self.assertEqual(sorted(self.snapshots.index), [6, 7])
+        self.assertEqual(self.snapshots.index[6]["type"], "base")
+        self.assertEqual(self.snapshots.load_snapshot(6), history[6])
+
+    def test_corrupted_snapshot_is_rejected(self):
+        """
+        Test that a snapshot whose checksum does not match is not loaded.
+        """
+        self._create_history()
+        with open(os.path.join(self.snapshot_dir, self.snapshots.index[2]["file"]), "ab") as file:
+            file.write(b"corruption")
+        with self.assertRaises(ValueError):
+            self.snapshots.load_snapshot(3)
+
+class TestChunkedSnapshot(unittest.TestCase):
+    class MockStateDB:
+        def __init__(self):
+            self.data = {}
+            self.batches = 0
+
+        def put_raw_batch(self, entries):
+            self.batches += 1
+            before = len(self.data)
+            self.data.update(entries)
+            return len(self.data) - before
+
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_dir)
+        self.snapshots = StateSnapshot(self.snapshot_dir)
+        self.state = {
+            "balances": {f"User{i}": i for i in range(500)},
+            "utxo_set": {(f"tx{i}", 0): {"receiver": f"User{i}", "amount": i} for i in range(100)}
+        }
+        self.manifest = self.snapshots.create_chunked_snapshot(iter_state_entries(self.state), 42, chunk_size=1024)
+
+    def test_round_trip_with_fixed_size_chunks(self):
+        """
+        Test that a chunked snapshot restores the state, including tuple UTXO keys.
+        """
+        self.assertGreater(len(self.manifest["chunks"]), 1)
+        self.assertEqual(self.manifest["total_entries"], 600)
+        reader = ChunkedSnapshotReader(os.path.join(self.snapshot_dir, "chunked_42"))
+        self.assertEqual(reader.load_state(), self.state)
+
+    def test_restore_streams_one_batch_per_chunk(self):
+        """
+        Test that restoring into StateDB writes one batch per chunk.
+        """
+        state_db = self.MockStateDB()
+        restored = self.snapshots.restore_chunked_snapshot(42, state_db)
+        self.assertEqual(restored, 600)
+        self.assertEqual(state_db.batches, len(self.manifest["chunks"]))
+
+    def test_corrupted_chunk_is_rejected(self):
+        """
+        Test that a chunk whose hash does not match the manifest is rejected.
+        """
+        chunk_file = os.path.join(self.snapshot_dir, "chunked_42", self.manifest["chunks"][1]["file"])
+        with open(chunk_file, "ab") as file:
+            file.write(b"corruption")
+        with self.assertRaises(ValueError):
+            self.snapshots.restore_chunked_snapshot(42, self.MockStateDB())
+
+@unittest.skipUnless(importlib.util.find_spec("plyvel"), "plyvel is not installed")
+class TestStateDBIteration(unittest.TestCase):
+    def setUp(self):
+        from blockchain.state.storage.state_db import StateDB
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_db = StateDB(os.path.join(self.temp_dir, "state_db"))
+        self.state_db.bulk_load(((f"account/{i:03d}", i) for i in range(100)), batch_size=7)
+        self.state_db.set_value("block/001", {"height": 1})
+
+    def tearDown(self):
+        self.state_db.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_prefix_and_range_scans(self):
+        """Tests prefix, range, key-only, raw and reverse iteration."""
+        self.assertEqual(len(list(self.state_db.iterate_prefix("account/", keys_only=True))), 100)
+        self.assertEqual(list(self.state_db.iterate_range("account/010", "account/013")),
+                         [("account/010", 10), ("account/011", 11), ("account/012", 12)])
+        self.assertEqual(next(self.state_db.iterate_prefix("account/", reverse=True, keys_only=True)), "account/099")
+        self.assertEqual(next(self.state_db.iterate_range(start="block/", raw=True)), (b"block/001", b'{"height": 1}'))
+
+    def test_bulk_load_rejects_unsorted_input(self):
+        """Tests that bulk_load refuses keys out of order."""
+        with self.assertRaises(ValueError):
+            self.state_db.bulk_load([("z", 1), ("a", 2)])
+        with self.assertRaises(ValueError):
+            self.state_db.bulk_load([(f"new/{i:03d}", i) for i in range(20)] + [("a", 0)], batch_size=5)
+        self.assertEqual(list(self.state_db.iterate_prefix("new/")), [])
+        self.assertIsNone(self.state_db.get_value("z"))
+
+@unittest.skipUnless(importlib.util.find_spec("plyvel"), "plyvel is not installed")
+class TestOnlineBackup(unittest.TestCase):
+    def setUp(self):
+        from blockchain.state.storage.state_db import StateDB
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_db = StateDB(os.path.join(self.temp_dir, "state_db"), track_changes=True)
+        self.restored = StateDB(os.path.join(self.temp_dir, "restored"))
+        self.backup_path = os.path.join(self.temp_dir, "backups")
+        self.state_db.bulk_load((f"account/{i:04d}", i) for i in range(2000))
+
+    def tearDown(self):
+        self.state_db.close()
+        self.restored.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_background_backup_is_point_in_time(self):
+        """Tests that writes made while a background backup runs do not leak into it."""
+        manifests = []
+        thread = self.state_db.start_online_backup(self.backup_path, chunk_size=4096, max_bytes_per_second=200_000,
+                                                   on_complete=manifests.append)
+        self.state_db.set_value("account/0000", "changed")
+        thread.join()
+        self.restored.restore_online_backup([os.path.join(self.backup_path, "state_backup_full_2000")])
+        self.assertEqual(manifests[0]["total_entries"], 2000)
+        self.assertEqual(self.restored.get_value("account/0000"), 0)
+
+    def test_incremental_backup_chain_restores_latest_state(self):
+        """Tests that a full backup plus an incremental one reproduce updates and deletions."""
+        full = self.state_db.online_backup(self.backup_path)
+        self.state_db.set_value("account/0001", "changed")
+        self.state_db.delete_value("account/0002")
+        incremental = self.state_db.online_backup(self.backup_path, since_sequence=full["sequence"])
+        self.assertEqual(incremental["total_entries"], 2)
+
+        self.restored.restore_online_backup([
+            os.path.join(self.backup_path, f"state_backup_full_{full['sequence']}"),
+            os.path.join(self.backup_path, f"state_backup_incremental_{incremental['sequence']}")
+        ])
+        self.assertEqual(list(self.restored.iterate_all()), list(self.state_db.iterate_all()))
+
+    def test_restore_sets_the_sequence_watermark(self):
+        """Tests that a restored database continues the incremental backup chain from the restored sequence."""
+        from blockchain.state.storage.state_db import StateDB
+        full = self.state_db.online_backup(self.backup_path)
+        self.restored.close()
+        self.restored = StateDB(os.path.join(self.temp_dir, "restored"), track_changes=True)
+        self.restored.set_value("account/0001", "stale")
+        self.restored.restore_online_backup([os.path.join(self.backup_path, f"state_backup_full_{full['sequence']}")])
+        self.assertEqual(self.restored.sequence, full["sequence"])
+
+        self.restored.set_value("account/0003", "changed")
+        incremental = self.restored.online_backup(os.path.join(self.temp_dir, "restored_backups"),
+                                                  since_sequence=full["sequence"])
+        self.assertEqual((incremental["base_sequence"], incremental["sequence"]), (full["sequence"], full["sequence"] + 1))
+        self.assertEqual(incremental["total_entries"], 1)
+
+    def test_configured_backups_use_the_storage_config(self):
+        """Tests that the backup section of storage_config.json sets the path, chunk size, throttle and kind."""
+        from blockchain.state.storage.state_db import StateDB
+        config_file = os.path.join(self.temp_dir, "storage_config.json")
+        with open(config_file, "w") as file:
+            json.dump({"database_path": os.path.join(self.temp_dir, "configured"), "backup": {
+                "backup_path": self.backup_path, "online": True, "incremental": True, "track_changes": True,
+                "chunk_size_mb": 8 / 1024, "max_mb_per_second": 0.1
+            }}, file)
+        state_db = StateDB.from_config(config_file)
+        self.addCleanup(state_db.close)
+        self.assertTrue(state_db.track_changes)
+        state_db.bulk_load((f"account/{i:04d}", i) for i in range(2000))
+
+        start = time.monotonic()
+        full = state_db.run_configured_backup()
+        self.assertGreater(time.monotonic() - start, 0.2)  # About 40 KB at 0.1 MB/s
+        self.assertEqual(full["kind"], "full")
+        self.assertGreater(len(full["chunks"]), 1)
+        self.assertTrue(os.path.isdir(os.path.join(self.backup_path, f"state_backup_full_{full['sequence']}")))
+
+        state_db.set_value("account/0001", "changed")
+        incremental = state_db.run_configured_backup(since_sequence=full["sequence"])
+        self.assertEqual((incremental["kind"], incremental["total_entries"]), ("incremental", 1))
+
+class TestStatePruning(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.snapshots = StateSnapshot(self.temp_dir, base_interval=4)
+        for height in range(1, 31):
+            self.snapshots.create_snapshot({"balances": {"Alice": height, f"User{height}": 1}}, height)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_background_compaction_keeps_the_retention_window(self):
+        """Tests that history below the window is dropped while every height inside it stays restorable."""
+        from blocks.block import Block
+        from blocks.blockchain_state import Blockchain
+        blockchain = Blockchain()
+        for height in range(1, 31):
+            blockchain.chain.append(Block(height, blockchain.get_latest_block().hash, [{"height": height}]))
+
+        pruner = StatePruner(blockchain, snapshot_manager=self.snapshots, retention_blocks=10, compaction_interval=5)
+        pruner.enabled = True
+        self.assertIsNone(pruner.on_block_committed(4))
+        pruner.on_block_committed(30).join()
+
+        self.assertEqual(min(self.snapshots.index), 21)
+        for height in range(21, 31):
+            self.assertEqual(self.snapshots.load_snapshot(height)["balances"]["Alice"], height)
+        self.assertIsNone(blockchain.chain[20].transactions)
+        self.assertEqual(blockchain.chain[21].transactions, [{"height": 21}])
+        self.assertEqual(blockchain.chain[20].hash, blockchain.chain[20].calculate_hash())
+        self.assertEqual(pruner.stats["pruned_blocks"], 21)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import importlib.util
+import random
+import unittest
+from blockchain.consensus.validator_selection import ValidatorSelection
+from cryptocurrency.mining.pos.reward_accumulator import RewardAccumulator
+from cryptocurrency.mining.pos.reward_distribution import RewardDistribution
+from cryptocurrency.mining.pos.staking_manager import StakingManager
+
+class TestRewardAccumulator(unittest.TestCase):
+    def test_lazy_rewards_match_per_block_distribution(self):
+        """
+        Property test: over random sequences of stakes, unstakes, withdrawals and blocks, the lazily settled
+        rewards equal the rewards RewardDistribution computes block by block over all stakers.
+        """
+        for seed in range(20):
+            rng = random.Random(seed)
+            distribution = RewardDistribution(total_block_reward=12.5, commission_rate=0.05)
+            accumulator = RewardAccumulator(total_block_reward=12.5, commission_rate=0.05)
+            stakes, expected_rewards = {}, {}
+            addresses = [f"address{i}" for i in range(8)]
+
+            for _ in range(300):
+                address = rng.choice(addresses)
+                action = rng.random()
+                if action < 0.2:
+                    amount = rng.uniform(1, 1000)
+                    accumulator.stake(address, amount)
+                    stakes[address] = stakes.get(address, 0.0) + amount
+                elif action < 0.3 and stakes.get(address, 0) > 0:
+                    amount = stakes[address] * rng.choice([0.5, 1.0])
+                    accumulator.unstake(address, amount)
+                    stakes[address] -= amount
+                elif action < 0.35:
+                    withdrawn = accumulator.withdraw_rewards(address)
+                    self.assertAlmostEqual(withdrawn, expected_rewards.get(address, 0.0), places=6)
+                    expected_rewards[address] = 0.0
+                elif sum(stakes.values()) > 0:
+                    accumulator.distribute()
+                    block_rewards = distribution.calculate_rewards(stakes, sum(stakes.values()))
+                    for staker, reward in block_rewards.items():
+                        expected_rewards[staker] = expected_rewards.get(staker, 0.0) + reward
+
+            for address in addresses:
+                self.assertAlmostEqual(accumulator.get_rewards(address), expected_rewards.get(address, 0.0), places=6)
+                self.assertAlmostEqual(accumulator.get_stake(address), stakes.get(address, 0.0), places=6)
+
+    def test_distribution_requires_stake(self):
+        accumulator = RewardAccumulator(total_block_reward=10)
+        with self.assertRaises(ValueError):
+            accumulator.distribute()
+        accumulator.stake("address1", 50)
+        accumulator.distribute()
+        self.assertAlmostEqual(accumulator.restake_rewards("address1"), 9.0)
+        self.assertAlmostEqual(accumulator.get_stake("address1"), 59.0)
+        self.assertAlmostEqual(accumulator.commission, 1.0)
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+class TestStakeLedger(unittest.TestCase):
+    def setUp(self):
+        from cryptocurrency.mining.pos.stake_ledger import StakeLedger
+        self.stakes = {f"address{i}": 50.0 + 7 * i for i in range(10)}
+        self.ledger = StakeLedger.from_dict(self.stakes)
+
+    def test_distribution_matches_dict_formula_and_conserves_units(self):
+        """
+        Test that vectorized rewards match RewardDistribution to a base unit and never create tokens.
+        """
+        expected = RewardDistribution(total_block_reward=12.5, commission_rate=0.05).calculate_and_distribute(self.stakes)
+        before = self.ledger.total_stake()
+        commission, dust = self.ledger.distribute(12.5, commission_rate=0.05)
+        for address, amount in self.ledger.to_dict().items():
+            self.assertAlmostEqual(amount, expected[address], delta=1 / self.ledger.unit)
+        self.assertEqual(self.ledger.total_stake() + commission + dust - before, 12.5 * self.ledger.unit)
+        self.assertGreaterEqual(dust, 0)
+
+    def test_slashing_and_dict_round_trip(self):
+        import numpy as np
+        downtime = np.zeros(10)
+        downtime[[2, 5]] = 7200
+        settlement = self.ledger.settle_epoch(0, downtime_seconds=downtime, downtime_threshold=3600,
+                                              downtime_penalty=0.02)
+        self.assertEqual(settlement["slashed"], round((self.stakes["address2"] + self.stakes["address5"]) * 0.02 * 1e8))
+        self.assertAlmostEqual(self.ledger.get_stake("address2"), self.stakes["address2"] * 0.98)
+        self.assertEqual(self.ledger.get_stake("address3"), self.stakes["address3"])
+
+        self.ledger.set_stake("newcomer", 60)
+        self.assertEqual(self.ledger.to_dict()["newcomer"], 60.0)
+
+class TestStakingManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = StakingManager(min_stake=1000, lock_period=100)
+        self.selection = ValidatorSelection()
+        self.manager.add_listener(self.selection.update_stake)
+        for address, amount in [("address1", 5000), ("address2", 3000), ("address3", 2000)]:
+            self.manager.stake(address, amount)
+        self.staked_at = self.manager.stakes["address1"]["timestamp"]
+
+    def test_unbonding_releases_entries_in_maturity_order(self):
+        """
+        Test that unstaked tokens leave the validator set at once and are released only once matured.
+        """
+        self.manager.request_unstake("address2", now=self.staked_at)
+        self.manager.request_unstake("address1", 4500, now=self.staked_at + 150)
+        self.assertEqual(self.manager.get_all_validators(), ["address3"])
+        self.assertEqual(self.selection.get_validators(), {"address3": 2000})
+        self.assertEqual(self.manager.get_unbonding("address1"), 4500)
+
+        self.assertEqual(self.manager.process_unbonding(now=self.staked_at + 50), [])
+        self.assertEqual(self.manager.process_unbonding(now=self.staked_at + 120), [("address2", 3000)])
+        self.assertEqual(self.manager.process_unbonding(now=self.staked_at + 150), [("address1", 4500)])
+        self.assertEqual(self.manager.get_unbonding("address1"), 0.0)
+        self.assertEqual(self.manager.get_stake("address1"), 500)
+
+    def test_validator_cache_follows_stake_changes(self):
+        self.assertEqual(sorted(self.manager.get_all_validators()), ["address1", "address2", "address3"])
+        self.manager.stake("address4", 1000)
+        self.assertIn("address4", self.manager.get_all_validators())
+        self.assertEqual(self.selection.get_validators()["address4"], 1000)
+        with self.assertRaises(ValueError):
+            self.manager.request_unstake("address4", 2000)
+
+if __name__ == "__main__":
+    unittest.main()
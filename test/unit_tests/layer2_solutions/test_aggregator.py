@@ -1,8 +1,12 @@
+import json
+import os
+import tempfile
 import unittest
 from layer2_solutions.aggregator.transaction_router import TransactionRouter
 from layer2_solutions.aggregator.state_syncer import StateSyncer
 from layer2_solutions.aggregator.batch_processor import BatchProcessor
 from blockchain.transactions.transaction import Transaction
+from blockchain.state.state_manager import StateManager
 
 class TestAggregator(unittest.TestCase):
     def setUp(self):
@@ -60,5 +64,24 @@ class TestAggregator(unittest.TestCase):
         self.assertTrue(submission_status, "Proof submission to Layer 1 failed")
         print("Proof submission test passed.")
 
+class TestStateSyncer(unittest.TestCase):
+    def test_state_manager_account_proofs_verify(self):
+        """
+        Test that account proofs generated by the StateManager verify against its synced state root.
+        """
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"balances": {"address1": 100, "address2": 200}, "nonces": {"address1": 1, "address2": 0},
+                       "utxo_set": {}, "smart_contracts": {}}, file)
+        self.addCleanup(os.remove, file.name)
+        state_manager = StateManager(file.name)
+        syncer = StateSyncer()
+        syncer.sync_from_layer1({"state_root": state_manager.get_state_root()})
+
+        proof = state_manager.get_account_proof("address1")
+        self.assertTrue(syncer.verify_account("address1", proof["value"], proof["proof"]))
+        self.assertFalse(syncer.verify_account("address1", {"balance": 999, "nonce": 1}, proof["proof"]))
+        absent = state_manager.get_account_proof("address3")
+        self.assertTrue(syncer.verify_account("address3", None, absent["proof"]))
+
 if __name__ == "__main__":
     unittest.main()